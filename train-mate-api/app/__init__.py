@@ -1,4 +1,6 @@
 # app/__init__.py
+import os
+import click
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_limiter import Limiter
@@ -54,5 +56,51 @@ def create_app():
     from app.controllers.goals_controller import goals_bp
     app.register_blueprint(goals_bp, url_prefix='/api/goals')
 
+    from app.controllers.sync_controller import sync_bp
+    app.register_blueprint(sync_bp, url_prefix='/api/sync')
+
+    # Cache and job queue stats of this process, for operators: INTERNAL_STATS_ENABLED=true
+    if os.getenv('INTERNAL_STATS_ENABLED', 'false').lower() == 'true':
+        from app.controllers.stats_controller import stats_bp
+        app.register_blueprint(stats_bp, url_prefix='/internal/stats')
+
+    # Async variants of the heaviest reads: ASYNC_API_ENABLED=true
+    if os.getenv('ASYNC_API_ENABLED', 'false').lower() == 'true':
+        from app.controllers.async_controller import async_bp
+        app.register_blueprint(async_bp, url_prefix='/api/async')
+
+    # flask --app run rebuild-exercise-usage
+    @app.cli.command('rebuild-exercise-usage')
+    def rebuild_exercise_usage_command():
+        from app.services.exercise_usage_service import rebuild_exercise_usage
+        total = rebuild_exercise_usage()
+        print(f"Rebuilt usage counters for {total} exercises")
+
+    # flask --app run rebuild-water-rollups
+    @app.cli.command('rebuild-water-rollups')
+    def rebuild_water_rollups_command():
+        from app.services.water_service import rebuild_water_intake_rollups
+        total = rebuild_water_intake_rollups()
+        print(f"Rebuilt water intake rollups for {total} users")
+
+    # flask --app run rebuild-workouts-rollups
+    @app.cli.command('rebuild-workouts-rollups')
+    def rebuild_workouts_rollups_command():
+        from app.services.workout_service import rebuild_workouts_rollups
+        total = rebuild_workouts_rollups()
+        print(f"Rebuilt workouts rollups for {total} users")
+
+    # flask --app run benchmark-async <uid> --repeat 5 --concurrency 10
+    @app.cli.command('benchmark-async')
+    @click.argument('uid')
+    @click.option('--repeat', default=5)
+    @click.option('--concurrency', default=10)
+    def benchmark_async_command(uid, repeat, concurrency):
+        from app.services.async_service import compare_sync_and_async
+        result = compare_sync_and_async(uid, repeat, concurrency)
+        print(f"{concurrency} concurrent trainings + workouts reads, mean of {repeat} rounds:")
+        print(f"  sync (threads):      {result['sync_ms']:.1f} ms")
+        print(f"  async (shared loop): {result['async_ms']:.1f} ms")
+
 
     return app
@@ -0,0 +1,40 @@
+from flask import Blueprint, request, jsonify, g
+from app.controllers.auth_middleware import register_auth
+from app.services.async_service import run_async, get_user_trainings_async, get_user_workouts_with_trainings_async
+
+# Views over the async services (opt-in: ASYNC_API_ENABLED=true). Same responses as
+# /api/trainings/get-trainings and /api/workouts/workouts. They are plain views: the coroutines
+# run on the shared event loop of async_service, not on a new loop per request.
+async_bp = Blueprint('async_bp', __name__)
+register_auth(async_bp, invalid_status=401)
+
+@async_bp.route('/trainings/get-trainings', methods=['GET'])
+def get_trainings():
+    try:
+        uid = g.uid
+
+        trainings = run_async(get_user_trainings_async(uid))
+        return jsonify({'trainings': trainings}), 200
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({'error': 'Something went wrong'}), 500
+
+@async_bp.route('/workouts/workouts', methods=['GET'])
+def get_workouts():
+    try:
+        uid = g.uid
+
+        start_date = request.args.get('startDate')
+        end_date = request.args.get('endDate')
+
+        try:
+            workouts = run_async(get_user_workouts_with_trainings_async(uid, start_date, end_date))
+        except ValueError:
+            return jsonify({'error': "Invalid date. Use 'YYYY-MM-DD'."}), 400
+
+        return jsonify({'workouts': workouts}), 200
+
+    except Exception as e:
+        print(e)
+        return jsonify({'error': 'Algo salió mal'}), 500
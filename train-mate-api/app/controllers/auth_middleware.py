@@ -0,0 +1,29 @@
+from flask import request, jsonify, g
+from app.services.auth_service import verify_token_service
+
+def register_auth(blueprint, invalid_status=403, public_endpoints=(), endpoint_invalid_status=None):
+    # Resolves the uid once per request, before the view parses the body.
+    # The views read it from g.uid.
+    # endpoint_invalid_status: {endpoint: status} for the views that answered an invalid token
+    # with a different status than the rest of their blueprint
+    @blueprint.before_request
+    def authenticate_request():
+        if request.method == 'OPTIONS':
+            return None
+
+        endpoint = (request.endpoint or '').rsplit('.', 1)[-1]
+        if endpoint in public_endpoints:
+            return None
+
+        header = request.headers.get('Authorization')
+        if not header or not header.startswith('Bearer ') or not header[len('Bearer '):].strip():
+            return jsonify({"error": "Authorization token missing"}), 403
+
+        uid = verify_token_service(header[len('Bearer '):].strip())
+        if not uid:
+            return jsonify({"error": "Invalid token"}), (endpoint_invalid_status or {}).get(endpoint, invalid_status)
+
+        g.uid = uid
+        return None
+
+    return authenticate_request
@@ -1,17 +1,20 @@
-from flask import Blueprint, request, jsonify
-from app.services.auth_service import verify_token_service
+from flask import Blueprint, request, jsonify, g
+from app.controllers.auth_middleware import register_auth
+from app.controllers.conditional_get import collection_etag, is_not_modified, not_modified, with_etag
 from app.services.category_service import (
     save_category as save_category_service,
     get_categories as get_categories_service,
     delete_category as delete_category_service,
     update_category as update_category_service,
     get_category_by_id as get_category_by_id_service,
+    get_default_categories_version,
 )
 from datetime import datetime
-from app.services.metadata_service import get_last_modified_timestamp, set_last_modified_timestamp
+from app.services.metadata_service import get_last_modified_timestamp
 from app.assets.icons_list import get_icons
 
 category_bp = Blueprint('category_bp', __name__)
+register_auth(category_bp, endpoint_invalid_status={'get_last_modified': 401, 'update_last_modified': 401})
 
 def validate_category(data):
     name = data.get('name')
@@ -32,22 +35,13 @@ def validate_category(data):
 @category_bp.route('/save-category', methods=['POST'])
 def save_category():
     try:
+        uid = g.uid
         data = request.get_json()
 
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-        
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-
         validation_error = validate_category(data)
         if validation_error:
             return jsonify(validation_error[0]), validation_error[1]
 
-        if not uid and data.get('isCustom'):
-            return jsonify({"error": "Invalid token for custom category"}), 403
-
         name = data['name']
         icon = data['icon']
         isCustom = data['isCustom']
@@ -71,19 +65,16 @@ def save_category():
 @category_bp.route('/get-categories', methods=['GET'])
 def get_categories():
     try:
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-        
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
+        uid = g.uid
 
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        # Las categorias default son compartidas: su version tambien entra en el ETag
+        etag = collection_etag(uid, ['categories'], get_default_categories_version)
+        if is_not_modified(etag):
+            return not_modified(etag)
 
         categories = get_categories_service(uid)
         
-        return jsonify({"categories": categories}), 200
+        return with_etag(jsonify({"categories": categories}), etag), 200
 
     except Exception as e:
         print(f"Error fetching categories: {e}")
@@ -93,15 +84,7 @@ def get_categories():
 @category_bp.route('/delete-category/<category_id>', methods=['DELETE'])
 def delete_category(category_id):
     try:
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-        
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         success = delete_category_service(uid, category_id)
         if not success:
@@ -118,15 +101,7 @@ def delete_category(category_id):
 def edit_category(category_id):
     try:
         data = request.get_json()
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-        
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         update_data = {}
 
@@ -162,15 +137,7 @@ def edit_category(category_id):
 @category_bp.route('/get-category/<category_id>', methods=['GET'])
 def get_category_by_id(category_id):
     try:
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-        
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         category = get_category_by_id_service(uid, category_id)
         if not category:
@@ -214,10 +181,7 @@ def get_category_by_id(category_id):
 @category_bp.route('/last-modified', methods=['GET'])
 def get_last_modified():
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
+        uid = g.uid
         
         last_modified = get_last_modified_timestamp(uid, 'categories')
 
@@ -235,17 +199,13 @@ def get_last_modified():
     
 @category_bp.route('/update-last-modified', methods=['POST'])
 def update_last_modified():
+    # Sin efecto: cada escritura ya actualiza categories_last_modified en el mismo batch.
+    # Se mantiene por compatibilidad y devuelve el timestamp actual.
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
-
-        time = set_last_modified_timestamp(uid, 'categories')
-        if not time:
-            return jsonify({'error': 'Error updating last modified timestamp'}), 500
-        if isinstance(time, datetime):
-            timestamp_ms = int(time.timestamp() * 1000)
+        uid = g.uid
+
+        time = get_last_modified_timestamp(uid, 'categories')
+        timestamp_ms = int(time.timestamp() * 1000) if isinstance(time, datetime) else None
 
         return jsonify({'message': 'Last modified timestamp updated successfully', 'last_modified_timestamp': timestamp_ms}), 200
 
@@ -1,21 +1,14 @@
-from flask import Blueprint, request, jsonify
-from app.services.auth_service import verify_token_service
+from flask import Blueprint, jsonify, g
+from app.controllers.auth_middleware import register_auth
 from app.services.challenges_service import get_challenges_list_service
 
 challenges_bp = Blueprint('challenges_bp', __name__)
+register_auth(challenges_bp)
 
 @challenges_bp.route('/get-challenges-list/<type>', methods=['GET']) 
 def get_challenges_list(type):
     try:
-        # Obtener el token de autorización y verificar el usuario
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         challenges = get_challenges_list_service(uid, type)
         if challenges is None:
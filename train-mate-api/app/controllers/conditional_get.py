@@ -0,0 +1,31 @@
+import hashlib
+from flask import request, make_response
+from app.services.metadata_service import get_last_modified_timestamp
+
+def collection_etag(uid, collections, version=None):
+    # ETag of a user's listing, built from the *_last_modified timestamps of the collections
+    # it depends on (one metadata read per request) plus the full URL, so each filter/page
+    # gets its own tag. None if a timestamp is missing: there is nothing to compare against.
+    # version: optional callable for data shared by every user (only called if there is a tag)
+    parts = [uid, request.full_path]
+    for collection in collections:
+        last_modified = get_last_modified_timestamp(uid, collection)
+        if last_modified is None:
+            return None
+        parts.append(last_modified.isoformat() if hasattr(last_modified, 'isoformat') else str(last_modified))
+    if version is not None:
+        parts.append(str(version()))
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+def is_not_modified(etag):
+    return etag is not None and request.if_none_match.contains(etag)
+
+def with_etag(response, etag):
+    # The client keeps the list and revalidates it every time with If-None-Match
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def not_modified(etag):
+    return with_etag(make_response('', 304), etag)
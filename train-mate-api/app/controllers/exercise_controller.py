@@ -1,5 +1,5 @@
-from flask import Blueprint, request, jsonify
-from app.services.auth_service import verify_token_service
+from flask import Blueprint, request, jsonify, g
+from app.controllers.auth_middleware import register_auth
 from app.services.exercise_service import (
     save_exercise as save_exercise_service,
     get_exercises as get_exercises_service,
@@ -7,11 +7,22 @@ from app.services.exercise_service import (
     update_exercise as update_exercise_service,
     get_all_exercises as get_all_exercises_service,
     get_exercise_by_category_id as get_exercise_by_category_id_service,
+    EXERCISE_ORDER_FIELDS
 )
+from app.services.pagination_service import MAX_PAGE_SIZE, parse_limit
 from app.services.trainings_service import recalculate_calories_per_hour_mean_of_trainings_by_modified_excercise
 from app.assets.muscular_groups_list import get_muscles
 
 exercise_bp = Blueprint('exercise_bp', __name__)
+register_auth(exercise_bp, public_endpoints=('get_all_exercises',))
+
+def parse_page_args():
+    # limit (capped, MAX_PAGE_SIZE when missing), cursor and order_by=name|id for the public listings
+    limit = parse_limit(request.args.get('limit'), default=MAX_PAGE_SIZE)
+    order_by = request.args.get('order_by', 'name')
+    if order_by not in EXERCISE_ORDER_FIELDS:
+        raise ValueError("Invalid order_by, should be name or id")
+    return limit, request.args.get('cursor'), order_by
 
 def validate_body(data):
     name = data.get('name')
@@ -43,21 +54,13 @@ def validate_body(data):
 @exercise_bp.route('/save-exercise', methods=['POST'])
 def save_exercise():
     try:
+        uid = g.uid
         data = request.get_json()
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-        
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
 
         validation_error = validate_body(data)
         if validation_error:
             return jsonify(validation_error[0]), validation_error[1]
 
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
-
         name = data['name']
         calories_per_hour = data['calories_per_hour']
         public = data['public']
@@ -82,19 +85,20 @@ def save_exercise():
 @exercise_bp.route('/get-exercises', methods=['GET'])
 def get_exercises():
     try:
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-        
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         show_public = request.args.get('public', 'false').lower() == 'true'
-        exercises = get_exercises_service(uid, show_public)
-        return jsonify({"exercises": exercises}), 200
+        if not show_public:
+            exercises, _ = get_exercises_service(uid, show_public)
+            return jsonify({"exercises": exercises}), 200
+
+        try:
+            limit, cursor, order_by = parse_page_args()
+            exercises, next_cursor = get_exercises_service(uid, show_public, limit, cursor, order_by)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({"exercises": exercises, "next_cursor": next_cursor}), 200
 
     except Exception as e:
         print(f"Error fetching exercises: {e}")
@@ -104,15 +108,7 @@ def get_exercises():
 @exercise_bp.route('/delete-exercise/<exercise_id>', methods=['DELETE'])
 def delete_exercise(exercise_id):
     try:
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-        
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         success = delete_exercise_service(uid, exercise_id)
         if not success:
@@ -129,15 +125,7 @@ def delete_exercise(exercise_id):
 def edit_exercise(exercise_id):
     try:
         data = request.get_json()
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-        
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         # En vez de usar una validación rígida, validamos si se envió cada campo
         update_data = {}
@@ -210,8 +198,13 @@ def edit_exercise(exercise_id):
 @exercise_bp.route('/get-all-exercises', methods=['GET'])
 def get_all_exercises():
     try:
-        exercises = get_all_exercises_service()
-        return jsonify({"exercises": exercises}), 200
+        try:
+            limit, cursor, order_by = parse_page_args()
+            exercises, next_cursor = get_all_exercises_service(limit, cursor, order_by)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({"exercises": exercises, "next_cursor": next_cursor}), 200
 
     except Exception as e:
         print(f"Error fetching exercises: {e}")
@@ -221,15 +214,7 @@ def get_all_exercises():
 @exercise_bp.route('/get-exercises-by-category/<category_id>', methods=['GET'])
 def get_exercises_by_category_id(category_id):
     try:
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-        
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
         
         exercises = get_exercise_by_category_id_service(category_id, uid)
         return jsonify({"exercises": exercises}), 200
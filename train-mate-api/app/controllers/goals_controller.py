@@ -1,21 +1,14 @@
-from flask import Blueprint, request, jsonify
-from app.services.auth_service import verify_token_service
+from flask import Blueprint, request, jsonify, g
+from app.controllers.auth_middleware import register_auth
 from app.services.goals_service import complete_goal_service, get_all_goals_service, create_goal_service, get_goal_service
 
 goals_bp = Blueprint('goals_bp', __name__)
+register_auth(goals_bp)
 
 @goals_bp.route('/get-all-goals', methods=['GET'])
 def get_all_goals():
     try:
-        # Verify the authorization token
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         goals = get_all_goals_service(uid)
         if goals is None:
@@ -31,14 +24,7 @@ def get_all_goals():
 @goals_bp.route('/create-goal', methods=['POST'])
 def create_goal():
     try:
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         data = request.get_json()
         if not data:
@@ -72,14 +58,7 @@ def create_goal():
 @goals_bp.route('/get-goal/<goal_id>', methods=['GET'])
 def get_goal(goal_id):
     try:
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         goal = get_goal_service(uid, goal_id)
         if not goal:
@@ -95,14 +74,7 @@ def get_goal(goal_id):
 @goals_bp.route('/complete-goal/<goal_id>', methods=['PATCH'])
 def complete_goal(goal_id):
     try:
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         completed_goal = complete_goal_service(uid, goal_id)
         if not completed_goal:
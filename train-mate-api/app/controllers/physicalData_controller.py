@@ -1,5 +1,5 @@
-from flask import Blueprint, request, jsonify
-from app.services.auth_service import verify_token_service
+from flask import Blueprint, request, jsonify, g
+from app.controllers.auth_middleware import register_auth
 from app.services.physicalData_service import (
     add_physical_data_service,
     get_physical_data_service
@@ -8,6 +8,7 @@ from datetime import datetime
 import pytz
 
 physicalData_bp = Blueprint('physicalData_bp', __name__)
+register_auth(physicalData_bp)
 
 def validate_body(data):
     weight = data.get('weight')
@@ -62,14 +63,7 @@ def validate_body(data):
 @physicalData_bp.route('/add', methods=['POST'])
 def add_physical_data():
     try:
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         data = request.get_json()
         weight = data.get('weight')
@@ -97,14 +91,7 @@ def add_physical_data():
 @physicalData_bp.route('/get-physical-data', methods=['GET'])
 def get_physical_data():
     try:
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         physical_data = get_physical_data_service(uid)
         if not physical_data:
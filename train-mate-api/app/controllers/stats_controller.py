@@ -0,0 +1,25 @@
+from flask import Blueprint, jsonify
+from app.controllers.auth_middleware import register_auth
+from app.services.auth_service import get_token_cache_stats
+from app.services.trainings_service import get_popular_exercises_cache_stats
+from app.services.category_service import get_default_categories_cache_stats
+from app.services.job_queue_service import get_job_queue_stats
+
+# Per-process cache and job queue stats (opt-in: INTERNAL_STATS_ENABLED=true, authenticated).
+# /healthCheck stays a plain liveness check.
+stats_bp = Blueprint('stats_bp', __name__)
+register_auth(stats_bp, invalid_status=401)
+
+@stats_bp.route('', methods=['GET'])
+def get_stats():
+    try:
+        return jsonify({
+            'token_cache': get_token_cache_stats(),
+            'popular_exercises_cache': get_popular_exercises_cache_stats(),
+            'default_categories_cache': get_default_categories_cache_stats(),
+            'job_queue': get_job_queue_stats()
+        }), 200
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({'error': 'Something went wrong'}), 500
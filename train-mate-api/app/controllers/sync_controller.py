@@ -0,0 +1,26 @@
+from flask import Blueprint, request, jsonify, g
+from app.controllers.auth_middleware import register_auth
+from app.services.sync_service import SYNC_COLLECTIONS, parse_high_water_mark, sync_user_collections
+
+sync_bp = Blueprint('sync_bp', __name__)
+register_auth(sync_bp, invalid_status=401)
+
+# GET /api/sync?workouts=<ms>&trainings=<ms>&categories=<ms>
+# Replaces the /last-modified polling + full list fetches at startup with a single call
+@sync_bp.route('', methods=['GET'])
+def sync():
+    try:
+        uid = g.uid
+
+        high_water_marks = {}
+        for collection in SYNC_COLLECTIONS:
+            try:
+                high_water_marks[collection] = parse_high_water_mark(request.args.get(collection))
+            except ValueError:
+                return jsonify({'error': f'Invalid high-water mark for {collection}, should be milliseconds since epoch'}), 400
+
+        return jsonify({'collections': sync_user_collections(uid, high_water_marks)}), 200
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({'error': 'Something went wrong'}), 500
@@ -1,18 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from datetime import datetime
-from app.services.auth_service import verify_token_service
+from app.controllers.auth_middleware import register_auth
+from app.controllers.conditional_get import collection_etag, is_not_modified, not_modified, with_etag
 from app.services.trainings_service import get_popular_exercises, save_user_training, get_user_trainings, get_training_by_id
-from app.services.metadata_service import get_last_modified_timestamp, set_last_modified_timestamp
+from app.services.metadata_service import get_last_modified_timestamp
 
 trainings_bp = Blueprint('trainings_bp', __name__)
+register_auth(trainings_bp, invalid_status=401, public_endpoints=('get_popular_exercises_view',))
 
 @trainings_bp.route('/save-training', methods=['POST'])
 def save_training():
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
+        uid = g.uid
 
         data = request.get_json()
 
@@ -44,13 +43,14 @@ def save_training():
 @trainings_bp.route('/get-trainings', methods=['GET'])
 def get_trainings():
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
+        uid = g.uid
+
+        etag = collection_etag(uid, ['trainings'])
+        if is_not_modified(etag):
+            return not_modified(etag)
 
         trainings = get_user_trainings(uid)
-        return jsonify({'trainings': trainings}), 200
+        return with_etag(jsonify({'trainings': trainings}), etag), 200
 
     except Exception as e:
         print(f"Error: {e}")
@@ -59,10 +59,7 @@ def get_trainings():
 @trainings_bp.route('/get-training/<training_id>', methods=['GET'])
 def get_training_by_id(training_id):
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
+        uid = g.uid
 
         training = get_training_by_id(uid, training_id)
         if not training:
@@ -90,10 +87,7 @@ def get_popular_exercises_view():
 @trainings_bp.route('/last-modified', methods=['GET'])
 def get_last_modified():
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
+        uid = g.uid
         
         last_modified = get_last_modified_timestamp(uid, 'trainings')
 
@@ -111,17 +105,13 @@ def get_last_modified():
     
 @trainings_bp.route('/update-last-modified', methods=['POST'])
 def update_last_modified():
+    # Sin efecto: cada escritura ya actualiza trainings_last_modified en el mismo batch.
+    # Se mantiene por compatibilidad y devuelve el timestamp actual.
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
-        
-        time = set_last_modified_timestamp(uid, 'trainings')
-        if not time:
-            return jsonify({'error': 'Error updating last modified timestamp'}), 500
-        if isinstance(time, datetime):
-            timestamp_ms = int(time.timestamp() * 1000)
+        uid = g.uid
+
+        time = get_last_modified_timestamp(uid, 'trainings')
+        timestamp_ms = int(time.timestamp() * 1000) if isinstance(time, datetime) else None
 
         return jsonify({'message': 'Last modified timestamp updated successfully', 'last_modified_timestamp': timestamp_ms}), 200
 
@@ -1,9 +1,11 @@
-from flask import Blueprint, request, jsonify
-from app.services.user_service import save_user_info_service, verify_token_service, get_user_info_service, update_user_info_service
+from flask import Blueprint, request, jsonify, g
+from app.services.user_service import save_user_info_service, get_user_info_service, update_user_info_service
+from app.controllers.auth_middleware import register_auth
 from datetime import datetime
 import pytz
 
 user_bp = Blueprint('user_bp', __name__)
+register_auth(user_bp, invalid_status=401)
 
 def validate_body(data):
     if 'email' not in data or 'name' not in data or 'sex' not in data or 'weight' not in data or 'height' not in data or 'birthday' not in data:
@@ -50,10 +52,7 @@ def validate_body(data):
 @user_bp.route('/save-user-info', methods=['POST'])
 def save_user_info():
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
+        uid = g.uid
 
         data = request.get_json()
 
@@ -73,10 +72,7 @@ def save_user_info():
 @user_bp.route('/get-user-info', methods=['GET'])
 def get_user_info():
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
+        uid = g.uid
 
         user_info = get_user_info_service(uid)
         if user_info:
@@ -92,10 +88,7 @@ def get_user_info():
 @user_bp.route('/update-user-info', methods=['PUT'])
 def update_user_info():
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
+        uid = g.uid
 
         data = request.get_json()
         update_user_info_service(uid, data)
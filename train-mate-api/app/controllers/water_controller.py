@@ -1,27 +1,21 @@
-from flask import Blueprint, request, jsonify
-from app.services.auth_service import verify_token_service
+from flask import Blueprint, request, jsonify, g
+from app.controllers.auth_middleware import register_auth
 from app.services.water_service import (
     add_water_intake_service,
     get_daily_water_intake_service,
     get_water_intake_history_service
 )
+from app.services.rollup_service import GRANULARITIES
 from datetime import datetime
 
 water_bp = Blueprint('water_bp', __name__)
+register_auth(water_bp)
 
 # Endpoint para cargar cuánta agua tomé
 @water_bp.route('/add', methods=['POST'])
 def add_water_intake():
     try:
-        # Obtener el token de autorización y verificar el usuario
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
         
         data = request.get_json()
 
@@ -62,15 +56,7 @@ def add_water_intake():
 @water_bp.route('/get-daily-water-intake', methods=['GET'])
 def get_daily_water_intake():
     try:
-        # Obtener el token de autorización y verificar el usuario
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         # Llamar al servicio para obtener el agua del día
         date = datetime.now().strftime('%Y-%m-%d')
@@ -88,25 +74,22 @@ def get_daily_water_intake():
 @water_bp.route('/get-water-intake-history', methods=['GET'])
 def get_water_intake_history():
     try:
-        # Obtener el token de autorización y verificar el usuario
-        token = request.headers.get('Authorization')
-        if not token or 'Bearer ' not in token:
-            return jsonify({"error": "Authorization token missing"}), 403
-
-        token = token.split(' ')[1]
-        uid = verify_token_service(token)
-        if not uid:
-            return jsonify({"error": "Invalid token"}), 403
+        uid = g.uid
 
         # Obtener los parámetros de rango de fechas de la URL
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
 
+        granularity = request.args.get('granularity', 'day')
+
         if not start_date or not end_date:
             return jsonify({"error": "Start date and end date are required"}), 400
 
+        if granularity not in GRANULARITIES:
+            return jsonify({"error": "Invalid granularity, should be day, week or month"}), 400
+
         # Llamar al servicio para obtener el historial de ingesta de agua
-        history = get_water_intake_history_service(uid, start_date, end_date)
+        history = get_water_intake_history_service(uid, start_date, end_date, granularity)
 
         return jsonify({"water_intake_history": history}), 200
 
@@ -1,22 +1,21 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from datetime import datetime
-from app.services.user_service import verify_token_service
-from app.services.workout_service import save_user_workout, get_user_workouts, get_user_calories_from_workouts
-from app.services.exercise_service import get_exercise_by_id_service
+from app.controllers.auth_middleware import register_auth
+from app.controllers.conditional_get import collection_etag, is_not_modified, not_modified, with_etag
+from app.services.workout_service import save_user_workout, get_user_workouts, get_user_calories_from_workouts, hydrate_workouts_with_trainings, get_user_workouts_aggregates, get_user_workouts_page
+from app.services.pagination_service import parse_limit
+from app.services.rollup_service import GRANULARITIES
 from app.services.trainings_service import get_training_by_id
 from app.services.workout_service import delete_user_workout
-from app.services.metadata_service import get_last_modified_timestamp, set_last_modified_timestamp
+from app.services.metadata_service import get_last_modified_timestamp
 
 workout_bp = Blueprint('workout_bp', __name__)
+register_auth(workout_bp, invalid_status=401)
 
 @workout_bp.route('/save-workout', methods=['POST'])
 def record_workout():
     try:
-        # Extract and validate the token
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
+        uid = g.uid
 
         # Get request data
         data = request.get_json()
@@ -61,32 +60,41 @@ def record_workout():
 @workout_bp.route('/workouts', methods=['GET'])
 def get_workouts():
     try:
-        # Extract and validate the token
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Token inválido'}), 401
+        uid = g.uid
+
+        # Los workouts incluyen sus trainings: el ETag depende de ambas colecciones
+        etag = collection_etag(uid, ['workouts', 'trainings'])
+        if is_not_modified(etag):
+            return not_modified(etag)
 
         # Obtener las fechas de los parámetros de la URL
         start_date = request.args.get('startDate')
         end_date = request.args.get('endDate')
+
+        # Con limit o cursor se pagina (más nuevos primero); sin ellos se devuelve todo como antes
+        limit = request.args.get('limit')
+        cursor = request.args.get('cursor')
+        if limit is not None or cursor is not None:
+            try:
+                workouts, next_cursor = get_user_workouts_page(uid, start_date, end_date, parse_limit(limit), cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+            hydrate_workouts_with_trainings(uid, workouts)
+            return with_etag(jsonify({
+                'workouts': workouts,
+                'next_cursor': next_cursor
+            }), etag), 200
+
         # Get all workouts for the user with optional date filtering
         workouts = get_user_workouts(uid, start_date, end_date)
-        for workout in workouts:
-            exercises = []
-            training_data = get_training_by_id(uid, workout['training_id'])
-            workout['training'] = training_data
-            for exercise_id in training_data['exercises']:
-                exercise_data = get_exercise_by_id_service(exercise_id)
-                exercise_data['id'] = exercise_id
-                exercises.append(exercise_data)
-            workout['training']['exercises'] = exercises
+        hydrate_workouts_with_trainings(uid, workouts)
 
 
         # Return the list of workouts
-        return jsonify({
+        return with_etag(jsonify({
             'workouts': workouts
-        }), 200
+        }), etag), 200
 
     except Exception as e:
         print(e)
@@ -97,12 +105,7 @@ def get_workouts():
 @workout_bp.route('/get-workouts-calories', methods=['GET'])
 def get_workouts_calories():
     try:
-        # Extract and validate the token
-        token = request.headers.get('Authorization').split(' ')[1]
-
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Token inválido'}), 401
+        uid = g.uid
         
         start_date = request.args.get('startDate')
         end_date = request.args.get('endDate')
@@ -125,16 +128,38 @@ def get_workouts_calories():
     except Exception as e:
         print(e)
         return jsonify({'error': 'Algo salió mal'}), 500
+
+# Totales de calorias, duracion y cantidad de workouts por dia, semana o mes
+@workout_bp.route('/get-workouts-aggregates', methods=['GET'])
+def get_workouts_aggregates():
+    try:
+        uid = g.uid
+
+        start_date = request.args.get('startDate')
+        end_date = request.args.get('endDate')
+        granularity = request.args.get('granularity', 'day')
+
+        if not start_date or not end_date:
+            return jsonify({'error': 'startDate and endDate are required'}), 400
+
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': 'Invalid granularity, should be day, week or month'}), 400
+
+        aggregates = get_user_workouts_aggregates(uid, start_date, end_date, granularity)
+        if isinstance(aggregates, dict) and 'error' in aggregates:
+            return jsonify(aggregates), 400
+
+        return jsonify({'aggregates': aggregates}), 200
+
+    except Exception as e:
+        print(e)
+        return jsonify({'error': 'Something went wrong'}), 500
     
 
 @workout_bp.route('/cancel-workout/<workout_id>', methods=['DELETE'])
 def cancel_workout(workout_id):
     try:
-        # Extract and validate the token
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
+        uid = g.uid
 
         # Attempt to delete the workout
         response, status_code = delete_user_workout(uid, workout_id)
@@ -147,10 +172,7 @@ def cancel_workout(workout_id):
 @workout_bp.route('/last-modified', methods=['GET'])
 def get_last_modified():
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
+        uid = g.uid
         
         last_modified = get_last_modified_timestamp(uid, 'workouts')
 
@@ -168,17 +190,13 @@ def get_last_modified():
     
 @workout_bp.route('/update-last-modified', methods=['POST'])
 def update_last_modified():
+    # Sin efecto: cada escritura ya actualiza workouts_last_modified en el mismo batch.
+    # Se mantiene por compatibilidad y devuelve el timestamp actual.
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        uid = verify_token_service(token)
-        if uid is None:
-            return jsonify({'error': 'Invalid token'}), 401
-        
-        time = set_last_modified_timestamp(uid, 'workouts')
-        if not time:
-            return jsonify({'error': 'Error updating last modified timestamp'}), 500
-        if isinstance(time, datetime):
-            timestamp_ms = int(time.timestamp() * 1000)
+        uid = g.uid
+
+        time = get_last_modified_timestamp(uid, 'workouts')
+        timestamp_ms = int(time.timestamp() * 1000) if isinstance(time, datetime) else None
 
         return jsonify({'message': 'Last modified timestamp updated successfully', 'last_modified_timestamp': timestamp_ms}), 200
 
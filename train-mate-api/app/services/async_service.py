@@ -0,0 +1,136 @@
+import time
+import asyncio
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from firebase_setup import get_async_db
+from app.services.documents_service import BATCH_READ_SIZE
+
+# Opt-in async versions of the read paths with the most round trips (trainings -> exercises,
+# workouts -> trainings -> exercises) over the Firestore AsyncClient. Same results as the sync
+# services; the independent reads are awaited together with asyncio.gather.
+#
+# Every request runs its coroutine on one long-lived event loop (a daemon thread), so the
+# AsyncClient and its gRPC channel are created once per process and reused, instead of a new
+# loop + client + TLS handshake per request.
+_loop = None
+_loop_lock = threading.Lock()
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='async-firestore', daemon=True).start()
+        return _loop
+
+def run_async(coroutine):
+    # Runs coroutine on the shared loop and blocks the calling (request) thread until it is done
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_loop()).result()
+
+async def get_documents_by_ids_async(collection_path, document_ids):
+    # Async counterpart of documents_service.get_documents_by_ids (without the request cache)
+    unique_ids = [doc_id for doc_id in dict.fromkeys(document_ids) if doc_id]
+    collection_ref = get_async_db().collection(collection_path)
+
+    async def fetch_chunk(chunk):
+        refs = [collection_ref.document(doc_id) for doc_id in chunk]
+        return {snapshot.id: snapshot.to_dict() async for snapshot in get_async_db().get_all(refs) if snapshot.exists}
+
+    chunks = [unique_ids[start:start + BATCH_READ_SIZE] for start in range(0, len(unique_ids), BATCH_READ_SIZE)]
+    documents = {}
+    for fetched in await asyncio.gather(*[fetch_chunk(chunk) for chunk in chunks]):
+        documents.update(fetched)
+    return documents
+
+async def get_user_trainings_async(uid):
+    user_trainings_ref = get_async_db().collection('trainings').document(uid).collection('user_trainings')
+    trainings = [(training.id, training.to_dict()) async for training in user_trainings_ref.stream()]
+
+    all_exercise_ids = [exercise_id for _, training_data in trainings for exercise_id in training_data.get('exercises', [])]
+    exercises_by_id = await get_documents_by_ids_async('exercises', all_exercise_ids)
+
+    training_list = []
+    for training_id, training_data in trainings:
+        exercise_ids = training_data.get('exercises', [])
+        training_data['exercises'] = [
+            {**exercises_by_id[exercise_id], 'exercise_id': exercise_id}
+            for exercise_id in exercise_ids if exercise_id in exercises_by_id
+        ]
+        training_data['id'] = training_id
+        training_list.append(training_data)
+    return training_list
+
+async def get_user_workouts_async(uid, start_date=None, end_date=None):
+    # Raises ValueError for dates that are not YYYY-MM-DD
+    user_workouts_ref = get_async_db().collection('workouts').document(uid).collection('user_workouts')
+
+    if start_date:
+        start_datetime = datetime.strptime(start_date, '%Y-%m-%d').replace(hour=10, minute=0)
+        user_workouts_ref = user_workouts_ref.where('date', '>=', start_datetime)
+
+    if end_date:
+        end_datetime = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=10, minute=0)
+        user_workouts_ref = user_workouts_ref.where('date', '<=', end_datetime)
+
+    return [{**workout.to_dict(), 'id': workout.id} async for workout in user_workouts_ref.stream()]
+
+async def hydrate_workouts_with_trainings_async(uid, workouts):
+    trainings_by_id = await get_documents_by_ids_async(
+        f'trainings/{uid}/user_trainings', [workout['training_id'] for workout in workouts]
+    )
+    exercise_ids = [exercise_id for training in trainings_by_id.values() for exercise_id in training.get('exercises', [])]
+    exercises_by_id = await get_documents_by_ids_async('exercises', exercise_ids)
+
+    hydrated_trainings = {}
+    for training_id, training_data in trainings_by_id.items():
+        exercises = [
+            {**exercises_by_id[exercise_id], 'id': exercise_id}
+            for exercise_id in training_data.get('exercises', []) if exercise_id in exercises_by_id
+        ]
+        hydrated_trainings[training_id] = {**training_data, 'exercises': exercises}
+
+    for workout in workouts:
+        workout['training'] = hydrated_trainings.get(workout['training_id'])
+
+    return workouts
+
+async def get_user_workouts_with_trainings_async(uid, start_date=None, end_date=None):
+    workouts = await get_user_workouts_async(uid, start_date, end_date)
+    return await hydrate_workouts_with_trainings_async(uid, workouts)
+
+def compare_sync_and_async(uid, repeat=5, concurrency=10):
+    # Benchmark: `concurrency` simultaneous get-trainings + get-workouts reads of the same user,
+    # each on its own request thread, over the sync client vs the path of the /api/async views
+    # (run_async on the shared loop). Returns the mean wall time (ms) of each round.
+    from app.services.trainings_service import get_user_trainings
+    from app.services.workout_service import get_user_workouts, hydrate_workouts_with_trainings
+
+    def sync_call():
+        get_user_trainings(uid)
+        hydrate_workouts_with_trainings(uid, get_user_workouts(uid))
+
+    def async_call():
+        run_async(get_user_trainings_async(uid))
+        run_async(get_user_workouts_with_trainings_async(uid))
+
+    def timed_rounds(call):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Warm-up round: creates the clients and their channels
+            list(executor.map(lambda _: call(), range(concurrency)))
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(executor.map(lambda _: call(), range(concurrency)))
+                timings.append(time.perf_counter() - start)
+        return timings
+
+    sync_timings = timed_rounds(sync_call)
+    async_timings = timed_rounds(async_call)
+
+    return {
+        'repeat': repeat,
+        'concurrency': concurrency,
+        'sync_ms': sum(sync_timings) / repeat * 1000,
+        'async_ms': sum(async_timings) / repeat * 1000
+    }
@@ -1,9 +1,74 @@
+import os
+import time
+import hashlib
+import threading
+from cachetools import TLRUCache
 from firebase_admin import auth
 
+# Cache de tokens ya verificados: sha256(token) -> {'uid', 'exp'}
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", 10000))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 300))
+
+def _now():
+    return time.time()
+
+def _token_time_to_use(_key, value, now):
+    # Never keep a token past its own expiration
+    return min(now + TOKEN_CACHE_TTL, value['exp'])
+
+_token_cache = TLRUCache(maxsize=TOKEN_CACHE_MAX_SIZE, ttu=_token_time_to_use, timer=_now)
+_token_cache_lock = threading.Lock()
+_token_cache_stats = {'hits': 0, 'misses': 0, 'verifications': 0, 'verification_seconds': 0.0}
+
+def _hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
 def verify_token_service(token):
     try:
+        token_hash = _hash_token(token)
+
+        with _token_cache_lock:
+            cached = _token_cache.get(token_hash)
+            if cached is not None:
+                _token_cache_stats['hits'] += 1
+                return cached['uid']
+            _token_cache_stats['misses'] += 1
+
+        start = time.perf_counter()
         decoded_token = auth.verify_id_token(token)
+        elapsed = time.perf_counter() - start
+
+        with _token_cache_lock:
+            _token_cache_stats['verifications'] += 1
+            _token_cache_stats['verification_seconds'] += elapsed
+            if 'exp' in decoded_token:
+                _token_cache[token_hash] = {'uid': decoded_token['uid'], 'exp': decoded_token['exp']}
+
         return decoded_token['uid']
     except Exception as e:
         print(e)
-        return None
\ No newline at end of file
+        return None
+
+def get_token_cache_stats():
+    with _token_cache_lock:
+        hits = _token_cache_stats['hits']
+        misses = _token_cache_stats['misses']
+        verifications = _token_cache_stats['verifications']
+        verification_seconds = _token_cache_stats['verification_seconds']
+        size = len(_token_cache)
+
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / lookups if lookups else 0.0,
+        'size': size,
+        'verifications': verifications,
+        'avg_verification_ms': (verification_seconds / verifications) * 1000 if verifications else 0.0
+    }
+
+def clear_token_cache():
+    with _token_cache_lock:
+        _token_cache.clear()
+        for key in _token_cache_stats:
+            _token_cache_stats[key] = 0
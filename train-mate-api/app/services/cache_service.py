@@ -0,0 +1,104 @@
+import time
+import threading
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class SingleFlightCache:
+    # Caches the result of loader() for ttl seconds. Concurrent misses share a single
+    # call to loader(), and if a refresh fails the last good value is served (stale).
+    def __init__(self, loader, ttl):
+        self._loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._flight = None
+        self._has_value = False
+        self._value = None
+        self._expires_at = 0
+        self._stats = {
+            'hits': 0,
+            'recomputes': 0,
+            'coalesced': 0,
+            'failures': 0,
+            'stale_served': 0,
+            'recompute_seconds': 0.0,
+            'last_recompute_seconds': 0.0
+        }
+
+    def get(self):
+        with self._lock:
+            if self._has_value and time.monotonic() < self._expires_at:
+                self._stats['hits'] += 1
+                return self._value
+
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                return self._stale_or_raise(flight.error)
+            return flight.value
+
+        start = time.perf_counter()
+        try:
+            value = self._loader()
+        except Exception as e:
+            with self._lock:
+                self._stats['failures'] += 1
+                flight.error = e
+                self._flight = None
+            flight.done.set()
+            return self._stale_or_raise(e)
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats['recomputes'] += 1
+            self._stats['recompute_seconds'] += elapsed
+            self._stats['last_recompute_seconds'] = elapsed
+            self._value = value
+            self._has_value = True
+            self._expires_at = time.monotonic() + self.ttl
+            flight.value = value
+            self._flight = None
+        flight.done.set()
+        return value
+
+    def _stale_or_raise(self, error):
+        with self._lock:
+            if not self._has_value:
+                raise error
+            self._stats['stale_served'] += 1
+            return self._value
+
+    def invalidate(self):
+        # The current value is kept as a fallback, but the next get() recomputes it
+        with self._lock:
+            self._expires_at = 0
+
+    def clear(self):
+        with self._lock:
+            self._has_value = False
+            self._value = None
+            self._expires_at = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        recomputes = stats['recomputes']
+        return {
+            'hits': stats['hits'],
+            'recomputes': recomputes,
+            'coalesced': stats['coalesced'],
+            'failures': stats['failures'],
+            'stale_served': stats['stale_served'],
+            'avg_recompute_ms': (stats['recompute_seconds'] / recomputes) * 1000 if recomputes else 0.0,
+            'last_recompute_ms': stats['last_recompute_seconds'] * 1000
+        }
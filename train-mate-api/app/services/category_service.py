@@ -1,4 +1,29 @@
+import os
+import json
+import hashlib
+import threading
+from cachetools import LRUCache
 from firebase_setup import db
+from app.services.cache_service import SingleFlightCache
+from app.services.documents_service import get_document, invalidate_document
+from app.services.executor_service import run_concurrently
+from app.services.metadata_service import get_last_modified_timestamp, stamp_last_modified, with_updated_at, add_tombstone
+
+DEFAULT_CATEGORIES_CACHE_TTL = int(os.getenv("DEFAULT_CATEGORIES_CACHE_TTL", 3600))
+USER_CATEGORIES_CACHE_SIZE = int(os.getenv("USER_CATEGORIES_CACHE_SIZE", 10000))
+
+# Las categorias default son las mismas para todos: se leen una vez por TTL (o hasta invalidarlas)
+def _load_default_categories():
+    return tuple({**category.to_dict(), 'id': category.id} for category in get_public_categories())
+
+_default_categories_cache = SingleFlightCache(_load_default_categories, ttl=DEFAULT_CATEGORIES_CACHE_TTL)
+# (cached default categories, digest): recomputed only when the cache reloads them
+_default_categories_version = (None, None)
+
+# uid -> (categories_last_modified, categories). An entry is reused while the user's
+# categories_last_modified hasn't changed. The cached dicts are shared: read-only.
+_user_categories = LRUCache(maxsize=USER_CATEGORIES_CACHE_SIZE)
+_user_categories_lock = threading.Lock()
 
 # Guardar categoría
 def save_category(name, icon, isCustom, owner):
@@ -10,7 +35,12 @@ def save_category(name, icon, isCustom, owner):
             'isCustom': isCustom,
             'owner': owner
         }
-        category_ref.set(category_data)
+        batch = db.batch()
+        batch.set(category_ref, with_updated_at(category_data))
+        if owner and owner != 'default':
+            stamp_last_modified(batch, owner, 'categories')
+        batch.commit()
+        invalidate_categories_cache(owner)
         category_data['id'] = category_ref.id  # Añadir el ID generado al objeto de datos
         return True, category_data  # Retornar el objeto completo con el ID
     except Exception as e:
@@ -33,33 +63,72 @@ def get_personalized_categories(uid):
         print(f"Error fetching categories: {e}")
         return []
     
+def _get_user_categories(uid):
+    last_modified = get_last_modified_timestamp(uid, 'categories')
+    if last_modified is not None:
+        with _user_categories_lock:
+            cached = _user_categories.get(uid)
+        if cached is not None and cached[0] == last_modified:
+            return cached[1]
+
+    user_categories = tuple(
+        {**category.to_dict(), 'id': category.id} for category in get_personalized_categories(uid)
+    )
+    # Without a categories_last_modified there is nothing to tell a stale entry apart
+    if last_modified is not None:
+        with _user_categories_lock:
+            _user_categories[uid] = (last_modified, user_categories)
+    return user_categories
+
 def get_categories(uid):
     try:
-        personalized_categories_ref = get_personalized_categories(uid)
-        public_categories_ref = get_public_categories()
+        # Independent reads: the user's categories and the (usually cached) default ones
+        user_categories, default_categories = run_concurrently(
+            lambda: _get_user_categories(uid),
+            _default_categories_cache.get
+        )
 
-        user_categories = [
-            {**category.to_dict(), 'id': category.id} for category in personalized_categories_ref
-        ]
-        default_categories = [
-            {**category.to_dict(), 'id': category.id} for category in public_categories_ref
-        ]
-
-        combined_categories = user_categories + default_categories
+        combined_categories = [*user_categories, *default_categories]
         return combined_categories
     except Exception as e:
         print(f"Error fetching categories: {e}")
         return []
+
+def get_default_categories_version():
+    # Digest of the default categories, so a change in them shows up in the categories ETag
+    global _default_categories_version
+    default_categories = _default_categories_cache.get()
+    cached_categories, version = _default_categories_version
+    if cached_categories is not default_categories:
+        payload = json.dumps(default_categories, sort_keys=True, default=str)
+        version = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        _default_categories_version = (default_categories, version)
+    return version
+
+def invalidate_categories_cache(owner):
+    # Drops this process' cached categories of owner ('default' -> the shared default categories)
+    if owner == 'default':
+        _default_categories_cache.invalidate()
+        return
+    with _user_categories_lock:
+        _user_categories.pop(owner, None)
+
+def clear_categories_cache():
+    _default_categories_cache.clear()
+    with _user_categories_lock:
+        _user_categories.clear()
+
+def get_default_categories_cache_stats():
+    return _default_categories_cache.stats()
     
 def get_category_by_id(uid, category_id):
     try:
-        category_ref = db.collection('categories').document(category_id)
-        category = category_ref.get()
+        category = get_document(db.collection('categories').document(category_id))
 
-        if not category.exists or (category.to_dict().get('owner') != uid and category.to_dict().get('owner') != 'default'):
+        if not category or (category.get('owner') != uid and category.get('owner') != 'default'):
             return None
 
-        return category.to_dict()
+        return category
     except Exception as e:
         print(f"Error fetching category by ID: {e}")
         return None
@@ -73,7 +142,13 @@ def delete_category(uid, category_id):
         if not category.exists or category.to_dict().get('owner') != uid:
             return False
 
-        category_ref.delete()
+        batch = db.batch()
+        batch.delete(category_ref)
+        add_tombstone(batch, uid, 'categories', category_id)
+        stamp_last_modified(batch, uid, 'categories')
+        batch.commit()
+        invalidate_document(category_ref)
+        invalidate_categories_cache(uid)
         return True
 
     except Exception as e:
@@ -88,7 +163,12 @@ def update_category(uid, category_id, update_data):
         if not category.exists or category.to_dict().get('owner') != uid:
             return False
 
-        category_ref.update(update_data)
+        batch = db.batch()
+        batch.update(category_ref, with_updated_at(update_data))
+        stamp_last_modified(batch, uid, 'categories')
+        batch.commit()
+        invalidate_document(category_ref)
+        invalidate_categories_cache(uid)
         return True
 
     except Exception as e:
@@ -1,13 +1,18 @@
+import re
 from firebase_setup import db
+from app.services.documents_service import commit_in_batches
+
+PHYSICAL_CHALLENGES = ['Consistency is Key', 'Muscle Up!', 'Fat Loss Focus', 'Weight Watcher', 'Progress Pioneer']
+WORKOUTS_CHALLENGES = ['Category Master', 'Endurance Streak', 'Strength Specialist', 'Sports Enthusiast', 'Calorie Crusher', 'Fitness Variety', 'Coach\'s Pick', 'Long Haul', 'Workout Titan']
+
+CHALLENGES_BY_COLLECTION = {
+    'user_physical_challenges': PHYSICAL_CHALLENGES,
+    'user_workouts_challenges': WORKOUTS_CHALLENGES
+}
 
 def get_challenges_list_service(uid, type):
     try:
         user_ref = db.collection('challenges').document(uid)
-        user_doc = user_ref.get()
-
-        # Si el documento no existe, lo creamos
-        if not user_doc.exists:
-            user_ref.set({})
 
         if type == 'physical':
             challenges = user_ref.collection('user_physical_challenges').stream()
@@ -31,36 +36,50 @@ def get_challenges_list_service(uid, type):
         print(f"Error getting challenges: {e}")
         return None
 
+def challenge_slug(challenge_name):
+    # Stable document id for a challenge, e.g. "Coach's Pick" -> "coachs-pick"
+    return re.sub(r'[^a-z0-9]+', '-', challenge_name.lower().replace("'", '')).strip('-')
+
 def create_challenges_service(uid):
+    # Idempotent: challenge docs are keyed by their slug, so seeding again only fills the gaps.
+    # Costs a single batched read when the user already has every challenge.
     try:
         user_ref = db.collection('challenges').document(uid)
-        user_doc = user_ref.get()
 
-        if not user_doc.exists:
-            user_ref.set({})
-        
-        physical_challenges = user_ref.collection('user_physical_challenges')
-
-        physical_challenges_list = ['Consistency is Key', 'Muscle Up!', 'Fat Loss Focus', 'Weight Watcher', 'Progress Pioneer']
+        challenge_refs = {
+            (collection_name, challenge): user_ref.collection(collection_name).document(challenge_slug(challenge))
+            for collection_name, challenges_list in CHALLENGES_BY_COLLECTION.items()
+            for challenge in challenges_list
+        }
+        existing_paths = {snapshot.reference.path for snapshot in db.get_all(list(challenge_refs.values())) if snapshot.exists}
+        missing = [key for key, challenge_ref in challenge_refs.items() if challenge_ref.path not in existing_paths]
+        if not missing:
+            return True
 
-        for challenge in physical_challenges_list:
-            physical_challenges.document().set({
-                'challenge': challenge,
-                'state': False
-            })
-        
-        workouts_challenges = user_ref.collection('user_workouts_challenges')
+        writes = []
+        for collection_name in dict.fromkeys(collection_name for collection_name, _ in missing):
+            # Challenges seeded with auto-generated ids: keep their state and drop the duplicates
+            slugs = {challenge_slug(challenge) for challenge in CHALLENGES_BY_COLLECTION[collection_name]}
+            legacy_states = {}
+            for challenge_doc in user_ref.collection(collection_name).stream():
+                if challenge_doc.id in slugs:
+                    continue
+                challenge_data = challenge_doc.to_dict() or {}
+                challenge = challenge_data.get('challenge')
+                legacy_states[challenge] = legacy_states.get(challenge, False) or challenge_data.get('state') is True
+                writes.append((challenge_doc.reference, None))
 
-        workouts_challenges_list = ['Category Master', 'Endurance Streak', 'Strength Specialist', 'Sports Enthusiast', 'Calorie Crusher', 'Fitness Variety', 'Coach\'s Pick', 'Long Haul', 'Workout Titan']
+            for missing_collection, challenge in missing:
+                if missing_collection == collection_name:
+                    writes.append((challenge_refs[(collection_name, challenge)], {
+                        'challenge': challenge,
+                        'state': legacy_states.get(challenge, False)
+                    }))
 
-        for challenge in workouts_challenges_list:
-            workouts_challenges.document().set({
-                'challenge': challenge,
-                'state': False
-            })
-            
+        writes.append((user_ref, {}))
+        commit_in_batches(writes)
         return True
-            
+
     except Exception as e:
         print(f"Error creating challenges: {e}")
-        return False
\ No newline at end of file
+        return False
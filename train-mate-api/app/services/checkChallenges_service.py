@@ -1,70 +1,134 @@
+from firebase_admin import firestore
 from firebase_setup import db
-from datetime import datetime, timedelta
+from app.services.documents_service import get_documents_by_ids
+from app.services.job_queue_service import register_job, enqueue_job
+from app.services.challenges_service import challenge_slug, create_challenges_service
+from datetime import datetime, timedelta, timezone
+from array import array
+from bisect import bisect_left
+from math import isnan
+
+def complete_challenges(uid, collection_name, challenge_updates):
+    # Marks the completed challenges with a single batched write. Only the completed
+    # challenges are read (direct reads by slug id), and the ones already completed are
+    # skipped, so no changes => no writes.
+    completed_names = [challenge_name for challenge_name, completed in challenge_updates.items() if completed]
+    if not completed_names:
+        return 0
+
+    user_challenges_ref = db.collection('challenges').document(uid).collection(collection_name)
+    challenge_refs = [user_challenges_ref.document(challenge_slug(challenge_name)) for challenge_name in completed_names]
+    snapshots = list(db.get_all(challenge_refs))
+    if not all(snapshot.exists for snapshot in snapshots):
+        # Challenges seeded before slug ids (or never seeded): migrate them and read again
+        create_challenges_service(uid)
+        snapshots = list(db.get_all(challenge_refs))
+
+    batch = db.batch()
+    updated = 0
+    for snapshot in snapshots:
+        if not snapshot.exists or (snapshot.to_dict() or {}).get('state') is True:
+            continue
+        batch.update(snapshot.reference, {'state': True})
+        updated += 1
+
+    if updated:
+        batch.commit()
+    return updated
+
+# Physical challenges are evaluated over one 60-day fetch. The entries are sorted once into
+# parallel arrays (one per metric) and the 30/14-day windows are found by bisecting on the date.
+PHYSICAL_SERIES_FIELDS = ('weight', 'body_fat', 'body_muscle')
+PHYSICAL_CHALLENGE_WINDOW_DAYS = 60
+
+def _to_timestamp(date):
+    # Firestore compares naive datetimes as UTC
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.timestamp()
+
+def _metric_value(value):
+    return float('nan') if value is None else float(value)
+
+def build_physical_series(entries):
+    # entries: dicts with 'date' and the PHYSICAL_SERIES_FIELDS; missing values are stored as NaN
+    entries = sorted(entries, key=lambda entry: _to_timestamp(entry['date']))
+    series = {'timestamps': array('d', (_to_timestamp(entry['date']) for entry in entries))}
+    for field in PHYSICAL_SERIES_FIELDS:
+        series[field] = array('d', (_metric_value(entry.get(field)) for entry in entries))
+    return series
+
+def window_start(series, start_date):
+    # Index of the first entry on or after start_date
+    return bisect_left(series['timestamps'], _to_timestamp(start_date))
+
+def _present(values):
+    return [value for value in values if not isnan(value)]
+
+def consistency_is_key(timestamps, start):
+    # 7 entries in a row, each at most one day after the previous one
+    consecutive_days = 0
+    for i in range(start, len(timestamps) - 1):
+        if timestamps[i + 1] - timestamps[i] <= 86400:
+            consecutive_days += 1
+        else:
+            consecutive_days = 0
+        if consecutive_days >= 6:
+            return True
+    return False
+
+def muscle_up(body_muscle, start):
+    values = _present(body_muscle[start:])
+    return bool(values) and max(values) - min(values) >= 2
+
+def fat_loss_focus(body_fat, start):
+    values = _present(body_fat[start:])
+    return bool(values) and values[0] - values[-1] >= 1
+
+def weight_watcher(weight, start):
+    values = _present(weight[start:])
+    return bool(values) and max(values) - min(values) <= 0.5
+
+def progress_pioneer(timestamps, start):
+    return len(timestamps) - start >= 30
+
+def evaluate_physical_challenges(series, date_obj):
+    month_start = window_start(series, date_obj - timedelta(days=30))
+    two_weeks_start = window_start(series, date_obj - timedelta(days=14))
+    sixty_days_start = window_start(series, date_obj - timedelta(days=PHYSICAL_CHALLENGE_WINDOW_DAYS))
+
+    rules = {
+        # 7 consecutive days
+        'Consistency is Key': consistency_is_key(series['timestamps'], month_start),
+        # Increase muscle by 2 kg in a month
+        'Muscle Up!': muscle_up(series['body_muscle'], month_start),
+        # Decrease body fat by 1% in two weeks
+        'Fat Loss Focus': fat_loss_focus(series['body_fat'], two_weeks_start),
+        # Stable weight within 0.5 kg over a month
+        'Weight Watcher': weight_watcher(series['weight'], month_start),
+        # 30 entries within 60 days
+        'Progress Pioneer': progress_pioneer(series['timestamps'], sixty_days_start)
+    }
+    return {challenge_name: True for challenge_name, completed in rules.items() if completed}
 
 def check_and_update_physical_challenges(uid, date):
     try:
         # References
         user_ref = db.collection('physical_data').document(uid)
         user_physical_data_ref = user_ref.collection('user_physical_data')
-        user_challenges_ref = db.collection('challenges').document(uid).collection('user_physical_challenges')
         
         # Convert date string to datetime object
         date_obj = datetime.strptime(date, '%Y-%m-%d')
         
-        # Fetch past 30 days of data
-        start_date = date_obj - timedelta(days=30)
+        # One fetch covering the widest window (60 days)
+        start_date = date_obj - timedelta(days=PHYSICAL_CHALLENGE_WINDOW_DAYS)
         recent_entries = user_physical_data_ref.where('date', '>=', start_date).stream()
-        
-        # Calculate metrics
-        entries = list(recent_entries)
-        muscle_changes = [entry.get('body_muscle') for entry in entries]
-        fat_changes = [entry.get('body_fat') for entry in entries]
-        weight_changes = [entry.get('weight') for entry in entries]
-        days_logged = len(entries)
-        
-        # Challenges states
-        challenge_updates = {}
-        # Challenge 1: Consistency is Key - 7 consecutive days
-        if days_logged >= 7:
-            entries.sort(key=lambda entry: entry.get('date').timestamp())
-            consecutive_days = 0
-            for i in range(len(entries) - 1):
-                print(f"Date: {entries[i].get('date')}")
-                if (entries[i + 1].get('date').timestamp() - entries[i].get('date').timestamp()) <= 86400:
-                    consecutive_days += 1
-                else:
-                    consecutive_days = 0
-                if consecutive_days >= 6:
-                    challenge_updates['Consistency is Key'] = True
-                    break 
-
-        # Challenge 2: Muscle Up! - Increase muscle by 2 kg in a month
-        if muscle_changes and (max(muscle_changes) - min(muscle_changes) >= 2):
-            challenge_updates['Muscle Up!'] = True
-
-        # Challenge 3: Fat Loss Focus - Decrease body fat by 1% in two weeks
-        two_weeks_ago = date_obj - timedelta(days=14)
-        two_week_entries = user_physical_data_ref.where('date', '>=', two_weeks_ago).stream()
-        fat_changes_two_weeks = [entry.get('body_fat') for entry in two_week_entries]
-        if fat_changes_two_weeks and (fat_changes_two_weeks[0] - fat_changes_two_weeks[-1] >= 1):
-            challenge_updates['Fat Loss Focus'] = True
-
-        # Challenge 4: Weight Watcher - Stable weight within 0.5 kg over a month
-        if weight_changes and (max(weight_changes) - min(weight_changes) <= 0.5):
-            challenge_updates['Weight Watcher'] = True
-
-        # Challenge 5: Progress Pioneer - 30 entries within 60 days
-        sixty_days_ago = date_obj - timedelta(days=60)
-        entries_last_60_days = user_physical_data_ref.where('date', '>=', sixty_days_ago).stream()
-        if len(list(entries_last_60_days)) >= 30:
-            challenge_updates['Progress Pioneer'] = True
+        series = build_physical_series(entry.to_dict() for entry in recent_entries)
+
+        challenge_updates = evaluate_physical_challenges(series, date_obj)
 
         # Update challenges in the database
-        for challenge_name, completed in challenge_updates.items():
-            if completed:
-                challenge_docs = user_challenges_ref.where('challenge', '==', challenge_name).get()
-                for doc in challenge_docs:
-                    doc.reference.update({'state': True})
+        complete_challenges(uid, 'user_physical_challenges', challenge_updates)
 
         return True
 
@@ -72,113 +136,255 @@ def check_and_update_physical_challenges(uid, date):
         print(f"Error updating challenges: {e}")
         return False
 
-def check_and_update_workouts_challenges(uid):
-    try:
-        # Reference to user's workout and challenge data
-        user_workouts_ref = db.collection('workouts').document(uid).collection('user_workouts')
-        user_challenges_ref = db.collection('challenges').document(uid).collection('user_workouts_challenges')
-        
-        # Fetch workouts in the last 30 days
-        date_30_days_ago = datetime.now() - timedelta(days=30)
-        recent_workouts = user_workouts_ref.where('date', '>=', date_30_days_ago).stream()
-        workouts = list(recent_workouts)
-        
-        # Counters and accumulators
-        category_count = {}
-        coach_count = set()
-        unique_exercises = set()
-        total_calories = 0
-        total_workouts = len(workouts)
-        sports_duration = 0
-        long_duration_workouts = 0
-        
-        # Process each workout
-        for workout in workouts:
-            data = workout.to_dict()
-            total_calories += data.get('total_calories', 0)
-            coach_count.add(data.get('coach'))
-            if data.get('duration', 0) >= 120:
-                long_duration_workouts += 1
-            
-            # Fetch training details
-            training_id = data.get('training_id')
-            training_ref = db.collection('trainings').document(training_id)
-            training_doc = training_ref.get()
-            if training_doc.exists:
-                training_data = training_doc.to_dict()
-                
-                # Fetch exercises within the training
-                exercises = training_data.get('exercises', [])
-                for exercise_id in exercises:
-                    exercise_ref = db.collection('exercises').document(exercise_id)
-                    exercise_doc = exercise_ref.get()
-                    if exercise_doc.exists:
-                        exercise_data = exercise_doc.to_dict()
-                        unique_exercises.add(exercise_data.get('name'))
-                        
-                        # Accumulate sports duration
-                        category_id = exercise_data.get('category_id')
-                        category_ref = db.collection('categories').document(category_id)
-                        category_doc = category_ref.get()
-                        if category_doc.exists:
-                            category_data = category_doc.to_dict()
-                            category_name = category_data.get('name')
-                            category_count[category_name] = category_count.get(category_name, 0) + 1
-                            
-                            # Check if category is "Sports"
-                            if category_name == "Sports":
-                                sports_duration += data.get('duration', 0)
-        
-        # Challenge updates
-        challenge_updates = {}
+# Workout challenges are evaluated over a per-user state document that keeps running
+# aggregates bucketed by day, so a new workout only adds its own contribution.
+WORKOUTS_CHALLENGE_WINDOW_DAYS = 30
+LONG_WORKOUT_MINUTES = 120
+
+def _workouts_challenge_state_ref(uid):
+    return db.collection('challenges').document(uid).collection('challenge_state').document('workouts')
+
+def _day_key(date):
+    if not isinstance(date, datetime):
+        date = datetime.now()
+    return date.strftime('%Y-%m-%d')
+
+def _empty_day():
+    return {
+        'workouts': 0,
+        'calories': 0,
+        'long_workouts': 0,
+        'sports_duration': 0,
+        'categories': {},
+        'exercises': [],
+        'coaches': [],
+        'workout_ids': []
+    }
+
+def _resolve_training_exercises(uid, training_ids):
+    # training_id -> [(exercise_name, category_name or None)], with one batched read per collection
+    if not any(training_ids):
+        return {}
+    trainings = get_documents_by_ids(f'trainings/{uid}/user_trainings', training_ids)
+    exercise_ids = [exercise_id for training in trainings.values() for exercise_id in training.get('exercises', [])]
+    exercises = get_documents_by_ids('exercises', exercise_ids)
+    categories = get_documents_by_ids('categories', [exercise.get('category_id') for exercise in exercises.values()])
 
-        # Challenge 1: Category Master
-        if len(category_count) >= 5:
-            challenge_updates["Category Master"] = True
+    training_exercises = {}
+    for training_id, training in trainings.items():
+        resolved = []
+        for exercise_id in training.get('exercises', []):
+            exercise = exercises.get(exercise_id)
+            if exercise is None:
+                continue
+            category = categories.get(exercise.get('category_id'))
+            resolved.append((exercise.get('name'), category.get('name') if category else None))
+        training_exercises[training_id] = resolved
+    return training_exercises
 
-        # Challenge 2: Endurance Streak
-        if total_workouts >= 10 and all(
-            (workouts[i + 1].to_dict().get('date') - workouts[i].to_dict().get('date')).days == 1 
-            for i in range(len(workouts) - 1)
-        ):
-            challenge_updates["Endurance Streak"] = True
+def _add_workout_to_day(day, workout_data, exercises):
+    # Workouts already counted are skipped, so a retried recheck does not count them twice
+    workout_ids = day.setdefault('workout_ids', [])
+    workout_id = workout_data.get('id')
+    if workout_id is not None:
+        if workout_id in workout_ids:
+            return
+        workout_ids.append(workout_id)
 
-        # Challenge 3: Strength Specialist
-        if category_count.get("Strength", 0) >= 20:
-            challenge_updates["Strength Specialist"] = True
+    duration = workout_data.get('duration', 0)
+    day['workouts'] += 1
+    day['calories'] += workout_data.get('total_calories', 0)
+    if duration >= LONG_WORKOUT_MINUTES:
+        day['long_workouts'] += 1
 
-        # Challenge 4: Sports Enthusiast
-        if sports_duration >= 300:  # 5 hours in minutes
-            challenge_updates["Sports Enthusiast"] = True
+    coach = workout_data.get('coach')
+    if coach not in day['coaches']:
+        day['coaches'].append(coach)
 
-        # Challenge 5: Calorie Crusher
-        if total_calories >= 5000:
-            challenge_updates["Calorie Crusher"] = True
+    for exercise_name, category_name in exercises:
+        if exercise_name not in day['exercises']:
+            day['exercises'].append(exercise_name)
+        if category_name is not None:
+            day['categories'][category_name] = day['categories'].get(category_name, 0) + 1
+            if category_name == "Sports":
+                day['sports_duration'] += duration
 
-        # Challenge 6: Fitness Variety
-        if len(unique_exercises) >= 10:
-            challenge_updates["Fitness Variety"] = True
+def _prune_days(days, now):
+    cutoff = _day_key(now - timedelta(days=WORKOUTS_CHALLENGE_WINDOW_DAYS))
+    return {day: aggregates for day, aggregates in days.items() if day >= cutoff}
 
-        # Challenge 7: Coach's Pick
-        if len(coach_count) >= 3:
-            challenge_updates["Coach's Pick"] = True
+def rebuild_workouts_challenge_state(uid, training_exercises=None):
+    # Full recompute from the last 30 days of workouts, used when there is no state yet
+    # or after corrections (e.g. a deleted workout). training_exercises: trainings already
+    # resolved by the caller, only the rest are read.
+    now = datetime.now()
+    user_workouts_ref = db.collection('workouts').document(uid).collection('user_workouts')
+    recent_workouts = user_workouts_ref.where('date', '>=', now - timedelta(days=WORKOUTS_CHALLENGE_WINDOW_DAYS)).stream()
+    workouts = [{**workout.to_dict(), 'id': workout.id} for workout in recent_workouts]
 
-        # Challenge 8: Long Haul
-        if long_duration_workouts > 0:
-            challenge_updates["Long Haul"] = True
+    training_exercises = dict(training_exercises or {})
+    missing_training_ids = [workout.get('training_id') for workout in workouts if workout.get('training_id') not in training_exercises]
+    training_exercises.update(_resolve_training_exercises(uid, missing_training_ids))
 
-        # Challenge 9: Workout Titan
-        if total_workouts >= 30:
-            challenge_updates["Workout Titan"] = True
+    days = {}
+    for workout_data in workouts:
+        day = days.setdefault(_day_key(workout_data.get('date')), _empty_day())
+        _add_workout_to_day(day, workout_data, training_exercises.get(workout_data.get('training_id'), []))
+
+    days = _prune_days(days, now)
+    _workouts_challenge_state_ref(uid).set({'days': days, 'updated_at': now})
+    return days
+
+@firestore.transactional
+def _apply_workouts_in_transaction(transaction, state_ref, workouts, training_exercises):
+    # Read-modify-write of the state doc: overlapping rechecks (other workers or processes)
+    # make Firestore retry this instead of overwriting each other's days
+    state = state_ref.get(transaction=transaction)
+    if not state.exists:
+        return None
+
+    now = datetime.now()
+    days = (state.to_dict() or {}).get('days', {})
+
+    for workout_data in workouts:
+        day = days.setdefault(_day_key(workout_data.get('date')), _empty_day())
+        _add_workout_to_day(day, workout_data, training_exercises.get(workout_data.get('training_id'), []))
+
+    days = _prune_days(days, now)
+    transaction.set(state_ref, {'days': days, 'updated_at': now})
+    return days
+
+def apply_workouts_to_challenge_state(uid, workouts):
+    # The trainings/exercises are resolved before the transaction, so a retry only reads the state doc again
+    training_exercises = _resolve_training_exercises(uid, [workout_data.get('training_id') for workout_data in workouts])
+    days = _apply_workouts_in_transaction(db.transaction(), _workouts_challenge_state_ref(uid), workouts, training_exercises)
+    if days is None:
+        # The new workouts are already stored, so the rebuild includes them
+        return rebuild_workouts_challenge_state(uid, training_exercises)
+    return days
+
+def evaluate_workouts_challenges(days):
+    # Pure function over the per-day aggregates => {challenge_name: True}
+    category_count = {}
+    coaches = set()
+    unique_exercises = set()
+    total_calories = 0
+    total_workouts = 0
+    sports_duration = 0
+    long_duration_workouts = 0
+
+    for aggregates in days.values():
+        total_workouts += aggregates.get('workouts', 0)
+        total_calories += aggregates.get('calories', 0)
+        sports_duration += aggregates.get('sports_duration', 0)
+        long_duration_workouts += aggregates.get('long_workouts', 0)
+        coaches.update(aggregates.get('coaches', []))
+        unique_exercises.update(aggregates.get('exercises', []))
+        for category_name, count in aggregates.get('categories', {}).items():
+            category_count[category_name] = category_count.get(category_name, 0) + count
+
+    challenge_updates = {}
+
+    # Challenge 1: Category Master
+    if len(category_count) >= 5:
+        challenge_updates["Category Master"] = True
+
+    # Challenge 2: Endurance Streak - one workout per day, every day, at least 10 workouts
+    day_keys = sorted(days)
+    if total_workouts >= 10 and all(days[day].get('workouts', 0) == 1 for day in day_keys) and all(
+        (datetime.strptime(next_day, '%Y-%m-%d') - datetime.strptime(day, '%Y-%m-%d')).days == 1
+        for day, next_day in zip(day_keys, day_keys[1:])
+    ):
+        challenge_updates["Endurance Streak"] = True
+
+    # Challenge 3: Strength Specialist
+    if category_count.get("Strength", 0) >= 20:
+        challenge_updates["Strength Specialist"] = True
+
+    # Challenge 4: Sports Enthusiast
+    if sports_duration >= 300:  # 5 hours in minutes
+        challenge_updates["Sports Enthusiast"] = True
+
+    # Challenge 5: Calorie Crusher
+    if total_calories >= 5000:
+        challenge_updates["Calorie Crusher"] = True
+
+    # Challenge 6: Fitness Variety
+    if len(unique_exercises) >= 10:
+        challenge_updates["Fitness Variety"] = True
+
+    # Challenge 7: Coach's Pick
+    if len(coaches) >= 3:
+        challenge_updates["Coach's Pick"] = True
+
+    # Challenge 8: Long Haul
+    if long_duration_workouts > 0:
+        challenge_updates["Long Haul"] = True
+
+    # Challenge 9: Workout Titan
+    if total_workouts >= 30:
+        challenge_updates["Workout Titan"] = True
+
+    return challenge_updates
+
+def check_and_update_workouts_challenges(uid, workouts=None):
+    try:
+        if workouts:
+            days = apply_workouts_to_challenge_state(uid, workouts)
+        else:
+            days = rebuild_workouts_challenge_state(uid)
+
+        challenge_updates = evaluate_workouts_challenges(days)
 
         # Update challenges in Firestore
-        for challenge_name, completed in challenge_updates.items():
-            if completed:
-                challenge_query = user_challenges_ref.where('challenge', '==', challenge_name).limit(1).stream()
-                for challenge_doc in challenge_query:
-                    challenge_doc.reference.update({'state': True})
+        complete_challenges(uid, 'user_workouts_challenges', challenge_updates)
         return True
 
     except Exception as e:
         print(f"Error updating workout challenges: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+# Background recheck, so saves don't wait for the challenge evaluation.
+# A burst of saves for the same user collapses into one job.
+RECHECK_CHALLENGES_JOB = 'recheck_challenges'
+
+def recheck_user_challenges(uid, physical_dates=None, workouts=None, rebuild_workouts=False):
+    # Raises if a check failed, so a persistent queue retries the job. Retrying is safe:
+    # completed challenges are skipped and workouts already in the state are not added again.
+    failed = []
+    for date in physical_dates or []:
+        if not check_and_update_physical_challenges(uid, date):
+            failed.append(f'physical data {date}')
+
+    if rebuild_workouts:
+        # A rebuild already includes any new workouts
+        if not check_and_update_workouts_challenges(uid):
+            failed.append('workouts')
+    elif workouts:
+        if not check_and_update_workouts_challenges(uid, workouts):
+            failed.append('workouts')
+
+    if failed:
+        raise RuntimeError(f"Challenges recheck failed for {uid}: {', '.join(failed)}")
+
+def merge_recheck_payloads(pending, new):
+    physical_dates = list(pending.get('physical_dates', []))
+    physical_dates += [date for date in new.get('physical_dates', []) if date not in physical_dates]
+    return {
+        'uid': pending['uid'],
+        'physical_dates': physical_dates,
+        'workouts': pending.get('workouts', []) + new.get('workouts', []),
+        'rebuild_workouts': pending.get('rebuild_workouts', False) or new.get('rebuild_workouts', False)
+    }
+
+register_job(RECHECK_CHALLENGES_JOB, recheck_user_challenges, merge_recheck_payloads)
+
+def enqueue_challenges_recheck(uid, physical_date=None, workout=None, rebuild_workouts=False):
+    payload = {
+        'uid': uid,
+        'physical_dates': [physical_date] if physical_date else [],
+        'workouts': [workout] if workout else [],
+        'rebuild_workouts': rebuild_workouts
+    }
+    return enqueue_job(RECHECK_CHALLENGES_JOB, uid, payload)
@@ -0,0 +1,136 @@
+import os
+import copy
+import threading
+from cachetools import LRUCache
+from flask import g, has_app_context
+from firebase_setup import db
+from app.services.executor_service import run_concurrently
+
+# Cantidad maxima de documentos por cada lectura batcheada (db.get_all)
+BATCH_READ_SIZE = 100
+
+# Firestore permite hasta 500 escrituras por batch
+MAX_BATCH_WRITES = 500
+
+# Paths of parent docs (e.g. workouts/{uid}) already known to exist in this process
+PARENT_DOCUMENT_CACHE_SIZE = int(os.getenv("PARENT_DOCUMENT_CACHE_SIZE", 10000))
+_parent_documents = LRUCache(maxsize=PARENT_DOCUMENT_CACHE_SIZE)
+_parent_documents_lock = threading.Lock()
+
+# Request-scoped identity map: document path -> dict (None if the doc doesn't exist).
+# It lives on flask.g, so it is dropped at the end of every request. run_concurrently shares g
+# with the pool threads: the cache is created and its stats updated under a lock.
+_request_cache_lock = threading.Lock()
+
+def _get_request_cache():
+    if not has_app_context():
+        return None
+
+    cache = g.get('document_cache')
+    if cache is None:
+        with _request_cache_lock:
+            if 'document_cache' not in g:
+                # Stats first: whoever sees the cache can count on them
+                g.document_cache_stats = {'hits': 0, 'misses': 0}
+                g.document_cache = {}
+            cache = g.document_cache
+
+    return cache
+
+def _count_cache(result, count=1):
+    with _request_cache_lock:
+        g.document_cache_stats[result] += count
+
+def get_document_cache_stats():
+    if not has_app_context() or 'document_cache_stats' not in g:
+        return {'hits': 0, 'misses': 0}
+    with _request_cache_lock:
+        return dict(g.document_cache_stats)
+
+def get_document(document_ref):
+    cache = _get_request_cache()
+    key = document_ref.path
+
+    if cache is not None and key in cache:
+        _count_cache('hits')
+        return copy.deepcopy(cache[key])
+
+    snapshot = document_ref.get()
+    data = snapshot.to_dict() if snapshot.exists else None
+
+    if cache is not None:
+        _count_cache('misses')
+        cache[key] = data
+
+    return copy.deepcopy(data)
+
+def invalidate_document(document_ref):
+    cache = _get_request_cache()
+    if cache is not None:
+        cache.pop(document_ref.path, None)
+
+def get_documents_by_ids(collection_path, document_ids):
+    # Dedup keeping order, ignoring empty ids
+    unique_ids = [doc_id for doc_id in dict.fromkeys(document_ids) if doc_id]
+    cache = _get_request_cache()
+
+    documents = {}
+    missing_ids = []
+    for doc_id in unique_ids:
+        key = f'{collection_path}/{doc_id}'
+        if cache is not None and key in cache:
+            _count_cache('hits')
+            if cache[key] is not None:
+                documents[doc_id] = copy.deepcopy(cache[key])
+        else:
+            missing_ids.append(doc_id)
+
+    collection_ref = db.collection(collection_path)
+
+    def fetch_chunk(chunk):
+        refs = [collection_ref.document(doc_id) for doc_id in chunk]
+        return {snapshot.id: snapshot.to_dict() for snapshot in db.get_all(refs) if snapshot.exists}
+
+    # Chunks are independent reads: fetched in parallel
+    chunks = [missing_ids[start:start + BATCH_READ_SIZE] for start in range(0, len(missing_ids), BATCH_READ_SIZE)]
+    results = run_concurrently(*[lambda chunk=chunk: fetch_chunk(chunk) for chunk in chunks])
+
+    for chunk, fetched in zip(chunks, results):
+        for doc_id in chunk:
+            data = fetched.get(doc_id)
+            if cache is not None:
+                _count_cache('misses')
+                cache[f'{collection_path}/{doc_id}'] = data
+            if data is not None:
+                documents[doc_id] = copy.deepcopy(data) if cache is not None else data
+
+    return documents
+
+def commit_in_batches(writes):
+    # writes: list of (document_ref, data); data=None deletes the document
+    for start in range(0, len(writes), MAX_BATCH_WRITES):
+        batch = db.batch()
+        for document_ref, data in writes[start:start + MAX_BATCH_WRITES]:
+            if data is None:
+                batch.delete(document_ref)
+            else:
+                batch.set(document_ref, data)
+        batch.commit()
+
+def ensure_parent_document(document_ref):
+    # Makes sure the parent doc of a user's subcollection exists, without reading it:
+    # a blind merge write the first time the path is seen, nothing afterwards.
+    key = document_ref.path
+    with _parent_documents_lock:
+        if key in _parent_documents:
+            return False
+
+    document_ref.set({}, merge=True)
+
+    with _parent_documents_lock:
+        _parent_documents[key] = True
+    return True
+
+def clear_parent_documents_cache():
+    with _parent_documents_lock:
+        _parent_documents.clear()
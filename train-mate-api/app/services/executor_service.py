@@ -0,0 +1,71 @@
+import os
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from flask import g, has_app_context
+
+# Shared pool used to issue independent Firestore reads of one request in parallel.
+#   FANOUT_MAX_WORKERS         -> threads in the process-wide pool
+#   FANOUT_REQUEST_CONCURRENCY -> reads of a single request in flight at the same time
+FANOUT_MAX_WORKERS = int(os.getenv("FANOUT_MAX_WORKERS", 16))
+FANOUT_REQUEST_CONCURRENCY = int(os.getenv("FANOUT_REQUEST_CONCURRENCY", 4))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Set inside the pool threads: a fan-out started from a fan-out task runs inline, so tasks
+# never wait on the pool they are running in
+_in_fanout = contextvars.ContextVar('in_fanout', default=False)
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FANOUT_MAX_WORKERS, thread_name_prefix='fanout')
+        return _executor
+
+def shutdown_executor(wait=True):
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+def _request_semaphore():
+    # One limit per request (kept on flask.g); outside of a request, one per call
+    if not has_app_context():
+        return threading.BoundedSemaphore(FANOUT_REQUEST_CONCURRENCY)
+    if 'fanout_semaphore' not in g:
+        g.fanout_semaphore = threading.BoundedSemaphore(FANOUT_REQUEST_CONCURRENCY)
+    return g.fanout_semaphore
+
+def _run_task(fn):
+    _in_fanout.set(True)
+    return fn()
+
+def run_concurrently(*calls):
+    # Runs the no-arg callables in parallel and returns their results in the same order.
+    # Every call finishes before returning; if any failed, the first failure (in call
+    # order) is raised. The tasks see the caller's context (flask app context included).
+    if len(calls) <= 1 or _in_fanout.get():
+        return [call() for call in calls]
+
+    semaphore = _request_semaphore()
+    executor = get_executor()
+    futures = []
+    for call in calls:
+        semaphore.acquire()
+        try:
+            future = executor.submit(contextvars.copy_context().run, _run_task, call)
+        except Exception:
+            semaphore.release()
+            raise
+        future.add_done_callback(lambda _: semaphore.release())
+        futures.append(future)
+
+    wait(futures)
+    for future in futures:
+        error = future.exception()
+        if error is not None:
+            raise error
+    return [future.result() for future in futures]
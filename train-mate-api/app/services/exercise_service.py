@@ -1,6 +1,52 @@
+from firebase_admin import firestore
 from firebase_setup import db, storage_client
 from urllib.parse import urlparse, unquote
 from app.services.category_service import get_category_by_id
+from app.services.documents_service import MAX_BATCH_WRITES, get_document, get_documents_by_ids, invalidate_document
+from app.services.metadata_service import UPDATED_AT_FIELD, stamp_last_modified
+from app.services.exercise_usage_service import sync_exercise_usage, delete_exercise_usage
+from app.services.pagination_service import MAX_PAGE_SIZE, paginate
+
+# Orden de los listados paginados de ejercicios publicos
+EXERCISE_ORDER_FIELDS = {
+    'name': ['name'],
+    'id': []
+}
+
+# Campos que devuelve el listado del catalogo (get_all_exercises); el resto no se descarga
+EXERCISE_LISTING_FIELDS = ['name', 'calories_per_hour', 'public']
+
+def _trainings_embedding_exercise(uid, exercise_id, exercise_data):
+    # Trainings (and the workouts listing) embed the exercise docs: the owner's trainings that use
+    # it, and for public exercises every user's (collection group query)
+    if exercise_data.get('public'):
+        trainings_query = db.collection_group('user_trainings')
+    else:
+        trainings_query = db.collection('trainings').document(uid).collection('user_trainings')
+    trainings = trainings_query.where('exercises', 'array_contains', exercise_id).select([]).stream()
+    return [training.reference for training in trainings]
+
+def _commit_with_trainings_stamps(uid, write, training_refs):
+    # The exercise write plus, for the trainings that embed it, a new updated_at (so /api/sync
+    # sends them again) and their owners' trainings_last_modified (so the ETags change).
+    # Several batches past 500 writes.
+    uids = {uid} | {training_ref.parent.parent.id for training_ref in training_refs}
+    writes = [write]
+    writes += [
+        lambda batch, training_ref=training_ref: batch.update(training_ref, {UPDATED_AT_FIELD: firestore.SERVER_TIMESTAMP})
+        for training_ref in training_refs
+    ]
+    writes += [
+        lambda batch, user_id=user_id: stamp_last_modified(batch, user_id, 'trainings')
+        for user_id in sorted(uids)
+    ]
+    for start in range(0, len(writes), MAX_BATCH_WRITES):
+        batch = db.batch()
+        for add_write in writes[start:start + MAX_BATCH_WRITES]:
+            add_write(batch)
+        batch.commit()
+    for training_ref in training_refs:
+        invalidate_document(training_ref)
 
 # Save Exercise
 def save_exercise(uid, name, calories_per_hour, public, category_id, training_muscle, image_url):
@@ -27,21 +73,31 @@ def save_exercise(uid, name, calories_per_hour, public, category_id, training_mu
         return None
 
 # Get Exercises (User-specific, with optional public filter)
-def get_exercises(uid, show_public):
+# Public exercises are paged (at most MAX_PAGE_SIZE per call); returns (exercises, next_cursor)
+def get_exercises(uid, show_public, limit=MAX_PAGE_SIZE, cursor=None, order_by='name'):
     try:
         exercises_ref = db.collection('exercises')
         if show_public:
-            # Fetch all public exercises
-            exercises = exercises_ref.where('public', '==', True).stream()
+            # Fetch one page of public exercises
+            exercises, next_cursor = get_public_exercises_page(limit, cursor, order_by)
         else:
             # Fetch exercises created by the user
-            exercises = exercises_ref.where('owner', '==', uid).stream()
+            exercises, next_cursor = exercises_ref.where('owner', '==', uid).stream(), None
 
-        return [{"id": exercise.id, **exercise.to_dict()} for exercise in exercises]  # Añadimos el exercise_id
+        return [{"id": exercise.id, **exercise.to_dict()} for exercise in exercises], next_cursor  # Añadimos el exercise_id
 
+    except ValueError:
+        raise
     except Exception as e:
         print(f"Error getting exercises from Firestore: {e}")
-        return []
+        return [], None
+
+def get_public_exercises_page(limit=MAX_PAGE_SIZE, cursor=None, order_by='name', field_paths=None):
+    # Stable order by name (doc id as tiebreaker) or by doc id only.
+    # field_paths: fetch only these fields instead of the full documents
+    query = db.collection('exercises').where('public', '==', True)
+    return paginate(query, EXERCISE_ORDER_FIELDS[order_by], limit, cursor,
+                    direction=firestore.Query.ASCENDING, field_paths=field_paths)
 
 
 # Delete Exercise
@@ -66,7 +122,13 @@ def delete_exercise(uid, exercise_id):
             blob = bucket.blob(file_path)
             blob.delete()
 
-        exercise_ref.delete()
+        _commit_with_trainings_stamps(
+            uid,
+            lambda batch: batch.delete(exercise_ref),
+            _trainings_embedding_exercise(uid, exercise_id, exercise_data)
+        )
+        invalidate_document(exercise_ref)
+        delete_exercise_usage(exercise_id)
         return True
 
     except Exception as e:
@@ -82,6 +144,8 @@ def update_exercise(uid, exercise_id, update_data, old_image_url):
         if not exercise.exists or exercise.to_dict().get('owner') != uid:
             return False
         
+        exercise_data = exercise.to_dict()
+
         if old_image_url != None:
             bucket = storage_client.bucket("trainmate-pro.firebasestorage.app")
 
@@ -92,17 +156,23 @@ def update_exercise(uid, exercise_id, update_data, old_image_url):
             blob = bucket.blob(file_path)
             blob.delete()
 
-        exercise_ref.update(update_data)
+        _commit_with_trainings_stamps(
+            uid,
+            lambda batch: batch.update(exercise_ref, update_data),
+            _trainings_embedding_exercise(uid, exercise_id, exercise_data)
+        )
+        invalidate_document(exercise_ref)
+        sync_exercise_usage(exercise_id, update_data)
         return True
 
     except Exception as e:
         print(f"Error updating exercise in Firestore: {e}")
         return False
 
-def get_all_exercises():
+def get_all_exercises(limit=MAX_PAGE_SIZE, cursor=None, order_by='name'):
+    # Public endpoint: always paged, so a single call can't scan the whole catalog
     try:
-        exercises_ref = db.collection('exercises').where('public', '==', True)
-        exercises = exercises_ref.stream()
+        exercises, next_cursor = get_public_exercises_page(limit, cursor, order_by, field_paths=EXERCISE_LISTING_FIELDS)
         return [
             {
                 "id": exercise.id,  # Añadimos el id del ejercicio
@@ -111,11 +181,13 @@ def get_all_exercises():
                 "public": exercise.get("public")
             }
             for exercise in exercises
-        ]
+        ], next_cursor
 
+    except ValueError:
+        raise
     except Exception as e:
         print(f"Error getting all exercises: {e}")
-        return []
+        return [], None
 
 def get_exercise_by_category_id(category_id, uid):
     try:
@@ -133,13 +205,11 @@ def get_exercise_by_id_service(exercise_id):
     try:
         # Fetch the exercise from the database using the exercise ID
         exercise_ref = db.collection('exercises').document(exercise_id)
-        exercise_doc = exercise_ref.get()
-
-        if not exercise_doc.exists:
-            return None
-
-        return exercise_doc.to_dict()
+        return get_document(exercise_ref)
 
     except Exception as e:
         print(f"Error fetching exercise by ID: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def get_exercises_by_ids(exercise_ids):
+    return get_documents_by_ids('exercises', exercise_ids)
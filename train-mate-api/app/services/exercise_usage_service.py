@@ -0,0 +1,79 @@
+from collections import Counter
+from firebase_admin import firestore
+from firebase_setup import db
+from app.services.documents_service import get_documents_by_ids, commit_in_batches
+
+# exercise_usage/{exercise_id} => {'exercise_id', 'name', 'public', 'count'}
+# 'count' is the number of times the exercise is referenced by any user's trainings.
+EXERCISE_USAGE_COLLECTION = 'exercise_usage'
+
+def increment_exercise_usage(batch, exercise_ids):
+    # Adds the counter increments to the caller's batch, so they commit together with the
+    # training that references the exercises (the exercise docs are read first)
+    usage_by_exercise = Counter(exercise_id for exercise_id in exercise_ids if exercise_id)
+    if not usage_by_exercise:
+        return
+
+    exercises = get_documents_by_ids('exercises', list(usage_by_exercise))
+    usage_ref = db.collection(EXERCISE_USAGE_COLLECTION)
+
+    for exercise_id, count in usage_by_exercise.items():
+        exercise_data = exercises.get(exercise_id)
+        if exercise_data is None:
+            continue
+        batch.set(usage_ref.document(exercise_id), {
+            'exercise_id': exercise_id,
+            'name': exercise_data.get('name'),
+            'public': exercise_data.get('public', False),
+            'count': firestore.Increment(count)
+        }, merge=True)
+
+def sync_exercise_usage(exercise_id, exercise_data):
+    # Keep the denormalized fields used by the top-K query in sync with the exercise
+    fields = {key: exercise_data[key] for key in ('name', 'public') if key in exercise_data}
+    if fields:
+        db.collection(EXERCISE_USAGE_COLLECTION).document(exercise_id).set(fields, merge=True)
+
+def delete_exercise_usage(exercise_id):
+    db.collection(EXERCISE_USAGE_COLLECTION).document(exercise_id).delete()
+
+def get_top_exercises_by_usage(limit):
+    # Requires the composite index exercise_usage(public ASC, count DESC)
+    usage_docs = (
+        db.collection(EXERCISE_USAGE_COLLECTION)
+        .where('public', '==', True)
+        .order_by('count', direction=firestore.Query.DESCENDING)
+        .limit(limit)
+        .stream()
+    )
+
+    return [
+        {
+            'exercise_id': usage.id,
+            'name': usage.get('name'),
+            'count': usage.get('count')
+        }
+        for usage in usage_docs
+    ]
+
+def rebuild_exercise_usage():
+    # Full recount over every user's trainings. Used as a backfill, not on the request path.
+    usage_by_exercise = Counter()
+    for training in db.collection_group('user_trainings').select(['exercises']).stream():
+        training_data = training.to_dict() or {}
+        usage_by_exercise.update(exercise_id for exercise_id in training_data.get('exercises', []) if exercise_id)
+
+    exercises = get_documents_by_ids('exercises', list(usage_by_exercise))
+    usage_ref = db.collection(EXERCISE_USAGE_COLLECTION)
+
+    writes = [(usage.reference, None) for usage in usage_ref.stream() if usage.id not in exercises]
+    for exercise_id, exercise_data in exercises.items():
+        writes.append((usage_ref.document(exercise_id), {
+            'exercise_id': exercise_id,
+            'name': exercise_data.get('name'),
+            'public': exercise_data.get('public', False),
+            'count': usage_by_exercise[exercise_id]
+        }))
+
+    commit_in_batches(writes)
+    return len(exercises)
@@ -1,4 +1,5 @@
 from firebase_setup import db
+from app.services.documents_service import get_document, invalidate_document, ensure_parent_document
 from datetime import datetime, timedelta
 
 # Get all goals for a user
@@ -52,10 +53,7 @@ def create_goal_service(uid, data):
 
         # Set up the goal document reference and data
         user_ref = db.collection('goals').document(uid)
-        user_doc = user_ref.get()
-
-        if not user_doc.exists:
-            user_ref.set({})
+        ensure_parent_document(user_ref)
 
         goal_ref = user_ref.collection('user_goals').document()
         
@@ -80,10 +78,9 @@ def create_goal_service(uid, data):
 def get_goal_service(uid, goal_id):
     try:
         goal_ref = db.collection('goals').document(uid).collection('user_goals').document(goal_id)
-        goal = goal_ref.get()
-        if goal.exists:
-            goal_data = goal.to_dict()
-            goal_data['id'] = goal.id
+        goal_data = get_document(goal_ref)
+        if goal_data is not None:
+            goal_data['id'] = goal_id
             return goal_data
         return None
     except Exception as e:
@@ -96,6 +93,7 @@ def complete_goal_service(uid, goal_id):
         print(goal_id)
         goal_ref = db.collection('goals').document(uid).collection('user_goals').document(goal_id)
         goal_ref.update({"completed": True})
+        invalidate_document(goal_ref)
         updated_goal = goal_ref.get().to_dict()
         updated_goal['id'] = goal_id
         return updated_goal
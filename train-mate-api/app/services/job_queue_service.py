@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# Jobs run outside of the request: the services only enqueue them.
+#   JOB_QUEUE_BACKEND=thread  -> in-process thread pool (default)
+#   JOB_QUEUE_BACKEND=sqlite  -> jobs persisted in a local sqlite file, survive restarts
+#   JOB_QUEUE_BACKEND=inline  -> run right away in the caller (debugging / scripts)
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "thread")
+JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", 4))
+JOB_QUEUE_SQLITE_PATH = os.getenv("JOB_QUEUE_SQLITE_PATH", "job_queue.sqlite3")
+JOB_QUEUE_POLL_SECONDS = float(os.getenv("JOB_QUEUE_POLL_SECONDS", 1))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+# A running sqlite job not finished after this long is taken to be from a dead process
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 600))
+
+# name -> (handler(**payload), merge(pending_payload, new_payload) -> payload)
+_jobs = {}
+
+def register_job(name, handler, merge=None):
+    _jobs[name] = (handler, merge)
+
+def _merge_payloads(name, pending, new):
+    merge = _jobs[name][1]
+    if merge is None:
+        return new
+    return merge(pending, new)
+
+def _run_job(name, payload):
+    handler = _jobs[name][0]
+    handler(**payload)
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {'enqueued': 0, 'coalesced': 0, 'completed': 0, 'failed': 0}
+
+    def add(self, key):
+        with self.lock:
+            self.values[key] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+class InlineJobQueue:
+    def __init__(self):
+        self._stats = _Stats()
+
+    def enqueue(self, name, key, payload):
+        self._stats.add('enqueued')
+        try:
+            _run_job(name, payload)
+            self._stats.add('completed')
+        except Exception as e:
+            self._stats.add('failed')
+            print(f"Error running job {name} ({key}): {e}")
+        return True
+
+    def stats(self):
+        return {'backend': 'inline', **self._stats.snapshot()}
+
+class ThreadJobQueue:
+    # A job waiting for a worker absorbs later jobs with the same key (merged payload).
+    # Once it starts running, a new job is deferred, since the running one may have read stale data:
+    # it is submitted when the running one finishes, so jobs for the same key never overlap.
+    def __init__(self, workers=JOB_QUEUE_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job-queue')
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = {}
+        self._running = set()
+        self._deferred = {}
+        self._stats = _Stats()
+
+    def enqueue(self, name, key, payload):
+        job = (name, key)
+        with self._lock:
+            waiting = self._deferred if job in self._running else self._pending
+            if job in waiting:
+                waiting[job] = _merge_payloads(name, waiting[job], payload)
+                self._stats.add('coalesced')
+                return False
+            waiting[job] = payload
+            self._stats.add('enqueued')
+            if waiting is self._deferred:
+                return True
+        self._executor.submit(self._run, name, key)
+        return True
+
+    def _run(self, name, key):
+        job = (name, key)
+        with self._lock:
+            payload = self._pending.pop(job)
+            self._running.add(job)
+        try:
+            _run_job(name, payload)
+            self._stats.add('completed')
+        except Exception as e:
+            self._stats.add('failed')
+            print(f"Error running job {name} ({key}): {e}")
+        finally:
+            with self._lock:
+                self._running.discard(job)
+                deferred = self._deferred.pop(job, None)
+                if deferred is not None:
+                    self._pending[job] = deferred
+                self._idle.notify_all()
+            if deferred is not None:
+                self._executor.submit(self._run, name, key)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending) + len(self._deferred)
+
+    def shutdown(self, wait=True):
+        if wait:
+            # Deferred jobs are submitted by the workers: drain them before closing the executor
+            with self._idle:
+                self._idle.wait_for(lambda: not (self._pending or self._running or self._deferred))
+        self._executor.shutdown(wait=wait)
+
+    def stats(self):
+        return {'backend': 'thread', 'pending': self.pending(), **self._stats.snapshot()}
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    # e.g. firestore.SERVER_TIMESTAMP: the handler falls back to the processing time
+    return None
+
+def _decode_value(value):
+    if '__datetime__' in value:
+        return datetime.fromisoformat(value['__datetime__'])
+    return value
+
+class SqliteJobQueue:
+    # Local stand-in for a persistent queue (Cloud Tasks, Pub/Sub...). Pending jobs
+    # survive a restart and failed jobs are retried up to JOB_MAX_ATTEMPTS times.
+    # Several processes can share the file: a job is claimed with a conditional update,
+    # and a running job is only taken over once its lease expired.
+    def __init__(self, path=JOB_QUEUE_SQLITE_PATH, poll_seconds=JOB_QUEUE_POLL_SECONDS, start_worker=True,
+                 lease_seconds=JOB_LEASE_SECONDS):
+        self._path = path
+        self._poll_seconds = poll_seconds
+        self._lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._stats = _Stats()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " name TEXT NOT NULL,"
+            " dedupe_key TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " claimed_at REAL)"
+        )
+        columns = [column[1] for column in self._connection.execute("PRAGMA table_info(jobs)")]
+        if 'claimed_at' not in columns:
+            # Files created before the leases: their running jobs are taken over right away
+            self._connection.execute("ALTER TABLE jobs ADD COLUMN claimed_at REAL")
+
+        self._worker = None
+        if start_worker:
+            self._worker = threading.Thread(target=self._work, name='job-queue-sqlite', daemon=True)
+            self._worker.start()
+
+    def enqueue(self, name, key, payload):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, payload FROM jobs WHERE name = ? AND dedupe_key = ? AND status = 'pending'",
+                (name, key)
+            ).fetchone()
+            if row is not None:
+                merged = _merge_payloads(name, json.loads(row[1], object_hook=_decode_value), payload)
+                self._connection.execute(
+                    "UPDATE jobs SET payload = ? WHERE id = ?",
+                    (json.dumps(merged, default=_encode_value), row[0])
+                )
+                self._stats.add('coalesced')
+                return False
+
+            self._connection.execute(
+                "INSERT INTO jobs (name, dedupe_key, payload, created_at) VALUES (?, ?, ?, ?)",
+                (name, key, json.dumps(payload, default=_encode_value), time.time())
+            )
+        self._stats.add('enqueued')
+        self._wakeup.set()
+        return True
+
+    def _claim(self):
+        # Pending jobs, and running ones whose process died (expired lease, e.g. after a crash)
+        with self._lock:
+            while True:
+                now = time.time()
+                row = self._connection.execute(
+                    "SELECT id, name, payload, attempts, status, claimed_at FROM jobs"
+                    " WHERE status = 'pending' OR (status = 'running' AND (claimed_at IS NULL OR claimed_at < ?))"
+                    " ORDER BY id LIMIT 1",
+                    (now - self._lease_seconds,)
+                ).fetchone()
+                if row is None:
+                    return None
+                job_id, name, payload, attempts, status, claimed_at = row
+                # Only if nobody (another process sharing the file) claimed it in the meantime
+                claimed = self._connection.execute(
+                    "UPDATE jobs SET status = 'running', claimed_at = ? WHERE id = ? AND status = ? AND claimed_at IS ?",
+                    (now, job_id, status, claimed_at)
+                ).rowcount
+                if claimed:
+                    return job_id, name, payload, attempts
+
+    def run_pending(self):
+        # Runs every pending job; returns how many were processed
+        processed = 0
+        while True:
+            row = self._claim()
+            if row is None:
+                return processed
+            job_id, name, payload, attempts = row
+            processed += 1
+            try:
+                _run_job(name, json.loads(payload, object_hook=_decode_value))
+            except Exception as e:
+                print(f"Error running job {name} ({job_id}): {e}")
+                status = 'failed' if attempts + 1 >= JOB_MAX_ATTEMPTS else 'pending'
+                with self._lock:
+                    self._connection.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1 WHERE id = ?",
+                        (status, job_id)
+                    )
+                if status == 'failed':
+                    self._stats.add('failed')
+                continue
+
+            with self._lock:
+                self._connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._stats.add('completed')
+
+    def _work(self):
+        while not self._stopped.is_set():
+            self.run_pending()
+            self._wakeup.wait(self._poll_seconds)
+            self._wakeup.clear()
+
+    def pending(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending'").fetchone()[0]
+
+    def shutdown(self, wait=True):
+        self._stopped.set()
+        self._wakeup.set()
+        if wait and self._worker is not None:
+            self._worker.join()
+
+    def stats(self):
+        return {'backend': 'sqlite', 'pending': self.pending(), **self._stats.snapshot()}
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def _create_job_queue(backend):
+    if backend == 'inline':
+        return InlineJobQueue()
+    if backend == 'sqlite':
+        return SqliteJobQueue()
+    return ThreadJobQueue()
+
+def get_job_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = _create_job_queue(JOB_QUEUE_BACKEND)
+        return _queue
+
+def set_job_queue(queue):
+    global _queue
+    with _queue_lock:
+        _queue = queue
+
+def enqueue_job(name, key, payload):
+    # True if a new job was queued, False if it was merged into a pending one for the same key
+    return get_job_queue().enqueue(name, key, payload)
+
+def get_job_queue_stats():
+    # None until something is enqueued: reporting must not create the queue (or its sqlite file)
+    with _queue_lock:
+        queue = _queue
+    return queue.stats() if queue is not None else None
@@ -1,42 +1,49 @@
+from firebase_admin import firestore
 from firebase_setup import db
-from datetime import datetime
-import pytz
+from app.services.documents_service import get_document, invalidate_document
+from datetime import datetime, timedelta, timezone
+import os
+
+# Per-document change tracking for /api/sync: every synced doc carries UPDATED_AT_FIELD and
+# every delete leaves a tombstone in metadata/{uid}/tombstones, kept TOMBSTONE_RETENTION_DAYS
+# (expire_at is meant for a Firestore TTL policy). Clients older than that do a full sync.
+UPDATED_AT_FIELD = 'updated_at'
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", 90))
+
+def stamp_last_modified(batch, uid, *collections):
+    # Adds the bump of the user's *_last_modified fields to the caller's batch, so the stamp is
+    # written atomically with the change itself (the server clock, not the client, decides)
+    user_ref = db.collection('metadata').document(uid)
+    batch.set(user_ref, {
+        collection + '_last_modified': firestore.SERVER_TIMESTAMP for collection in collections
+    }, merge=True)
+    invalidate_document(user_ref)
+
+def with_updated_at(data):
+    # Copy of data to write, stamped with the server time of the write
+    return {**data, UPDATED_AT_FIELD: firestore.SERVER_TIMESTAMP}
+
+def tombstones_ref(uid):
+    return db.collection('metadata').document(uid).collection('tombstones')
+
+def add_tombstone(batch, uid, collection, document_id):
+    # Records the delete in the caller's batch, so the sync can tell clients to drop the doc
+    batch.set(tombstones_ref(uid).document(f'{collection}_{document_id}'), {
+        'collection': collection,
+        'document_id': document_id,
+        'deleted_at': firestore.SERVER_TIMESTAMP,
+        'expire_at': datetime.now(timezone.utc) + timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    })
 
-def set_last_modified_timestamp(uid, collection):
-    try:
-        user_ref = db.collection('metadata').document(uid)
-        user_doc = user_ref.get()
-
-        # Si el documento no existe, lo creamos
-        if not user_doc.exists:
-            user_ref.set({})
-
-        collection_name = collection + '_last_modified'
-
-        local_tz = pytz.timezone('America/Argentina/Buenos_Aires')
-        local_time = datetime.now(local_tz)
-
-        user_ref.set({
-            collection_name: local_time
-        }, merge=True)
-    
-        return local_time
-    
-    except Exception as e:
-        print(f"Error setting last modified timestamp: {e}")
-        return False
-    
 def get_last_modified_timestamp(uid, collection):
     try:
-        user_ref = db.collection('metadata').document(uid)
-        user_doc = user_ref.get()
+        user_data = get_document(db.collection('metadata').document(uid))
 
-        if not user_doc.exists:
+        if user_data is None:
             return None
 
         collection_name = collection + '_last_modified'
-        last_modified = user_doc.get(collection_name)
-        return last_modified
+        return user_data.get(collection_name)
 
     except Exception as e:
         print(f"Error getting last modified timestamp: {e}")
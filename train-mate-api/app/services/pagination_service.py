@@ -0,0 +1,62 @@
+import json
+import base64
+from datetime import datetime
+from firebase_admin import firestore
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, max_limit=MAX_PAGE_SIZE):
+    # Raises ValueError for anything that is not a positive integer; caps it at max_limit
+    if value is None or value == '':
+        return default
+    limit = int(value)
+    if limit <= 0:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, max_limit)
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Unsupported cursor value: {value!r}")
+
+def _decode_value(value):
+    if '__datetime__' in value:
+        return datetime.fromisoformat(value['__datetime__'])
+    return value
+
+def encode_cursor(snapshot, order_fields):
+    # Opaque cursor with the values of the last returned doc for every order field (+ its id)
+    values = {field: snapshot.get(field) for field in order_fields}
+    values['__name__'] = snapshot.id
+    payload = json.dumps(values, default=_encode_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')), object_hook=_decode_value)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, dict) or '__name__' not in values:
+        raise ValueError("Invalid cursor")
+    return values
+
+def paginate(query, order_fields, limit, cursor=None, direction=firestore.Query.DESCENDING, field_paths=None):
+    # Returns (snapshots, next_cursor). The doc id is the tiebreaker, so docs sharing the same
+    # order values are neither repeated nor skipped between pages. next_cursor is None on the last page.
+    # field_paths: only these fields are fetched (field mask); the order fields are always included
+    # so the cursor can be built from the last snapshot.
+    if field_paths is not None:
+        query = query.select(list(dict.fromkeys([*field_paths, *order_fields])))
+    for field in order_fields:
+        query = query.order_by(field, direction=direction)
+    query = query.order_by('__name__', direction=direction)
+
+    if cursor:
+        query = query.start_after(decode_cursor(cursor))
+
+    # One extra doc tells whether there is a next page
+    snapshots = list(query.limit(limit + 1).stream())
+    if len(snapshots) <= limit:
+        return snapshots, None
+    return snapshots[:limit], encode_cursor(snapshots[limit - 1], order_fields)
@@ -1,14 +1,12 @@
 from firebase_setup import db
+from app.services.documents_service import ensure_parent_document
 from datetime import datetime
-from app.services.checkChallenges_service import check_and_update_physical_challenges
+from app.services.checkChallenges_service import enqueue_challenges_recheck
 
 def add_physical_data_service(uid, body_fat, body_muscle, weight, date):
     try:
         user_ref = db.collection('physical_data').document(uid)
-        user_doc = user_ref.get()
-
-        if not user_doc.exists:
-            user_ref.set({})
+        ensure_parent_document(user_ref)
 
         physical_data_ref = user_ref.collection('user_physical_data').document(date)
 
@@ -21,15 +19,19 @@ def add_physical_data_service(uid, body_fat, body_muscle, weight, date):
             'body_fat': body_fat,
             'body_muscle': body_muscle,
         })
-        
-        check_and_update_physical_challenges(uid, date)
-
-        return True
 
     except Exception as e:
         print(f"Error saving physical data: {e}")
         return False
 
+    # The physical data is already saved: a failed enqueue must not make the client retry it
+    try:
+        enqueue_challenges_recheck(uid, physical_date=date)
+    except Exception as e:
+        print(f"Error enqueuing challenges recheck: {e}")
+
+    return True
+
 def get_physical_data_service(uid):
     try:
         physical_data = []
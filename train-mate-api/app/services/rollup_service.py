@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+from firebase_admin import firestore
+from firebase_setup import db
+from app.services.documents_service import commit_in_batches
+from app.services.executor_service import run_concurrently
+
+# Pre-aggregated totals per day, ISO week and month, kept next to the source docs:
+#   {parent}/{collection}_daily/{YYYY-MM-DD}, {collection}_weekly/{YYYY-Www}, {collection}_monthly/{YYYY-MM}
+# Each rollup doc has 'period', 'start_date', 'end_date' and the summed fields.
+GRANULARITIES = ('day', 'week', 'month')
+# Collections with one doc per day (e.g. water intakes) don't need daily rollups
+ROLLUP_GRANULARITIES = ('week', 'month')
+
+_ROLLUP_SUFFIXES = {'day': 'daily', 'week': 'weekly', 'month': 'monthly'}
+
+def rollup_collection_name(collection_name, granularity):
+    return f'{collection_name}_{_ROLLUP_SUFFIXES[granularity]}'
+
+def _day_start(date):
+    return datetime(date.year, date.month, date.day)
+
+def period_bounds(date, granularity):
+    # (first day, last day) of the period that contains date
+    day = _day_start(date)
+    if granularity == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if granularity == 'month':
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    return day, day
+
+def period_key(date, granularity):
+    if granularity == 'week':
+        year, week, _ = date.isocalendar()
+        return f'{year}-W{week:02d}'
+    if granularity == 'month':
+        return date.strftime('%Y-%m')
+    return date.strftime('%Y-%m-%d')
+
+def add_rollup_increments(batch, parent_ref, collection_name, date, values, granularities=ROLLUP_GRANULARITIES):
+    # Adds the Increment writes of one change to the caller's batch (negative values to subtract)
+    for granularity in granularities:
+        start, end = period_bounds(date, granularity)
+        key = period_key(date, granularity)
+        rollup_ref = parent_ref.collection(rollup_collection_name(collection_name, granularity)).document(key)
+        batch.set(rollup_ref, {
+            'period': key,
+            'start_date': start,
+            'end_date': end,
+            **{field: firestore.Increment(value) for field, value in values.items()}
+        }, merge=True)
+
+def plan_rollup_reads(start_date, end_date, granularity):
+    # Splits [start_date, end_date] into the periods fully inside the range (one rollup doc each)
+    # and the partial periods at the edges, which have to be summed from the daily docs.
+    start_date = _day_start(start_date)
+    end_date = _day_start(end_date)
+    full_periods = []
+    day_ranges = []
+
+    day = start_date
+    while day <= end_date:
+        period_start, period_end = period_bounds(day, granularity)
+        if period_start >= start_date and period_end <= end_date:
+            full_periods.append(period_key(day, granularity))
+        else:
+            last_day = min(period_end, end_date)
+            if day_ranges and day_ranges[-1][1] + timedelta(days=1) == day:
+                day_ranges[-1] = (day_ranges[-1][0], last_day)
+            else:
+                day_ranges.append((day, last_day))
+        day = period_end + timedelta(days=1)
+
+    return full_periods, day_ranges
+
+def get_rollup_history(parent_ref, collection_name, start_date, end_date, granularity, fields, daily_source=None):
+    # One row per period with data: {'period', 'date' (first day of the period), **fields}.
+    # daily_source: (collection, date field) with one doc per day, used for 'day' and for the
+    # partial periods at the edges. Defaults to the source collection itself.
+    daily_collection, daily_date_field = daily_source or (collection_name, 'date')
+    if granularity == 'day':
+        full_periods, day_ranges = [], [(_day_start(start_date), _day_start(end_date))]
+    else:
+        full_periods, day_ranges = plan_rollup_reads(start_date, end_date, granularity)
+    rows = {}
+
+    def add_to_period(date, data):
+        key = period_key(date, granularity)
+        row = rows.setdefault(key, {
+            'period': key,
+            'date': period_bounds(date, granularity)[0].strftime('%Y-%m-%d'),
+            **{field: 0 for field in fields}
+        })
+        for field in fields:
+            row[field] += data.get(field, 0) or 0
+
+    rollups_ref = parent_ref.collection(rollup_collection_name(collection_name, granularity))
+
+    def read_full_periods():
+        return [snapshot.to_dict() for snapshot in db.get_all([rollups_ref.document(key) for key in full_periods]) if snapshot.exists]
+
+    daily_ref = parent_ref.collection(daily_collection)
+
+    def read_day_range(range_start, range_end):
+        daily_docs = daily_ref.where(daily_date_field, '>=', range_start).where(daily_date_field, '<', range_end + timedelta(days=1)).stream()
+        return [daily_doc.to_dict() for daily_doc in daily_docs]
+
+    # The rollup docs and the edge day ranges are independent reads: issued in parallel
+    reads = [lambda start=range_start, end=range_end: read_day_range(start, end) for range_start, range_end in day_ranges]
+    if full_periods:
+        reads.insert(0, read_full_periods)
+    results = run_concurrently(*reads)
+
+    if full_periods:
+        for rollup in results.pop(0):
+            add_to_period(rollup['start_date'], rollup)
+
+    for daily_docs in results:
+        for daily_data in daily_docs:
+            add_to_period(daily_data[daily_date_field], daily_data)
+
+    return [rows[key] for key in sorted(rows)]
+
+def rebuild_rollups(parent_ref, collection_name, rollup_values, granularities=ROLLUP_GRANULARITIES):
+    # Recomputes every rollup of one user from the source docs (backfill for data written before
+    # rollups). rollup_values(doc_data) -> {field: value} is what each source doc adds.
+    totals = {}
+    for source_doc in parent_ref.collection(collection_name).stream():
+        source_data = source_doc.to_dict()
+        date = source_data.get('date')
+        if not isinstance(date, datetime):
+            continue
+        for field, value in rollup_values(source_data).items():
+            for granularity in granularities:
+                key = (granularity, period_key(date, granularity))
+                if key not in totals:
+                    start, end = period_bounds(date, granularity)
+                    totals[key] = {'period': key[1], 'start_date': start, 'end_date': end}
+                totals[key][field] = totals[key].get(field, 0) + value
+
+    writes = []
+    for granularity in granularities:
+        rollups_ref = parent_ref.collection(rollup_collection_name(collection_name, granularity))
+        writes += [(rollup.reference, None) for rollup in rollups_ref.stream() if (granularity, rollup.id) not in totals]
+    for (granularity, key), rollup in totals.items():
+        writes.append((parent_ref.collection(rollup_collection_name(collection_name, granularity)).document(key), rollup))
+
+    commit_in_batches(writes)
+    return len(totals)
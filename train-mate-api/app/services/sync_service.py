@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+from firebase_setup import db
+from app.services.executor_service import run_concurrently
+from app.services.metadata_service import UPDATED_AT_FIELD, TOMBSTONE_RETENTION_DAYS, tombstones_ref
+from app.services.category_service import get_categories
+from app.services.trainings_service import get_user_trainings, hydrate_trainings_with_exercises
+from app.services.workout_service import get_user_workouts, hydrate_workouts_with_trainings
+
+# Delta sync: for each collection the client sends the high-water mark it got from the last
+# sync (ms since epoch) and receives the docs changed after it plus the ids deleted after it.
+# Without a mark (or with one older than the tombstones retention) the collection is sent in full.
+SYNC_COLLECTIONS = ('workouts', 'trainings', 'categories')
+# A full sync hands out "now" as the mark: moved back so a write committed by Firestore with a
+# slightly earlier clock is not skipped (at worst it is sent twice)
+SYNC_CLOCK_SKEW_SECONDS = 5
+
+def parse_high_water_mark(value):
+    # Raises ValueError for anything that is not a non-negative integer
+    if value is None or value == '':
+        return None
+    milliseconds = int(value)
+    if milliseconds < 0:
+        raise ValueError("high-water mark must be a positive integer")
+    return datetime.fromtimestamp(milliseconds / 1000, tz=timezone.utc)
+
+def to_high_water_mark(date):
+    return int(date.timestamp() * 1000)
+
+# Firestore 'in' filters take at most 30 values
+IN_FILTER_MAX_VALUES = 30
+
+def _user_workouts_ref(uid):
+    return db.collection('workouts').document(uid).collection('user_workouts')
+
+def _user_trainings_ref(uid):
+    return db.collection('trainings').document(uid).collection('user_trainings')
+
+def _changes_query(uid, collection):
+    if collection == 'workouts':
+        return _user_workouts_ref(uid)
+    if collection == 'trainings':
+        return _user_trainings_ref(uid)
+    return db.collection('categories').where('owner', '==', uid)
+
+def _full_documents(uid, collection):
+    # Same shape as the list endpoints
+    if collection == 'workouts':
+        return hydrate_workouts_with_trainings(uid, get_user_workouts(uid))
+    if collection == 'trainings':
+        return get_user_trainings(uid)
+    return get_categories(uid)
+
+def _workouts_of_changed_trainings(uid, since, skip_ids):
+    # Workouts embed their training (and its exercises): when a training changed (itself, or one of
+    # its exercises, see exercise_service) its workouts are sent again with the new payload.
+    # Returns (workouts, updated_at of those trainings) so the mark moves past them.
+    trainings = _user_trainings_ref(uid).where(UPDATED_AT_FIELD, '>', since).select([UPDATED_AT_FIELD]).stream()
+    training_marks = {training.id: (training.to_dict() or {}).get(UPDATED_AT_FIELD) for training in trainings}
+    training_ids = list(training_marks)
+
+    workouts = []
+    for start in range(0, len(training_ids), IN_FILTER_MAX_VALUES):
+        chunk = training_ids[start:start + IN_FILTER_MAX_VALUES]
+        for workout in _user_workouts_ref(uid).where('training_id', 'in', chunk).stream():
+            if workout.id not in skip_ids:
+                workouts.append({**workout.to_dict(), 'id': workout.id})
+    return workouts, [mark for mark in training_marks.values() if isinstance(mark, datetime)]
+
+def _changed_documents(uid, collection, since):
+    # Returns (documents, timestamps the next mark can move up to)
+    snapshots = _changes_query(uid, collection).where(UPDATED_AT_FIELD, '>', since).stream()
+    documents = [(snapshot.id, snapshot.to_dict()) for snapshot in snapshots]
+    marks = [data[UPDATED_AT_FIELD] for _, data in documents if isinstance(data.get(UPDATED_AT_FIELD), datetime)]
+    if collection == 'trainings':
+        return hydrate_trainings_with_exercises(documents), marks
+
+    documents = [{**document_data, 'id': document_id} for document_id, document_data in documents]
+    if collection == 'workouts':
+        resent, training_marks = _workouts_of_changed_trainings(uid, since, {document['id'] for document in documents})
+        return hydrate_workouts_with_trainings(uid, documents + resent), marks + training_marks
+    # Default categories are shared and seeded by hand: they only come in full syncs
+    return documents, marks
+
+def _deleted_documents(uid, collection, since):
+    tombstones = tombstones_ref(uid).where('collection', '==', collection).where('deleted_at', '>', since).stream()
+    return [tombstone.to_dict() for tombstone in tombstones]
+
+def sync_collection(uid, collection, since, now=None):
+    now = now or datetime.now(timezone.utc)
+    if since is None or since < now - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        return {
+            'full': True,
+            'changed': _full_documents(uid, collection),
+            'deleted': [],
+            'high_water_mark': to_high_water_mark(now - timedelta(seconds=SYNC_CLOCK_SKEW_SECONDS))
+        }
+
+    changed, changed_marks = _changed_documents(uid, collection, since)
+    deleted = _deleted_documents(uid, collection, since)
+
+    # Firestore queries are strongly consistent, so the newest timestamp returned is the next mark.
+    # The queries run one after the other, though: a write committed between two of them can be
+    # older than what the later one returned, so the mark never goes past the time the reads
+    # started (minus the clock skew); at worst those docs are sent again.
+    marks = changed_marks + [tombstone['deleted_at'] for tombstone in deleted if isinstance(tombstone.get('deleted_at'), datetime)]
+    high_water_mark = min(max(marks), now - timedelta(seconds=SYNC_CLOCK_SKEW_SECONDS)) if marks else since
+    return {
+        'full': False,
+        'changed': changed,
+        'deleted': [tombstone['document_id'] for tombstone in deleted],
+        'high_water_mark': to_high_water_mark(max(since, high_water_mark))
+    }
+
+def sync_user_collections(uid, high_water_marks):
+    # high_water_marks: {collection: datetime or None}. The collections are read in parallel.
+    now = datetime.now(timezone.utc)
+    results = run_concurrently(*[
+        lambda collection=collection: sync_collection(uid, collection, high_water_marks.get(collection), now)
+        for collection in SYNC_COLLECTIONS
+    ])
+    return dict(zip(SYNC_COLLECTIONS, results))
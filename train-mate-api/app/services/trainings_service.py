@@ -1,23 +1,40 @@
+import os
 from firebase_setup import db
-from collections import Counter
+from app.services.cache_service import SingleFlightCache
+from app.services.documents_service import get_document, get_documents_by_ids, invalidate_document, ensure_parent_document
+from app.services.exercise_usage_service import increment_exercise_usage, get_top_exercises_by_usage
+from app.services.metadata_service import stamp_last_modified, with_updated_at
+
+POPULAR_EXERCISES_LIMIT = 5
+POPULAR_EXERCISES_CACHE_TTL = int(os.getenv("POPULAR_EXERCISES_CACHE_TTL", 300))
+
+# Same global answer for every caller: computed once per TTL, concurrent misses coalesced
+_popular_exercises_cache = SingleFlightCache(
+    lambda: get_top_exercises_by_usage(POPULAR_EXERCISES_LIMIT),
+    ttl=POPULAR_EXERCISES_CACHE_TTL
+)
 
 def save_user_training(uid, data, exercises_ids, calories_per_hour_mean):
     user_ref = db.collection('trainings').document(uid)
-    user_doc = user_ref.get()
-
-    if not user_doc.exists:
-        user_ref.set({})
+    ensure_parent_document(user_ref)
 
     user_trainings_ref = db.collection('trainings').document(uid).collection('user_trainings')
 
-    training_ref = user_trainings_ref.add({
+    # The training, the usage counters of its exercises and the trainings_last_modified stamp
+    # in one batched write
+    training_ref = user_trainings_ref.document()
+    batch = db.batch()
+    batch.set(training_ref, with_updated_at({
         'calories_per_hour_mean': calories_per_hour_mean,
         'exercises': exercises_ids,
         'name': data['name'],
         'owner': uid
-    })
+    }))
+    increment_exercise_usage(batch, exercises_ids)
+    stamp_last_modified(batch, uid, 'trainings')
+    batch.commit()
 
-    training_id = training_ref[1].id
+    training_id = training_ref.id
 
     saved_training = {
         'id': training_id,
@@ -28,26 +45,32 @@ def save_user_training(uid, data, exercises_ids, calories_per_hour_mean):
 
     return saved_training
 
+def hydrate_trainings_with_exercises(trainings):
+    # trainings: [(training_id, training_data)] -> training dicts with their exercises expanded.
+    # Every distinct exercise is read once, in batches, instead of one read per reference.
+    all_exercise_ids = [exercise_id for _, training_data in trainings for exercise_id in training_data.get('exercises', [])]
+    exercises_by_id = get_documents_by_ids('exercises', all_exercise_ids)
+
+    training_list = []
+    for training_id, training_data in trainings:
+        exercise_ids = training_data.get('exercises', [])
+        training_data['exercises'] = []
+        for exercise_id in exercise_ids:
+            if exercise_id in exercises_by_id:
+                exercise_data = dict(exercises_by_id[exercise_id])
+                exercise_data['exercise_id'] = exercise_id
+                training_data['exercises'].append(exercise_data)
+        training_data['id'] = training_id
+        training_list.append(training_data)
+    return training_list
+
 def get_user_trainings(uid):
 
     user_trainings_ref = db.collection('trainings').document(uid).collection('user_trainings')
 
     try:
-        trainings = user_trainings_ref.stream()
-        training_list = []
-        for training in trainings:
-            training_data = training.to_dict()
-            exercise_ids = training_data.get('exercises', [])
-            training_data['exercises'] = []
-            for exercise_id in exercise_ids:
-                exercise_doc = db.collection('exercises').document(exercise_id).get()
-                if exercise_doc.exists:
-                    exercise_data = exercise_doc.to_dict()
-                    exercise_data['exercise_id'] = exercise_id
-                    training_data['exercises'].append(exercise_data)
-            training_data['id'] = training.id
-            training_list.append(training_data)
-        return training_list
+        trainings = [(training.id, training.to_dict()) for training in user_trainings_ref.stream()]
+        return hydrate_trainings_with_exercises(trainings)
 
     except Exception as e:
         print(f"Error getting trainings from Firestore: {e}")
@@ -55,72 +78,57 @@ def get_user_trainings(uid):
 
 def get_training_by_id(uid, training_id):
     training_ref = db.collection('trainings').document(uid).collection('user_trainings').document(training_id)
-    training = training_ref.get()
+    return get_document(training_ref)
 
-    if not training.exists:
-        return None
-
-    training_data = training.to_dict()
-    return training_data
+def get_trainings_by_ids(uid, training_ids):
+    return get_documents_by_ids(f'trainings/{uid}/user_trainings', training_ids)
 
 def get_popular_exercises():
     try:
-        trainings_ref = db.collection_group('user_trainings')
-        trainings = trainings_ref.stream()
-
-        exercise_counter = Counter()
-
-        for training in trainings:
-            training_data = training.to_dict()
-            exercise_ids = training_data.get('exercises', [])
-            
-            for exercise_id in exercise_ids:
-                exercise_doc = db.collection('exercises').document(exercise_id).get()
-                if exercise_doc.exists:
-                    exercise_data = exercise_doc.to_dict()
-                    if exercise_data.get('public', False):
-                        exercise_counter[exercise_id] += 1
-
-        most_common_exercises = exercise_counter.most_common(5)
-
-        popular_exercises = []
-        for exercise_id, count in most_common_exercises:
-            exercise_doc = db.collection('exercises').document(exercise_id).get()
-            if exercise_doc.exists:
-                exercise_data = exercise_doc.to_dict()
-                popular_exercises.append({
-                    'exercise_id': exercise_id,
-                    'name': exercise_data.get('name'),
-                    'count': count
-                })
-
-        return popular_exercises
+        return _popular_exercises_cache.get()
 
     except Exception as e:
         print(f"Error getting popular exercises: {e}")
         return []
 
+def get_popular_exercises_cache_stats():
+    return _popular_exercises_cache.stats()
+
+def clear_popular_exercises_cache():
+    _popular_exercises_cache.clear()
+
 def recalculate_calories_per_hour_mean_of_trainings_by_modified_excercise(uid, excercise_id):
     try:
         trainings_ref = db.collection('trainings').document(uid).collection('user_trainings')
         trainings = trainings_ref.stream()
 
+        # The updated trainings and the trainings_last_modified stamp in one batched write,
+        # so the listings' ETag changes together with calories_per_hour_mean
+        batch = db.batch()
+        updated_refs = []
         for training in trainings:
             training_data = training.to_dict()
             exercise_ids = training_data.get('exercises', [])
             if excercise_id in exercise_ids:
                 calories_per_hour_sum = 0
                 for exercise_id in exercise_ids:
-                    exercise_doc = db.collection('exercises').document(exercise_id).get()
-                    if exercise_doc.exists:
-                        exercise_data = exercise_doc.to_dict()
+                    exercise_data = get_document(db.collection('exercises').document(exercise_id))
+                    if exercise_data:
                         calories_per_hour_sum += exercise_data.get('calories_per_hour', 0)
                 calories_per_hour_mean = round(calories_per_hour_sum / len(exercise_ids))
                 training_ref = db.collection('trainings').document(uid).collection('user_trainings').document(training.id)
-                training_ref.update({
+                batch.update(training_ref, with_updated_at({
                     'calories_per_hour_mean': calories_per_hour_mean
-                })
+                }))
+                updated_refs.append(training_ref)
+
+        if updated_refs:
+            stamp_last_modified(batch, uid, 'trainings')
+            batch.commit()
+            for training_ref in updated_refs:
+                invalidate_document(training_ref)
+        return True
 
     except Exception as e:
         print(f"Error recalculating calories per hour mean: {e}")
-        return False
\ No newline at end of file
+        return False
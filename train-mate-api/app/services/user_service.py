@@ -1,14 +1,7 @@
 from firebase_admin import auth
 from firebase_setup import db
 from app.services.challenges_service import create_challenges_service
-
-def verify_token_service(token):
-    try:
-        decoded_token = auth.verify_id_token(token)
-        return decoded_token['uid']
-    except Exception as e:
-        print(e)
-        return None
+from app.services.documents_service import get_document, invalidate_document
 
 def save_user_info_service(uid, data):
     user_ref = db.collection('users').document(uid)
@@ -35,24 +28,23 @@ def save_user_info_service(uid, data):
 
     if user_data:
         user_ref.set(user_data)
+        invalidate_document(user_ref)
         create_challenges_service(uid)
     else:
         print(f"There is no valid data for {uid}.")
 
 def get_user_info_service(uid):
     user_ref = db.collection('users').document(uid)
-    user_doc = user_ref.get()
+    user_data = get_document(user_ref)
 
-    if user_doc.exists:
-        return user_doc.to_dict()
+    if user_data is not None:
+        return user_data
     else:
         print(f"Usuario con UID {uid} no encontrado. Creando un nuevo usuario...")
         user = auth.get_user(uid)
         email = user.email
         save_user_info_service(uid, {'email': email})
-        user_ref = db.collection('users').document(uid)
-        user_doc = user_ref.get()
-        return user_doc.to_dict()
+        return get_document(user_ref)
 
 def update_user_info_service(uid, data):
     user_ref = db.collection('users').document(uid)
@@ -81,4 +73,5 @@ def update_user_info_service(uid, data):
         update_data['birthday'] = data['birthday']
 
     if update_data:
-        user_ref.update(update_data)
\ No newline at end of file
+        user_ref.update(update_data)
+        invalidate_document(user_ref)
\ No newline at end of file
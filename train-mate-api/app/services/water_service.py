@@ -1,33 +1,35 @@
+from firebase_admin import firestore
 from firebase_setup import db
+from app.services.documents_service import get_document, invalidate_document, ensure_parent_document
+from app.services.rollup_service import add_rollup_increments, get_rollup_history, rebuild_rollups
 from datetime import datetime
 
+WATER_INTAKES_COLLECTION = 'user_water_intakes'
+
 def add_water_intake_service(uid, quantity_in_militers, date, public=False):
     try:
         # Referencia al documento del usuario
         user_ref = db.collection('water_intakes').document(uid)
-        user_doc = user_ref.get()
-
         # Si el documento no existe, lo creamos
-        if not user_doc.exists:
-            user_ref.set({})
+        ensure_parent_document(user_ref)
 
         # Referencia a la subcolección de ingesta de agua del usuario
-        water_intake_ref = user_ref.collection('user_water_intakes').document(date)
-
-        # Verificar si ya hay una entrada para el día. Si existe, sumamos la cantidad.
-        existing_water_intake = water_intake_ref.get()
-        if existing_water_intake.exists:
-            existing_data = existing_water_intake.to_dict()
-            quantity_in_militers += existing_data.get('quantity_in_militers', 0)
+        water_intake_ref = user_ref.collection(WATER_INTAKES_COLLECTION).document(date)
 
         date_obj = datetime.strptime(date, '%Y-%m-%d')
         date_obj = date_obj.replace(hour=0, minute=0)
-        # Guardar o actualizar la ingesta de agua del día
-        water_intake_ref.set({
-            'quantity_in_militers': quantity_in_militers,
+        # Guardar o sumar la ingesta de agua del día. El incremento lo aplica Firestore,
+        # asi que no hace falta leer el total y no se pierden sumas concurrentes.
+        # Los totales semanales y mensuales se actualizan en el mismo batch.
+        batch = db.batch()
+        batch.set(water_intake_ref, {
+            'quantity_in_militers': firestore.Increment(quantity_in_militers),
             'date': date_obj,
             'public': public
-        })
+        }, merge=True)
+        add_rollup_increments(batch, user_ref, WATER_INTAKES_COLLECTION, date_obj, {'quantity_in_militers': quantity_in_militers})
+        batch.commit()
+        invalidate_document(water_intake_ref)
 
         return True
 
@@ -39,29 +41,33 @@ def get_daily_water_intake_service(uid, date):
     try:
         # Referencia al documento de ingesta de agua del día
         water_intake_ref = db.collection('water_intakes').document(uid).collection('user_water_intakes').document(date)
-        water_intake_doc = water_intake_ref.get()
+        water_intake_data = get_document(water_intake_ref)
 
         # Si no existe, retornamos 0
-        if not water_intake_doc.exists:
+        if water_intake_data is None:
             return None
 
         # Obtener la cantidad de mililitros
-        water_intake_data = water_intake_doc.to_dict()
         return water_intake_data.get('quantity_in_militers', 0)
 
     except Exception as e:
         print(f"Error fetching daily water intake: {e}")
         return None
 
-def get_water_intake_history_service(uid, start_date, end_date):
+def get_water_intake_history_service(uid, start_date, end_date, granularity='day'):
     try:
-        # Referencia a la subcolección de ingesta de agua
-        water_intake_ref = db.collection('water_intakes').document(uid).collection('user_water_intakes')
-
         # Filtrar por rango de fechas
         start_datetime = datetime.strptime(start_date, '%Y-%m-%d')
         end_datetime = datetime.strptime(end_date, '%Y-%m-%d')
 
+        user_ref = db.collection('water_intakes').document(uid)
+        if granularity != 'day':
+            # Semanas/meses completos salen de los rollups, los bordes de los docs diarios
+            return get_rollup_history(user_ref, WATER_INTAKES_COLLECTION, start_datetime, end_datetime, granularity, ['quantity_in_militers'])
+
+        # Referencia a la subcolección de ingesta de agua
+        water_intake_ref = user_ref.collection(WATER_INTAKES_COLLECTION)
+
         water_intakes = water_intake_ref.where('date', '>=', start_datetime).where('date', '<=', end_datetime).stream()
 
         # Construir el historial
@@ -78,3 +84,14 @@ def get_water_intake_history_service(uid, start_date, end_date):
     except Exception as e:
         print(f"Error fetching water intake history: {e}")
         return []
+
+def _water_rollup_values(water_intake_data):
+    return {'quantity_in_militers': water_intake_data.get('quantity_in_militers', 0) or 0}
+
+def rebuild_water_intake_rollups():
+    # Backfill de los rollups a partir de los docs diarios de cada usuario
+    users = 0
+    for user_doc in db.collection('water_intakes').stream():
+        rebuild_rollups(user_doc.reference, WATER_INTAKES_COLLECTION, _water_rollup_values)
+        users += 1
+    return users
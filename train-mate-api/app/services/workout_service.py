@@ -1,17 +1,29 @@
 from firebase_admin import auth
 from firebase_admin import firestore
 from firebase_setup import db
+from app.services.documents_service import ensure_parent_document
+from app.services.metadata_service import stamp_last_modified, with_updated_at, add_tombstone
+from app.services.pagination_service import DEFAULT_PAGE_SIZE, paginate
+from app.services.rollup_service import GRANULARITIES, add_rollup_increments, get_rollup_history, rebuild_rollups, rollup_collection_name
 from app.services.user_service import get_user_info_service
 from datetime import datetime
-from app.services.checkChallenges_service import check_and_update_workouts_challenges
-from app.services.trainings_service import get_training_by_id
+from app.services.checkChallenges_service import enqueue_challenges_recheck
+from app.services.trainings_service import get_training_by_id, get_trainings_by_ids
+from app.services.exercise_service import get_exercises_by_ids
+
+WORKOUTS_COLLECTION = 'user_workouts'
+WORKOUT_ROLLUP_FIELDS = ['total_calories', 'duration', 'count']
+
+def _workout_rollup_values(duration, total_calories, sign=1):
+    return {
+        'total_calories': sign * (total_calories or 0),
+        'duration': sign * (duration or 0),
+        'count': sign
+    }
 
 def save_user_workout(uid, data, calories_burned):
     user_ref = db.collection('workouts').document(uid)
-    user_doc = user_ref.get()
-
-    if not user_doc.exists:
-        user_ref.set({})
+    ensure_parent_document(user_ref)
 
     trainingExists = get_training_by_id(uid, data['training_id'])
     if not trainingExists:
@@ -28,19 +40,26 @@ def save_user_workout(uid, data, calories_burned):
         date_obj = db.SERVER_TIMESTAMP
 
     # Reference to the user's workouts subcollection
-    user_workouts_ref = db.collection('workouts').document(uid).collection('user_workouts')
+    user_workouts_ref = user_ref.collection(WORKOUTS_COLLECTION)
 
-    # Add a new document to the subcollection
-    workout_ref = user_workouts_ref.add({
+    # New document (Firestore-generated ID), the calorie/duration rollups and the
+    # workouts_last_modified stamp, in one batched write
+    workout_ref = user_workouts_ref.document()
+    batch = db.batch()
+    batch.set(workout_ref, with_updated_at({
         'training_id': data['training_id'],
         'duration': data['duration'],
         'date': date_obj,
         'total_calories': calories_burned,
         'coach': data['coach']
-    })
+    }))
+    # Sin fecha se guarda el timestamp del servidor, que es el dia de hoy
+    rollup_date = date_obj if isinstance(date_obj, datetime) else datetime.now()
+    add_rollup_increments(batch, user_ref, WORKOUTS_COLLECTION, rollup_date, _workout_rollup_values(data['duration'], calories_burned), GRANULARITIES)
+    stamp_last_modified(batch, uid, 'workouts')
+    batch.commit()
 
-    # The workout_ref contains the Firestore-generated ID
-    workout_id = workout_ref[1].id
+    workout_id = workout_ref.id
 
     # Return the workout data, including the ID
     saved_workout = {
@@ -52,7 +71,10 @@ def save_user_workout(uid, data, calories_burned):
         'coach': data['coach']
     }
 
-    check_and_update_workouts_challenges(uid)
+    try:
+        enqueue_challenges_recheck(uid, workout=saved_workout)
+    except Exception as e:
+        print(f"Error enqueuing challenges recheck: {e}")
 
     return saved_workout
 
@@ -92,6 +114,47 @@ def get_user_workouts(uid, start_date=None, end_date=None):
 
     return workout_list
 
+def get_user_workouts_page(uid, start_date=None, end_date=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    # Newest first, one page at a time. Raises ValueError for invalid dates or cursor.
+    user_workouts_ref = db.collection('workouts').document(uid).collection('user_workouts')
+
+    if start_date:
+        start_datetime = datetime.strptime(start_date, '%Y-%m-%d').replace(hour=10, minute=0)
+        user_workouts_ref = user_workouts_ref.where('date', '>=', start_datetime)
+
+    if end_date:
+        end_datetime = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=10, minute=0)
+        user_workouts_ref = user_workouts_ref.where('date', '<=', end_datetime)
+
+    workouts, next_cursor = paginate(user_workouts_ref, ['date'], limit, cursor)
+
+    workout_list = []
+    for workout in workouts:
+        workout_data = workout.to_dict()
+        workout_data['id'] = workout.id
+        workout_list.append(workout_data)
+
+    return workout_list, next_cursor
+
+def hydrate_workouts_with_trainings(uid, workouts):
+    # One batched read for the distinct trainings and one for their distinct exercises
+    trainings_by_id = get_trainings_by_ids(uid, [workout['training_id'] for workout in workouts])
+    exercise_ids = [exercise_id for training in trainings_by_id.values() for exercise_id in training.get('exercises', [])]
+    exercises_by_id = get_exercises_by_ids(exercise_ids)
+
+    hydrated_trainings = {}
+    for training_id, training_data in trainings_by_id.items():
+        exercises = []
+        for exercise_id in training_data.get('exercises', []):
+            if exercise_id in exercises_by_id:
+                exercises.append({**exercises_by_id[exercise_id], 'id': exercise_id})
+        hydrated_trainings[training_id] = {**training_data, 'exercises': exercises}
+
+    for workout in workouts:
+        workout['training'] = hydrated_trainings.get(workout['training_id'])
+
+    return workouts
+
 def get_user_calories_from_workouts(uid, start_date=None, end_date=None):
     # Reference to the user's workouts subcollection
     user_workouts_ref = db.collection('workouts').document(uid).collection('user_workouts')
@@ -147,6 +210,49 @@ def delete_user_workout(uid, workout_id):
     if workout_date <= datetime.now():
         return {'error': 'Cannot cancel past workouts'}, 400
 
-    # Delete the workout if it is scheduled for the future
-    workout_ref.delete()
-    return {'message': 'Workout cancelled successfully'}, 200
\ No newline at end of file
+    # Delete the workout if it is scheduled for the future, and take it out of the rollups
+    batch = db.batch()
+    batch.delete(workout_ref)
+    add_rollup_increments(
+        batch,
+        db.collection('workouts').document(uid),
+        WORKOUTS_COLLECTION,
+        workout_date,
+        _workout_rollup_values(workout_data.get('duration', 0), workout_data.get('total_calories', 0), sign=-1),
+        GRANULARITIES
+    )
+    add_tombstone(batch, uid, 'workouts', workout_id)
+    stamp_last_modified(batch, uid, 'workouts')
+    batch.commit()
+
+    try:
+        enqueue_challenges_recheck(uid, rebuild_workouts=True)
+    except Exception as e:
+        print(f"Error enqueuing challenges recheck: {e}")
+
+    return {'message': 'Workout cancelled successfully'}, 200
+
+def get_user_workouts_aggregates(uid, start_date, end_date, granularity='day'):
+    # Calories, duration and number of workouts per day/week/month, read from the rollups
+    try:
+        start_datetime = datetime.strptime(start_date, '%Y-%m-%d')
+        end_datetime = datetime.strptime(end_date, '%Y-%m-%d')
+    except ValueError:
+        return {"error": "Invalid date. Use 'YYYY-MM-DD'."}
+
+    user_ref = db.collection('workouts').document(uid)
+    daily_source = (rollup_collection_name(WORKOUTS_COLLECTION, 'day'), 'start_date')
+    return get_rollup_history(user_ref, WORKOUTS_COLLECTION, start_datetime, end_datetime, granularity, WORKOUT_ROLLUP_FIELDS, daily_source)
+
+def rebuild_workouts_rollups():
+    # Backfill de los rollups a partir de los workouts de cada usuario
+    users = 0
+    for user_doc in db.collection('workouts').stream():
+        rebuild_rollups(
+            user_doc.reference,
+            WORKOUTS_COLLECTION,
+            lambda workout_data: _workout_rollup_values(workout_data.get('duration', 0), workout_data.get('total_calories', 0)),
+            GRANULARITIES
+        )
+        users += 1
+    return users
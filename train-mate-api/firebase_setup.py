@@ -1,9 +1,12 @@
 import os
 import json
+import asyncio
+import weakref
 import firebase_admin
 from firebase_admin import credentials, firestore
 from google.oauth2 import service_account
 from google.cloud import storage
+from google.cloud.firestore import AsyncClient
 
 # For local dev, read from a file if it exists (ignored by git).
 if os.path.exists("trainmate-pro-firebase-adminsdk-lqht8-9ca5f4a3a9.json"):
@@ -20,6 +23,19 @@ else:
 cred = credentials.Certificate(firebase_creds_dict)
 firebase_admin.initialize_app(cred)
 db = firestore.client()
+
+# Async client for the opt-in async services. Its gRPC channel is bound to the event loop
+# it was first used on, so there is one client per running loop (the API serves them all
+# from a single long-lived loop, see async_service.run_async).
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_db():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncClient(project=cred.project_id, credentials=cred.get_credential())
+    return client
+
 # Initialize for storage
 credentials = service_account.Credentials.from_service_account_info(firebase_creds_dict)
 storage_client = storage.Client(credentials=credentials, project=credentials.project_id)
\ No newline at end of file
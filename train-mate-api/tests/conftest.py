@@ -1,9 +1,23 @@
 import pytest
 from app import create_app
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 
 @pytest.fixture
 def client():
     app = create_app()
-    with app.test_client() as client:
-        yield client
\ No newline at end of file
+    # No *_last_modified metadata by default => listings are served without ETag
+    with app.test_client() as client, \
+         patch("app.controllers.conditional_get.get_last_modified_timestamp", return_value=None):
+        yield client
+
+@pytest.fixture
+def make_snapshot():
+    # Firestore DocumentSnapshot fake: id, exists, to_dict() and get(field)
+    def _make_snapshot(doc_id, data):
+        snapshot = MagicMock()
+        snapshot.id = doc_id
+        snapshot.exists = data is not None
+        snapshot.to_dict.return_value = data
+        snapshot.get.side_effect = lambda field: data[field]
+        return snapshot
+    return _make_snapshot
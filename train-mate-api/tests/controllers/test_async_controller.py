@@ -0,0 +1,35 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from app import create_app
+
+@pytest.fixture
+def async_client():
+    with patch.dict("os.environ", {"ASYNC_API_ENABLED": "true"}):
+        app = create_app()
+    with app.test_client() as client:
+        yield client
+
+def test_async_api_is_opt_in(client):
+    resp = client.get("/api/async/trainings/get-trainings", headers={"Authorization": "Bearer valid_token"})
+    assert resp.status_code == 404
+
+def test_async_get_trainings(async_client):
+    trainings = [{"id": "tr1", "name": "Legs", "exercises": []}]
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.async_controller.get_user_trainings_async", AsyncMock(return_value=trainings)) as mock_get:
+        resp = async_client.get("/api/async/trainings/get-trainings", headers={"Authorization": "Bearer valid_token"})
+
+    assert resp.status_code == 200
+    assert resp.get_json() == {"trainings": trainings}
+    mock_get.assert_awaited_once_with("user123")
+
+def test_async_get_workouts_invalid_date(async_client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.async_controller.get_user_workouts_with_trainings_async", AsyncMock(side_effect=ValueError)):
+        resp = async_client.get("/api/async/workouts/workouts?startDate=bad", headers={"Authorization": "Bearer valid_token"})
+
+    assert resp.status_code == 400
+
+def test_async_get_workouts_missing_auth(async_client):
+    resp = async_client.get("/api/async/workouts/workouts")
+    assert resp.status_code == 403
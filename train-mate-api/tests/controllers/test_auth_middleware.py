@@ -0,0 +1,66 @@
+import json
+import pytest
+from unittest.mock import patch
+
+@pytest.mark.parametrize("headers", [
+    {},
+    {"Authorization": "valid_token"},
+    {"Authorization": "Bearer "},
+])
+def test_missing_or_malformed_header_is_rejected(client, headers):
+    """
+    Requests without a usable Bearer token never reach token verification.
+    """
+    with patch("app.controllers.auth_middleware.verify_token_service") as mock_verify:
+        resp = client.get("/api/trainings/get-trainings", headers=headers)
+    assert resp.status_code == 403
+    assert resp.get_json()["error"] == "Authorization token missing"
+    mock_verify.assert_not_called()
+
+def test_invalid_token_short_circuits_before_body_parsing(client):
+    """
+    An invalid token is rejected before the view decodes the (malformed) JSON body.
+    """
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None), \
+         patch("app.controllers.workout_controller.save_user_workout") as mock_save:
+        resp = client.post(
+            "/api/workouts/save-workout",
+            data="{not json",
+            headers={"Content-Type": "application/json", "Authorization": "Bearer invalid_token"}
+        )
+    assert resp.status_code == 401
+    assert resp.get_json()["error"] == "Invalid token"
+    mock_save.assert_not_called()
+
+@pytest.mark.parametrize("endpoint,method,status", [
+    ("/api/category/get-categories", "GET", 403),
+    ("/api/category/last-modified", "GET", 401),
+    ("/api/category/update-last-modified", "POST", 401),
+])
+def test_invalid_token_status_per_endpoint(client, endpoint, method, status):
+    """
+    The category blueprint answers 403, except the two last-modified routes that always answered 401.
+    """
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
+        resp = client.open(endpoint, method=method, headers={"Authorization": "Bearer invalid_token"})
+    assert resp.status_code == status
+    assert resp.get_json()["error"] == "Invalid token"
+
+def test_valid_token_is_verified_once_and_exposed_to_the_view(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123") as mock_verify, \
+         patch("app.controllers.trainings_controller.get_user_trainings", return_value=[]) as mock_get:
+        resp = client.get("/api/trainings/get-trainings", headers={"Authorization": "Bearer valid_token"})
+    assert resp.status_code == 200
+    mock_verify.assert_called_once_with("valid_token")
+    mock_get.assert_called_once_with("user123")
+
+@pytest.mark.parametrize("endpoint,service,result", [
+    ("/api/trainings/popular-exercises", "app.controllers.trainings_controller.get_popular_exercises", []),
+    ("/api/exercise/get-all-exercises", "app.controllers.exercise_controller.get_all_exercises_service", ([], None)),
+])
+def test_public_endpoints_skip_authentication(client, endpoint, service, result):
+    with patch("app.controllers.auth_middleware.verify_token_service") as mock_verify, \
+         patch(service, return_value=result):
+        resp = client.get(endpoint)
+    assert resp.status_code == 200
+    mock_verify.assert_not_called()
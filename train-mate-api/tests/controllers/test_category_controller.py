@@ -3,6 +3,7 @@
 import json
 import pytest
 from unittest.mock import patch, MagicMock
+from datetime import datetime
 
 def mock_verify_token(token):
     if token == "valid_token":
@@ -43,7 +44,7 @@ def test_save_category_valid(client):
         "icon": "Ball",
         "isCustom": True
     }
-    with patch("app.controllers.category_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.category_controller.save_category_service", 
                return_value=(True, {"id": "new_id", **data})):
         
@@ -64,7 +65,7 @@ def test_save_category_invalid_data(client):
         "name": "TestCat",
         "isCustom": True
     }
-    with patch("app.controllers.category_controller.verify_token_service", return_value="user123"):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
         response = client.post(
             "/api/category/save-category",
             data=json.dumps(data),
@@ -75,7 +76,7 @@ def test_save_category_invalid_data(client):
 
 def test_get_categories_valid(client):
     mock_categories = [{"id": "cat1", "name": "Category1"}, {"id": "cat2", "name": "Category2"}]
-    with patch("app.controllers.category_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.category_controller.get_categories_service", return_value=mock_categories):
         
         response = client.get(
@@ -86,8 +87,32 @@ def test_get_categories_valid(client):
     resp_json = response.get_json()
     assert len(resp_json["categories"]) == 2
 
+def test_get_categories_etag_includes_default_categories(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.conditional_get.get_last_modified_timestamp", return_value=datetime(2025, 1, 7)), \
+         patch("app.controllers.category_controller.get_default_categories_version", return_value="v1"), \
+         patch("app.controllers.category_controller.get_categories_service", return_value=[]) as mock_get:
+        etag = client.get("/api/category/get-categories", headers={"Authorization": "Bearer valid_token"}).headers["ETag"]
+        not_modified = client.get(
+            "/api/category/get-categories",
+            headers={"Authorization": "Bearer valid_token", "If-None-Match": etag}
+        )
+
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.conditional_get.get_last_modified_timestamp", return_value=datetime(2025, 1, 7)), \
+         patch("app.controllers.category_controller.get_default_categories_version", return_value="v2"), \
+         patch("app.controllers.category_controller.get_categories_service", return_value=[]):
+        defaults_changed = client.get(
+            "/api/category/get-categories",
+            headers={"Authorization": "Bearer valid_token", "If-None-Match": etag}
+        )
+
+    assert not_modified.status_code == 304
+    assert mock_get.call_count == 1
+    assert defaults_changed.status_code == 200
+
 def test_delete_category_success(client):
-    with patch("app.controllers.category_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.category_controller.delete_category_service", return_value=True):
         
         response = client.delete(
@@ -98,7 +123,7 @@ def test_delete_category_success(client):
     assert response.get_json()["message"] == "Category deleted successfully"
 
 def test_delete_category_failure(client):
-    with patch("app.controllers.category_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.category_controller.delete_category_service", return_value=False):
         
         response = client.delete(
@@ -110,7 +135,7 @@ def test_delete_category_failure(client):
 
 def test_edit_category_success(client):
     data = {"name": "NewName", "icon": "new-icon"}
-    with patch("app.controllers.category_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.category_controller.update_category_service", return_value=True):
         
         response = client.put(
@@ -123,7 +148,7 @@ def test_edit_category_success(client):
 
 def test_edit_category_no_valid_fields(client):
     data = {"someField": "notAllowed"}
-    with patch("app.controllers.category_controller.verify_token_service", return_value="user123"):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
         response = client.put(
             "/api/category/edit-category/fake_id",
             data=json.dumps(data),
@@ -137,7 +162,7 @@ def test_get_category_by_id_success(client):
     mock_category.to_dict.return_value = {"owner": "user123", "name": "MyCategory"}
     mock_category.id = "fake_id"
 
-    with patch("app.controllers.category_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.category_controller.get_category_by_id_service", return_value=mock_category):
         
         response = client.get(
@@ -149,7 +174,7 @@ def test_get_category_by_id_success(client):
     assert resp_json["name"] == "MyCategory"
 
 def test_get_category_by_id_not_found(client):
-    with patch("app.controllers.category_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.category_controller.get_category_by_id_service", return_value=None):
         
         response = client.get(
@@ -175,7 +200,7 @@ def test_get_category_by_id_not_found(client):
 #     assert response.get_json()["message"] == "Category saved successfully"
 
 def test_get_last_modified_valid(client):
-    with patch("app.controllers.category_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.category_controller.get_last_modified_timestamp", return_value=None):
         
         response = client.get(
@@ -190,8 +215,8 @@ def test_update_last_modified_valid(client):
     import datetime
     mock_time = datetime.datetime(2023, 1, 1, 0, 0)
 
-    with patch("app.controllers.category_controller.verify_token_service", return_value="user123"), \
-         patch("app.controllers.category_controller.set_last_modified_timestamp", return_value=mock_time):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.category_controller.get_last_modified_timestamp", return_value=mock_time):
         
         response = client.post(
             "/api/category/update-last-modified",
@@ -27,7 +27,7 @@ def test_invalid_token(client):
     """
     If token is invalid, we expect 403 (or 401).
     """
-    with patch("app.controllers.challenges_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         response = client.get(
             "/api/challenges/get-challenges-list/physical",
             headers={"Authorization": "Bearer invalid_token"}
@@ -40,7 +40,7 @@ def test_get_challenges_list_success(client):
         {"challenge": "Challenge1", "state": False, "id": "doc1"},
         {"challenge": "Challenge2", "state": True, "id": "doc2"}
     ]
-    with patch("app.controllers.challenges_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.challenges_controller.get_challenges_list_service", return_value=mock_challenges):
         response = client.get(
             "/api/challenges/get-challenges-list/physical",
@@ -55,7 +55,7 @@ def test_get_challenges_list_failure_service_none(client):
     """
     If the service returns None, we expect 500 (as in the code).
     """
-    with patch("app.controllers.challenges_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.challenges_controller.get_challenges_list_service", return_value=None):
         response = client.get(
             "/api/challenges/get-challenges-list/workouts",
@@ -68,7 +68,7 @@ def test_get_challenges_list_exception(client):
     """
     If the controller hits an exception, returns 500.
     """
-    with patch("app.controllers.challenges_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.challenges_controller.get_challenges_list_service", side_effect=Exception("Boom!")):
         response = client.get(
             "/api/challenges/get-challenges-list/physical",
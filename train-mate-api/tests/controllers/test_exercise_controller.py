@@ -1,6 +1,7 @@
 import pytest
 import json
 from unittest.mock import patch, MagicMock
+from datetime import datetime
 
 def mock_verify_token(token):
     """
@@ -49,7 +50,7 @@ def test_save_exercise_success(client):
 
     mock_exercise_return = (True, {**data, "id": "new_ex_id"})
 
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.exercise_controller.save_exercise_service", return_value=mock_exercise_return):
         
         response = client.post(
@@ -78,7 +79,7 @@ def test_save_exercise_validation_error(client):
         "training_muscle": "Chest"
     }
 
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value="user123"):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
         response = client.post(
             "/api/exercise/save-exercise",
             data=json.dumps(data),
@@ -100,7 +101,7 @@ def test_save_exercise_invalid_token(client):
         "training_muscle": "Chest"
     }
     # Mock invalid token
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         response = client.post(
             "/api/exercise/save-exercise",
             data=json.dumps(data),
@@ -124,7 +125,7 @@ def test_save_exercise_failure_service(client):
         "image_url": "http://example.com/image.jpg",
         "training_muscle": "Chest"
     }
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.exercise_controller.save_exercise_service", return_value=(False, None)):
         
         response = client.post(
@@ -146,8 +147,8 @@ def test_get_exercises_success(client):
         {"id": "ex1", "name": "Push-ups", "calories_per_hour": 500},
         {"id": "ex2", "name": "Sit-ups", "calories_per_hour": 300},
     ]
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value="user123"), \
-         patch("app.controllers.exercise_controller.get_exercises_service", return_value=mock_exercises):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.exercise_controller.get_exercises_service", return_value=(mock_exercises, None)):
         
         response = client.get(
             "/api/exercise/get-exercises?public=false",
@@ -162,7 +163,7 @@ def test_get_exercises_invalid_token(client):
     """
     If verify_token_service returns None => 403
     """
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         response = client.get(
             "/api/exercise/get-exercises?public=true",
             headers={"Authorization": "Bearer invalid_token"}
@@ -171,7 +172,7 @@ def test_get_exercises_invalid_token(client):
     assert "Invalid token" in response.get_json()["error"]
 
 def test_delete_exercise_success(client):
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.exercise_controller.delete_exercise_service", return_value=True):
         
         response = client.delete(
@@ -185,7 +186,7 @@ def test_delete_exercise_failure(client):
     """
     If delete_exercise_service returns False => 404
     """
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.exercise_controller.delete_exercise_service", return_value=False):
         
         response = client.delete(
@@ -200,7 +201,7 @@ def test_edit_exercise_success(client):
     Test editing an exercise, check if we call recalculate function if 'calories_per_hour' in update.
     """
     data = {"calories_per_hour": 450}
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.exercise_controller.update_exercise_service", return_value=True) as mock_update, \
          patch("app.controllers.exercise_controller.recalculate_calories_per_hour_mean_of_trainings_by_modified_excercise") as mock_recalc:
         
@@ -215,12 +216,50 @@ def test_edit_exercise_success(client):
     # Because 'calories_per_hour' is in update, we expect recalc to be called
     mock_recalc.assert_called_once_with("user123", "ex123")
 
+def test_edit_exercise_changes_trainings_etag(client):
+    """
+    Trainings embed their exercises: editing one stamps trainings_last_modified, so the next
+    If-None-Match on /get-trainings gets the new exercise instead of a 304.
+    """
+    last_modified = {"trainings": datetime(2025, 1, 7, 10, 0)}
+    mock_db = MagicMock()
+    exercise = MagicMock()
+    exercise.exists = True
+    exercise.to_dict.return_value = {"owner": "user123", "name": "Push-ups"}
+    mock_db.collection.return_value.document.return_value.get.return_value = exercise
+
+    def stamp(document_ref, data, merge=False):
+        if "trainings_last_modified" in data:
+            last_modified["trainings"] = datetime(2025, 1, 7, 11, 0)
+    mock_db.batch.return_value.set.side_effect = stamp
+
+    headers = {"Authorization": "Bearer valid_token"}
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.conditional_get.get_last_modified_timestamp", side_effect=lambda uid, collection: last_modified.get(collection)), \
+         patch("app.controllers.trainings_controller.get_user_trainings", return_value=[]) as mock_get, \
+         patch("app.services.exercise_service.db", mock_db), \
+         patch("app.services.metadata_service.db", mock_db), \
+         patch("app.services.exercise_service.sync_exercise_usage"):
+        etag = client.get("/api/trainings/get-trainings", headers=headers).headers["ETag"]
+
+        edit = client.put(
+            "/api/exercise/edit-exercise/ex123",
+            data=json.dumps({"name": "Push-ups (wide)"}),
+            headers={**headers, "Content-Type": "application/json"}
+        )
+        response = client.get("/api/trainings/get-trainings", headers={**headers, "If-None-Match": etag})
+
+    assert edit.status_code == 200
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert mock_get.call_count == 2
+
 def test_edit_exercise_no_valid_fields(client):
     """
     If no valid fields are passed => 400
     """
     data = {"someField": "notAllowed"}
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value="user123"):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
         response = client.put(
             "/api/exercise/edit-exercise/ex123",
             data=json.dumps(data),
@@ -234,7 +273,7 @@ def test_edit_exercise_failure_service(client):
     If update_exercise_service returns False => 404
     """
     data = {"calories_per_hour": 200}
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.exercise_controller.update_exercise_service", return_value=False):
         
         response = client.put(
@@ -253,12 +292,40 @@ def test_get_all_exercises_success(client):
         {"id": "ex1", "name": "Jumping Jacks", "calories_per_hour": 600, "public": True},
         {"id": "ex2", "name": "Running", "calories_per_hour": 800, "public": True}
     ]
-    with patch("app.controllers.exercise_controller.get_all_exercises_service", return_value=mock_ex_list):
+    with patch("app.controllers.exercise_controller.get_all_exercises_service", return_value=(mock_ex_list, "next")) as mock_service:
         response = client.get("/api/exercise/get-all-exercises")
     assert response.status_code == 200
     resp_json = response.get_json()
     assert len(resp_json["exercises"]) == 2
     assert resp_json["exercises"][0]["name"] == "Jumping Jacks"
+    assert resp_json["next_cursor"] == "next"
+    # No limit => server-side cap
+    mock_service.assert_called_once_with(100, None, "name")
+
+def test_get_all_exercises_paged(client):
+    with patch("app.controllers.exercise_controller.get_all_exercises_service", return_value=([], None)) as mock_service:
+        response = client.get("/api/exercise/get-all-exercises?limit=10&cursor=abc&order_by=id")
+    assert response.status_code == 200
+    assert response.get_json()["next_cursor"] is None
+    mock_service.assert_called_once_with(10, "abc", "id")
+
+def test_get_all_exercises_invalid_params(client):
+    bad_order = client.get("/api/exercise/get-all-exercises?order_by=calories")
+    bad_limit = client.get("/api/exercise/get-all-exercises?limit=abc")
+    assert bad_order.status_code == 400
+    assert "Invalid order_by" in bad_order.get_json()["error"]
+    assert bad_limit.status_code == 400
+
+def test_get_exercises_public_paged(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.exercise_controller.get_exercises_service", return_value=([], "next")) as mock_service:
+        response = client.get(
+            "/api/exercise/get-exercises?public=true&limit=5",
+            headers={"Authorization": "Bearer valid_token"}
+        )
+    assert response.status_code == 200
+    assert response.get_json()["next_cursor"] == "next"
+    mock_service.assert_called_once_with("user123", True, 5, None, "name")
 
 def test_get_all_exercises_exception(client):
     """
@@ -274,7 +341,7 @@ def test_get_exercises_by_category_success(client):
         {"id": "exCat1", "category_id": "cat123", "owner": "user123"},
         {"id": "exCat2", "category_id": "cat123", "owner": "default"}
     ]
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.exercise_controller.get_exercise_by_category_id_service", return_value=mock_exercises):
         
         response = client.get(
@@ -290,7 +357,7 @@ def test_get_exercises_by_category_invalid_token(client):
     """
     If token is invalid => 403
     """
-    with patch("app.controllers.exercise_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         response = client.get(
             "/api/exercise/get-exercises-by-category/cat123",
             headers={"Authorization": "Bearer invalid_token"}
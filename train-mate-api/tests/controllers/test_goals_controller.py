@@ -39,7 +39,7 @@ def test_get_all_goals_success(client):
         {"id": "g1", "title": "Goal 1", "description": "Test Desc", "startDate": "2025-07-01", "endDate": "2025-07-31"},
         {"id": "g2", "title": "Goal 2", "description": "Test Desc", "startDate": "2025-08-01", "endDate": "2025-08-31"}
     ]
-    with patch("app.controllers.goals_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.goals_controller.get_all_goals_service", return_value=mock_goals):
         
         resp = client.get(
@@ -52,7 +52,7 @@ def test_get_all_goals_success(client):
 
 def test_get_all_goals_service_none(client):
     """If get_all_goals_service returns None => 500."""
-    with patch("app.controllers.goals_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.goals_controller.get_all_goals_service", return_value=None):
         
         resp = client.get(
@@ -64,7 +64,7 @@ def test_get_all_goals_service_none(client):
 
 def test_get_all_goals_invalid_token(client):
     """If token is invalid => 403."""
-    with patch("app.controllers.goals_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.get(
             "/api/goals/get-all-goals",
             headers={"Authorization": "Bearer invalid_token"}
@@ -82,7 +82,7 @@ def test_create_goal_success(client):
         "endDate": "2025-10-31",
         "completed": False
     }
-    with patch("app.controllers.goals_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.goals_controller.create_goal_service", return_value=mock_goal_data):
         
         resp = client.post(
@@ -95,7 +95,7 @@ def test_create_goal_success(client):
 
 def test_create_goal_invalid_data(client):
     """If data is missing => 400. (Simulated by empty body or minimal data.)"""
-    with patch("app.controllers.goals_controller.verify_token_service", return_value="user123"):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
         resp = client.post(
             "/api/goals/create-goal",
             data=json.dumps({}),  # no data
@@ -109,7 +109,7 @@ def test_create_goal_service_tuple_400(client):
     If create_goal_service returns ({"error":"something"}, 400),
     the controller should pass that along.
     """
-    with patch("app.controllers.goals_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.goals_controller.create_goal_service", return_value=({"error":"Some date error"}, 400)):
         
         resp = client.post(
@@ -122,7 +122,7 @@ def test_create_goal_service_tuple_400(client):
 
 def test_create_goal_service_none(client):
     """If create_goal_service returns None => 500."""
-    with patch("app.controllers.goals_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.goals_controller.create_goal_service", return_value=None):
         
         resp = client.post(
@@ -136,7 +136,7 @@ def test_create_goal_service_none(client):
 def test_get_goal_success(client):
     """GET /get-goal/<goal_id> => 200 if found."""
     mock_goal = {"id": "g1", "title": "MyGoal"}
-    with patch("app.controllers.goals_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.goals_controller.get_goal_service", return_value=mock_goal):
         
         resp = client.get(
@@ -148,7 +148,7 @@ def test_get_goal_success(client):
 
 def test_get_goal_not_found(client):
     """If get_goal_service returns None => 404."""
-    with patch("app.controllers.goals_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.goals_controller.get_goal_service", return_value=None):
         
         resp = client.get(
@@ -161,7 +161,7 @@ def test_get_goal_not_found(client):
 def test_complete_goal_success(client):
     """PATCH /complete-goal/<goal_id> => 200 if success."""
     mock_completed_goal = {"id": "g123", "completed": True}
-    with patch("app.controllers.goals_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.goals_controller.complete_goal_service", return_value=mock_completed_goal):
         
         resp = client.patch(
@@ -173,7 +173,7 @@ def test_complete_goal_success(client):
 
 def test_complete_goal_service_failure(client):
     """If complete_goal_service returns None => 500."""
-    with patch("app.controllers.goals_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.goals_controller.complete_goal_service", return_value=None):
         
         resp = client.patch(
@@ -35,7 +35,7 @@ def test_add_physical_data_success(client):
         "date": "2025-01-01"
     }
 
-    with patch("app.controllers.physicalData_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.physicalData_controller.add_physical_data_service", return_value=True):
         
         resp = client.post(
@@ -59,7 +59,7 @@ def test_add_physical_data_missing_params(client):
         "body_fat": 15,
         "date": "2025-01-01"
     }
-    with patch("app.controllers.physicalData_controller.verify_token_service", return_value="user123"):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
         resp = client.post(
             "/api/physical-data/add",
             data=json.dumps(mock_data),
@@ -76,7 +76,7 @@ def test_add_physical_data_invalid_token(client):
     If token is invalid => 403.
     """
     mock_data = {"weight": 70, "body_fat": 15, "body_muscle": 40}
-    with patch("app.controllers.physicalData_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.post(
             "/api/physical-data/add",
             data=json.dumps(mock_data),
@@ -93,7 +93,7 @@ def test_add_physical_data_service_failure(client):
     If add_physical_data_service returns False => 500.
     """
     mock_data = {"weight": 70, "body_fat": 15, "body_muscle": 40, "date": "2025-01-01"}
-    with patch("app.controllers.physicalData_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.physicalData_controller.add_physical_data_service", return_value=False):
         
         resp = client.post(
@@ -115,7 +115,7 @@ def test_get_physical_data_success(client):
         {"date": "2025-01-01", "weight": 70, "body_fat": 15, "body_muscle": 40},
         {"date": "2025-01-08", "weight": 72, "body_fat": 14, "body_muscle": 41}
     ]
-    with patch("app.controllers.physicalData_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.physicalData_controller.get_physical_data_service", return_value=mock_physical_data):
         
         resp = client.get(
@@ -131,7 +131,7 @@ def test_get_physical_data_invalid_token(client):
     """
     If token is invalid => 403.
     """
-    with patch("app.controllers.physicalData_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.get(
             "/api/physical-data/get-physical-data",
             headers={"Authorization": "Bearer invalid_token"}
@@ -143,7 +143,7 @@ def test_get_physical_data_service_failure(client):
     """
     If get_physical_data_service returns Falsey => 500.
     """
-    with patch("app.controllers.physicalData_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.physicalData_controller.get_physical_data_service", return_value=None):
         
         resp = client.get(
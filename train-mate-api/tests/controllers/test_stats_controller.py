@@ -0,0 +1,40 @@
+import pytest
+from unittest.mock import patch
+from app import create_app
+
+@pytest.fixture
+def stats_client():
+    with patch.dict("os.environ", {"INTERNAL_STATS_ENABLED": "true"}):
+        app = create_app()
+    with app.test_client() as client:
+        yield client
+
+def test_health_check_is_plain_liveness(client):
+    with patch("app.services.job_queue_service.get_job_queue") as mock_get_queue:
+        resp = client.get("/healthCheck")
+
+    assert resp.status_code == 200
+    assert resp.get_json() == {"api": "All is up working!"}
+    mock_get_queue.assert_not_called()
+
+def test_stats_are_opt_in(client):
+    resp = client.get("/internal/stats", headers={"Authorization": "Bearer valid_token"})
+    assert resp.status_code == 404
+
+def test_stats_missing_auth(stats_client):
+    resp = stats_client.get("/internal/stats")
+    assert resp.status_code == 403
+
+def test_stats_success(stats_client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.stats_controller.get_token_cache_stats", return_value={"hits": 3}), \
+         patch("app.controllers.stats_controller.get_popular_exercises_cache_stats", return_value={}), \
+         patch("app.controllers.stats_controller.get_default_categories_cache_stats", return_value={}), \
+         patch("app.services.job_queue_service._queue", None):
+        resp = stats_client.get("/internal/stats", headers={"Authorization": "Bearer valid_token"})
+
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["token_cache"] == {"hits": 3}
+    # No job enqueued yet => the queue is not created just to report on it
+    assert body["job_queue"] is None
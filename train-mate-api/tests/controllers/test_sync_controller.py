@@ -0,0 +1,41 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+def test_sync_missing_auth(client):
+    resp = client.get("/api/sync")
+    assert resp.status_code == 403
+
+def test_sync_success(client):
+    collections = {
+        "workouts": {"full": False, "changed": [], "deleted": ["w1"], "high_water_mark": 1736244000000},
+        "trainings": {"full": True, "changed": [], "deleted": [], "high_water_mark": 1736244000000},
+        "categories": {"full": True, "changed": [], "deleted": [], "high_water_mark": 1736244000000}
+    }
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.sync_controller.sync_user_collections", return_value=collections) as mock_sync:
+        resp = client.get("/api/sync?workouts=1736244000000", headers={"Authorization": "Bearer valid_token"})
+
+    assert resp.status_code == 200
+    assert resp.get_json() == {"collections": collections}
+    mock_sync.assert_called_once_with("user123", {
+        "workouts": datetime(2025, 1, 7, 10, 0, tzinfo=timezone.utc),
+        "trainings": None,
+        "categories": None
+    })
+
+def test_sync_invalid_high_water_mark(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.sync_controller.sync_user_collections") as mock_sync:
+        resp = client.get("/api/sync?trainings=abc", headers={"Authorization": "Bearer valid_token"})
+
+    assert resp.status_code == 400
+    assert "trainings" in resp.get_json()["error"]
+    mock_sync.assert_not_called()
+
+def test_sync_exception(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.sync_controller.sync_user_collections", side_effect=Exception("Boom!")):
+        resp = client.get("/api/sync", headers={"Authorization": "Bearer valid_token"})
+
+    assert resp.status_code == 500
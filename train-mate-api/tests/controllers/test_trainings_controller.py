@@ -1,6 +1,7 @@
 import pytest
 import json
 from unittest.mock import patch, MagicMock
+from datetime import datetime
 
 def mock_verify_token(token):
     """
@@ -50,7 +51,7 @@ def test_save_training_success(client):
     }
     mock_saved_training = {"id": "new_training_id", "exercises": ["ex1", "ex2"], "name": "My Training", "calories_per_hour_mean": 350}
 
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.trainings_controller.save_user_training", return_value=mock_saved_training):
         
         response = client.post(
@@ -74,7 +75,7 @@ def test_save_training_invalid_token(client):
         ],
         "name": "My Training"
     }
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         response = client.post(
             "/api/trainings/save-training",
             data=json.dumps(data),
@@ -90,7 +91,7 @@ def test_save_training_exception(client):
         ],
         "name": "Cause DB error"
     }
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.trainings_controller.save_user_training", side_effect=Exception("DB error")):
 
         response = client.post(
@@ -109,7 +110,7 @@ def test_get_trainings_success(client):
         {"id": "t1", "exercises": ["ex1", "ex2"]},
         {"id": "t2", "exercises": ["ex3"]}
     ]
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.trainings_controller.get_user_trainings", return_value=mock_trainings):
         
         response = client.get(
@@ -121,8 +122,46 @@ def test_get_trainings_success(client):
     assert len(resp_json["trainings"]) == 2
     assert resp_json["trainings"][0]["id"] == "t1"
 
+def test_get_trainings_etag_not_modified(client):
+    """
+    Same trainings_last_modified => the ETag matches and the trainings are not read.
+    """
+    last_modified = datetime(2025, 1, 7, 10, 0)
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.conditional_get.get_last_modified_timestamp", return_value=last_modified), \
+         patch("app.controllers.trainings_controller.get_user_trainings", return_value=[]) as mock_get:
+        first = client.get("/api/trainings/get-trainings", headers={"Authorization": "Bearer valid_token"})
+        etag = first.headers["ETag"]
+        second = client.get(
+            "/api/trainings/get-trainings",
+            headers={"Authorization": "Bearer valid_token", "If-None-Match": etag}
+        )
+
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    mock_get.assert_called_once_with("user123")
+
+def test_get_trainings_etag_changes_with_last_modified(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.conditional_get.get_last_modified_timestamp", return_value=datetime(2025, 1, 7)), \
+         patch("app.controllers.trainings_controller.get_user_trainings", return_value=[]):
+        etag = client.get("/api/trainings/get-trainings", headers={"Authorization": "Bearer valid_token"}).headers["ETag"]
+
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.conditional_get.get_last_modified_timestamp", return_value=datetime(2025, 1, 8)), \
+         patch("app.controllers.trainings_controller.get_user_trainings", return_value=[]) as mock_get:
+        response = client.get(
+            "/api/trainings/get-trainings",
+            headers={"Authorization": "Bearer valid_token", "If-None-Match": etag}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    mock_get.assert_called_once()
+
 def test_get_trainings_invalid_token(client):
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         response = client.get(
             "/api/trainings/get-trainings",
             headers={"Authorization": "Bearer invalid_token"}
@@ -131,7 +170,7 @@ def test_get_trainings_invalid_token(client):
     assert "Invalid token" in response.get_json()["error"]
 
 def test_get_trainings_exception(client):
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.trainings_controller.get_user_trainings", side_effect=Exception("Boom!")):
         
         response = client.get(
@@ -146,7 +185,7 @@ def test_get_training_by_id_success(client):
     GET /get-training/<training_id> => 200 if found.
     """
     mock_training = {"id": "t123", "exercises": ["ex1"]}
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.trainings_controller.get_training_by_id", return_value=mock_training):
         
         response = client.get(
@@ -160,7 +199,7 @@ def test_get_training_by_id_not_found(client):
     """
     If get_training_by_id returns None => 404
     """
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.trainings_controller.get_training_by_id", return_value=None):
         
         response = client.get(
@@ -171,7 +210,7 @@ def test_get_training_by_id_not_found(client):
     assert "Training not found" in response.get_json()["error"]
 
 def test_get_training_by_id_exception(client):
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.trainings_controller.get_training_by_id", side_effect=Exception("Oops")):
         
         response = client.get(
@@ -208,7 +247,7 @@ def test_get_last_modified_success(client):
     import datetime
     mock_time = datetime.datetime(2025, 1, 1, 0, 0)
 
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.trainings_controller.get_last_modified_timestamp", return_value=mock_time):
         
         response = client.get(
@@ -222,7 +261,7 @@ def test_get_last_modified_success(client):
     assert resp_json["last_modified_timestamp"] == int(mock_time.timestamp() * 1000)
 
 def test_get_last_modified_no_date(client):
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.trainings_controller.get_last_modified_timestamp", return_value=None):
         
         response = client.get(
@@ -235,7 +274,7 @@ def test_get_last_modified_no_date(client):
     assert resp_json["last_modified_timestamp"] is None
 
 def test_get_last_modified_invalid_token(client):
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         response = client.get(
             "/api/trainings/last-modified",
             headers={"Authorization": "Bearer invalid_token"}
@@ -244,7 +283,7 @@ def test_get_last_modified_invalid_token(client):
     assert "Invalid token" in response.get_json()["error"]
 
 def test_get_last_modified_exception(client):
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.trainings_controller.get_last_modified_timestamp", side_effect=Exception("Err")):
         
         response = client.get(
@@ -261,8 +300,8 @@ def test_update_last_modified_success(client):
     import datetime
     mock_time = datetime.datetime(2025, 1, 2, 0, 0)
 
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
-         patch("app.controllers.trainings_controller.set_last_modified_timestamp", return_value=mock_time):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.trainings_controller.get_last_modified_timestamp", return_value=mock_time):
         
         response = client.post(
             "/api/trainings/update-last-modified",
@@ -275,20 +314,20 @@ def test_update_last_modified_success(client):
 
 def test_update_last_modified_no_time(client):
     """
-    If set_last_modified_timestamp returns None => 500
+    No-op kept for compatibility: without a stored timestamp => 200 with None
     """
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
-         patch("app.controllers.trainings_controller.set_last_modified_timestamp", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.trainings_controller.get_last_modified_timestamp", return_value=None):
         
         response = client.post(
             "/api/trainings/update-last-modified",
             headers={"Authorization": "Bearer valid_token"}
         )
-    assert response.status_code == 500
-    assert "Error updating last modified timestamp" in response.get_json()["error"]
+    assert response.status_code == 200
+    assert response.get_json()["last_modified_timestamp"] is None
 
 def test_update_last_modified_invalid_token(client):
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         response = client.post(
             "/api/trainings/update-last-modified",
             headers={"Authorization": "Bearer invalid_token"}
@@ -297,8 +336,8 @@ def test_update_last_modified_invalid_token(client):
     assert "Invalid token" in response.get_json()["error"]
 
 def test_update_last_modified_exception(client):
-    with patch("app.controllers.trainings_controller.verify_token_service", return_value="user123"), \
-         patch("app.controllers.trainings_controller.set_last_modified_timestamp", side_effect=Exception("Boom!")):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.trainings_controller.get_last_modified_timestamp", side_effect=Exception("Boom!")):
         
         response = client.post(
             "/api/trainings/update-last-modified",
@@ -7,7 +7,7 @@ def test_save_user_info_success(client):
     POST /save-user-info => 201 on success.
     """
     data = {"name": "John Doe", "email": "john@example.com", "sex": "male", "weight": 70, "height": 180, "birthday": "1990-01-01"}
-    with patch("app.controllers.user_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.user_controller.save_user_info_service") as mock_save:
         
         resp = client.post(
@@ -29,7 +29,7 @@ def test_save_user_info_invalid_token(client):
     If verify_token_service returns None => 401
     """
     data = {"name": "John Doe", "email": "john@example.com"}
-    with patch("app.controllers.user_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.post(
             "/save-user-info",
             data=json.dumps(data),
@@ -46,7 +46,7 @@ def test_save_user_info_exception(client):
     If an exception is raised => 500
     """
     data = {"name": "John Doe", "email": "john@example.com", "sex": "male", "weight": 70, "height": 180, "birthday": "1990-01-01"}
-    with patch("app.controllers.user_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.user_controller.save_user_info_service", side_effect=Exception("DB error")):
         
         resp = client.post(
@@ -65,7 +65,7 @@ def test_get_user_info_success(client):
     GET /get-user-info => 200 if user info found
     """
     mock_user_info = {"name": "Jane Doe", "email": "jane@example.com"}
-    with patch("app.controllers.user_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.user_controller.get_user_info_service", return_value=mock_user_info):
         
         resp = client.get(
@@ -80,7 +80,7 @@ def test_get_user_info_not_found(client):
     """
     If get_user_info_service returns None => 404
     """
-    with patch("app.controllers.user_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.user_controller.get_user_info_service", return_value=None):
         
         resp = client.get(
@@ -91,7 +91,7 @@ def test_get_user_info_not_found(client):
     assert "User not found" in resp.get_json()["error"]
 
 def test_get_user_info_invalid_token(client):
-    with patch("app.controllers.user_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.get(
             "/get-user-info",
             headers={"Authorization": "Bearer invalid_token"}
@@ -103,7 +103,7 @@ def test_get_user_info_exception(client):
     """
     If an exception is raised => 500
     """
-    with patch("app.controllers.user_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.user_controller.get_user_info_service", side_effect=Exception("DB error")):
         
         resp = client.get(
@@ -118,7 +118,7 @@ def test_update_user_info_success(client):
     PUT /update-user-info => 200 on success
     """
     data = {"name": "Updated User", "email": "updated@example.com"}
-    with patch("app.controllers.user_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.user_controller.update_user_info_service") as mock_update:
         
         resp = client.put(
@@ -136,7 +136,7 @@ def test_update_user_info_success(client):
 
 def test_update_user_info_invalid_token(client):
     data = {"name": "Nope"}
-    with patch("app.controllers.user_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.put(
             "/update-user-info",
             data=json.dumps(data),
@@ -150,7 +150,7 @@ def test_update_user_info_invalid_token(client):
 
 def test_update_user_info_exception(client):
     data = {"name": "Crash"}
-    with patch("app.controllers.user_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.user_controller.update_user_info_service", side_effect=Exception("DB error")):
         
         resp = client.put(
@@ -12,7 +12,7 @@ def test_add_water_intake_success(client):
         "public": True,
         "date": "2025-10-10"
     }
-    with patch("app.controllers.water_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.water_controller.add_water_intake_service", return_value=True) as mock_add:
         
         response = client.post(
@@ -35,7 +35,7 @@ def test_add_water_intake_missing_qty(client):
     """
     If quantity_in_militers is not provided => 400
     """
-    with patch("app.controllers.water_controller.verify_token_service", return_value="user123"):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
         response = client.post(
             "/api/water-intake/add",
             data=json.dumps({}),  # no quantity_in_militers
@@ -52,7 +52,7 @@ def test_add_water_intake_invalid_token(client):
     If token is invalid => 403
     """
     mock_data = {"quantity_in_militers": 500, "date": "2025-10-10"}
-    with patch("app.controllers.water_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         response = client.post(
             "/api/water-intake/add",
             data=json.dumps(mock_data),
@@ -77,7 +77,7 @@ def test_add_water_intake_service_failure(client):
     If add_water_intake_service returns False => 500
     """
     mock_data = {"quantity_in_militers": 500, "date": "2025-10-10"}
-    with patch("app.controllers.water_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.water_controller.add_water_intake_service", return_value=False):
         
         response = client.post(
@@ -96,7 +96,7 @@ def test_add_water_intake_exception(client):
     If an exception is raised => 500
     """
     mock_data = {"quantity_in_militers": 500, "date": "2025-10-10"}
-    with patch("app.controllers.water_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.water_controller.add_water_intake_service", side_effect=Exception("DB error")):
         
         response = client.post(
@@ -114,7 +114,7 @@ def test_get_daily_water_intake_success(client):
     """
     GET /get-daily-water-intake => 200 on success
     """
-    with patch("app.controllers.water_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.water_controller.get_daily_water_intake_service", return_value=750):
         
         response = client.get(
@@ -132,7 +132,7 @@ def test_get_daily_water_intake_none(client):
     """
     If get_daily_water_intake_service returns None => message=No water intake..., quantity=0 => 200
     """
-    with patch("app.controllers.water_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.water_controller.get_daily_water_intake_service", return_value=None):
         
         response = client.get(
@@ -145,7 +145,7 @@ def test_get_daily_water_intake_none(client):
     assert resp_json["quantity_in_militers"] == 0
 
 def test_get_daily_water_intake_invalid_token(client):
-    with patch("app.controllers.water_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         response = client.get(
             "/api/water-intake/get-daily-water-intake",
             headers={"Authorization": "Bearer invalid_token"}
@@ -159,7 +159,7 @@ def test_get_daily_water_intake_missing_auth(client):
     assert "Authorization token missing" in response.get_json()["error"]
 
 def test_get_daily_water_intake_exception(client):
-    with patch("app.controllers.water_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.water_controller.get_daily_water_intake_service", side_effect=Exception("DB fail")):
         
         response = client.get(
@@ -177,7 +177,7 @@ def test_get_water_intake_history_success(client):
         {"date": "2023-01-01", "quantity_in_militers": 1000},
         {"date": "2023-01-02", "quantity_in_militers": 1200},
     ]
-    with patch("app.controllers.water_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.water_controller.get_water_intake_history_service", return_value=history_data):
         
         response = client.get(
@@ -193,7 +193,7 @@ def test_get_water_intake_history_missing_dates(client):
     """
     If start_date or end_date missing => 400
     """
-    with patch("app.controllers.water_controller.verify_token_service", return_value="user123"):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
         response = client.get(
             "/api/water-intake/get-water-intake-history",  # no params
             headers={"Authorization": "Bearer valid_token"}
@@ -218,7 +218,7 @@ def test_get_water_intake_history_missing_auth(client):
     assert "Authorization token missing" in response.get_json()["error"]
 
 def test_get_water_intake_history_exception(client):
-    with patch("app.controllers.water_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.water_controller.get_water_intake_history_service", side_effect=Exception("DB fail")):
         
         response = client.get(
@@ -226,4 +226,22 @@ def test_get_water_intake_history_exception(client):
             headers={"Authorization": "Bearer valid_token"}
         )
     assert response.status_code == 500
-    assert "Something went wrong" in response.get_json()["error"]
\ No newline at end of file
+    assert "Something went wrong" in response.get_json()["error"]
+def test_get_water_intake_history_by_month(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.water_controller.get_water_intake_history_service", return_value=[]) as mock_history:
+        response = client.get(
+            "/api/water-intake/get-water-intake-history?start_date=2024-01-01&end_date=2024-12-31&granularity=month",
+            headers={"Authorization": "Bearer valid_token"}
+        )
+    assert response.status_code == 200
+    mock_history.assert_called_once_with("user123", "2024-01-01", "2024-12-31", "month")
+
+def test_get_water_intake_history_invalid_granularity(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
+        response = client.get(
+            "/api/water-intake/get-water-intake-history?start_date=2024-01-01&end_date=2024-12-31&granularity=year",
+            headers={"Authorization": "Bearer valid_token"}
+        )
+    assert response.status_code == 400
+    assert "Invalid granularity" in response.get_json()["error"]
@@ -19,7 +19,7 @@ def test_save_workout_success(client):
         "total_calories": 300
     }
     mock_training_data = {"calories_per_hour_mean": 400}
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.workout_controller.get_training_by_id", return_value=mock_training_data), \
          patch("app.controllers.workout_controller.save_user_workout", return_value=mock_workout):
         
@@ -38,7 +38,7 @@ def test_save_workout_missing_training_id(client):
     If training_id is missing => 400
     """
     data = {"duration": 30}
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
         resp = client.post(
             "/api/workouts/save-workout",
             data=json.dumps(data),
@@ -55,7 +55,7 @@ def test_save_workout_invalid_duration(client):
         "date": "2025-01-01",
         "coach": "CoachA"
     }
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
         resp = client.post(
             "/api/workouts/save-workout",
             data=json.dumps(data),
@@ -70,7 +70,7 @@ def test_save_workout_invalid_token(client):
     If verify_token_service returns None => 401
     """
     data = {"training_id": "abc", "duration":30}
-    with patch("app.controllers.workout_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.post(
             "/api/workouts/save-workout",
             data=json.dumps(data),
@@ -86,7 +86,7 @@ def test_save_workout_exception(client):
         "date": "2025-01-01",
         "coach": "CoachA"
     }
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.workout_controller.get_training_by_id", side_effect=Exception("DB error")):
 
         resp = client.post(
@@ -115,10 +115,10 @@ def test_get_workouts_success(client):
     mock_ex2 = {"name":"Sit-ups","calories_per_hour":250}
     mock_ex3 = {"name":"Squats","calories_per_hour":400}
 
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.workout_controller.get_user_workouts", return_value=mock_workouts), \
-         patch("app.controllers.workout_controller.get_training_by_id", side_effect=[mock_training_data_t1,mock_training_data_t2]), \
-         patch("app.controllers.workout_controller.get_exercise_by_id_service", side_effect=[mock_ex1,mock_ex2,mock_ex3]):
+         patch("app.services.workout_service.get_trainings_by_ids", return_value={"t1": mock_training_data_t1, "t2": mock_training_data_t2}), \
+         patch("app.services.workout_service.get_exercises_by_ids", return_value={"ex1": mock_ex1, "ex2": mock_ex2, "ex3": mock_ex3}):
 
         resp = client.get(
             "/api/workouts/workouts?startDate=2023-01-01&endDate=2023-01-31",
@@ -133,19 +133,76 @@ def test_get_workouts_success(client):
     # "exercises" replaced with mock_ex1,mock_ex2
     ex_list = w1["training"]["exercises"]
     assert ex_list[0]["name"] == "Push-ups"
+    assert ex_list[0]["id"] == "ex1"
     assert ex_list[1]["name"] == "Sit-ups"
 
+def test_get_workouts_paginated(client):
+    mock_workouts = [{"id": "w3", "training_id": "t1", "date": "2023-01-03"}]
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.workout_controller.get_user_workouts") as mock_all, \
+         patch("app.controllers.workout_controller.get_user_workouts_page", return_value=(mock_workouts, "cursor2")) as mock_page, \
+         patch("app.services.workout_service.get_trainings_by_ids", return_value={}), \
+         patch("app.services.workout_service.get_exercises_by_ids", return_value={}):
+        resp = client.get(
+            "/api/workouts/workouts?limit=500&cursor=cursor1",
+            headers={"Authorization": "Bearer valid_token"}
+        )
+    assert resp.status_code == 200
+    resp_json = resp.get_json()
+    assert resp_json["next_cursor"] == "cursor2"
+    assert resp_json["workouts"][0]["id"] == "w3"
+    # limit is capped, and the full history is not read
+    mock_page.assert_called_once_with("user123", None, None, 100, "cursor1")
+    mock_all.assert_not_called()
+
+def test_get_workouts_etag_not_modified(client):
+    last_modified = datetime(2025, 1, 7, 10, 0)
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.conditional_get.get_last_modified_timestamp", return_value=last_modified) as mock_last_modified, \
+         patch("app.controllers.workout_controller.get_user_workouts", return_value=[]) as mock_all:
+        etag = client.get("/api/workouts/workouts?startDate=2025-01-01", headers={"Authorization": "Bearer valid_token"}).headers["ETag"]
+        not_modified = client.get(
+            "/api/workouts/workouts?startDate=2025-01-01",
+            headers={"Authorization": "Bearer valid_token", "If-None-Match": etag}
+        )
+        # Other filters => other ETag
+        other_range = client.get(
+            "/api/workouts/workouts?startDate=2025-01-02",
+            headers={"Authorization": "Bearer valid_token", "If-None-Match": etag}
+        )
+
+    assert not_modified.status_code == 304
+    assert other_range.status_code == 200
+    assert mock_all.call_count == 2
+    # The embedded trainings count too
+    assert {c.args[1] for c in mock_last_modified.call_args_list} == {"workouts", "trainings"}
+
+def test_get_workouts_without_metadata_has_no_etag(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.workout_controller.get_user_workouts", return_value=[]):
+        response = client.get("/api/workouts/workouts", headers={"Authorization": "Bearer valid_token", "If-None-Match": "*"})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+def test_get_workouts_paginated_invalid_params(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
+        bad_limit = client.get("/api/workouts/workouts?limit=-1", headers={"Authorization": "Bearer valid_token"})
+        bad_cursor = client.get("/api/workouts/workouts?limit=5&cursor=garbage", headers={"Authorization": "Bearer valid_token"})
+    assert bad_limit.status_code == 400
+    assert bad_cursor.status_code == 400
+    assert "Invalid cursor" in bad_cursor.get_json()["error"]
+
 def test_get_workouts_invalid_token(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.get(
             "/api/workouts/workouts",
             headers={"Authorization": "Bearer invalid_token"}
         )
     assert resp.status_code == 401
-    assert "Token inválido" in resp.get_json()["error"]
+    assert "Invalid token" in resp.get_json()["error"]
 
 def test_get_workouts_exception(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.workout_controller.get_user_workouts", side_effect=Exception("DB error")):
         resp = client.get(
             "/api/workouts/workouts",
@@ -161,7 +218,7 @@ def test_get_workouts_calories_success(client):
     mock_calories = [300, 400]
     mock_dates = ["2023-01-01","2023-01-02"]
     mock_tids = ["t1","t2"]
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.workout_controller.get_user_calories_from_workouts", return_value=(mock_calories,mock_dates,mock_tids)):
         
         resp = client.get(
@@ -177,16 +234,16 @@ def test_get_workouts_calories_success(client):
     assert wcad[0]["training_id"] == "t1"
 
 def test_get_workouts_calories_invalid_token(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.get(
             "/api/workouts/get-workouts-calories?start_date=2023-01-01&end_date=2023-01-31",
             headers={"Authorization": "Bearer invalid_token"}
         )
     assert resp.status_code == 401
-    assert "Token inválido" in resp.get_json()["error"]
+    assert "Invalid token" in resp.get_json()["error"]
 
 def test_get_workouts_calories_exception(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.workout_controller.get_user_calories_from_workouts", side_effect=Exception("DB error")):
         
         resp = client.get(
@@ -201,7 +258,7 @@ def test_cancel_workout_success(client):
     DELETE /cancel-workout/<workout_id> => returns what delete_user_workout returns
     """
     mock_response = ({"message":"Workout canceled"}, 200)
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.workout_controller.delete_user_workout", return_value=mock_response):
         
         resp = client.delete(
@@ -212,13 +269,13 @@ def test_cancel_workout_success(client):
     assert resp.get_json()["message"] == "Workout canceled"
 
 def test_cancel_workout_invalid_token(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.delete("/api/workouts/cancel-workout/w123", headers={"Authorization":"Bearer invalid_token"})
     assert resp.status_code == 401
     assert "Invalid token" in resp.get_json()["error"]
 
 def test_cancel_workout_exception(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.workout_controller.delete_user_workout", side_effect=Exception("DB crash")):
         
         resp = client.delete(
@@ -232,7 +289,7 @@ def test_get_last_modified_success(client):
     import datetime
     mock_time = datetime.datetime(2025,1,1,12,0,0)
 
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.workout_controller.get_last_modified_timestamp", return_value=mock_time):
         
         resp = client.get(
@@ -245,7 +302,7 @@ def test_get_last_modified_success(client):
     assert resp.get_json()["last_modified_timestamp"] == int(mock_time.timestamp() * 1000)
 
 def test_get_last_modified_none(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.workout_controller.get_last_modified_timestamp", return_value=None):
         
         resp = client.get(
@@ -256,13 +313,13 @@ def test_get_last_modified_none(client):
     assert resp.get_json()["last_modified_timestamp"] == None
 
 def test_get_last_modified_invalid_token(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.get("/api/workouts/last-modified", headers={"Authorization":"Bearer invalid_token"})
     assert resp.status_code == 401
     assert "Invalid token" in resp.get_json()["error"]
 
 def test_get_last_modified_exception(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
          patch("app.controllers.workout_controller.get_last_modified_timestamp", side_effect=Exception("DB err")):
         
         resp = client.get(
@@ -276,8 +333,8 @@ def test_update_last_modified_success(client):
     import datetime
     mock_time = datetime.datetime(2025,1,2,10,0,0)
 
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
-         patch("app.controllers.workout_controller.set_last_modified_timestamp", return_value=mock_time):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.workout_controller.get_last_modified_timestamp", return_value=mock_time):
         
         resp = client.post(
             "/api/workouts/update-last-modified",
@@ -288,26 +345,59 @@ def test_update_last_modified_success(client):
     assert "Last modified timestamp updated successfully" in resp_json["message"]
     assert resp_json["last_modified_timestamp"] == int(mock_time.timestamp() * 1000)
 
+def test_get_workouts_aggregates_success(client):
+    aggregates = [{"period": "2025-W18", "date": "2025-04-28", "total_calories": 900, "duration": 120, "count": 3}]
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.workout_controller.get_user_workouts_aggregates", return_value=aggregates) as mock_aggregates:
+        resp = client.get(
+            "/api/workouts/get-workouts-aggregates?startDate=2025-04-28&endDate=2025-05-04&granularity=week",
+            headers={"Authorization": "Bearer valid_token"}
+        )
+    assert resp.status_code == 200
+    assert resp.get_json()["aggregates"] == aggregates
+    mock_aggregates.assert_called_once_with("user123", "2025-04-28", "2025-05-04", "week")
+
+def test_get_workouts_aggregates_bad_params(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
+        missing = client.get("/api/workouts/get-workouts-aggregates?startDate=2025-04-28", headers={"Authorization": "Bearer valid_token"})
+        invalid = client.get(
+            "/api/workouts/get-workouts-aggregates?startDate=2025-04-28&endDate=2025-05-04&granularity=year",
+            headers={"Authorization": "Bearer valid_token"}
+        )
+    assert missing.status_code == 400
+    assert invalid.status_code == 400
+    assert "Invalid granularity" in invalid.get_json()["error"]
+
+def test_get_workouts_aggregates_invalid_date(client):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"):
+        resp = client.get(
+            "/api/workouts/get-workouts-aggregates?startDate=bad&endDate=2025-05-04",
+            headers={"Authorization": "Bearer valid_token"}
+        )
+    assert resp.status_code == 400
+    assert "Invalid date" in resp.get_json()["error"]
+
 def test_update_last_modified_no_time(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
-         patch("app.controllers.workout_controller.set_last_modified_timestamp", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.workout_controller.get_last_modified_timestamp", return_value=None):
         
         resp = client.post(
             "/api/workouts/update-last-modified",
             headers={"Authorization":"Bearer valid_token"}
         )
-    assert resp.status_code == 500
-    assert "Error updating last modified timestamp" in resp.get_json()["error"]
+    # No-op kept for compatibility: the writes stamp workouts_last_modified themselves
+    assert resp.status_code == 200
+    assert resp.get_json()["last_modified_timestamp"] is None
 
 def test_update_last_modified_invalid_token(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value=None):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value=None):
         resp = client.post("/api/workouts/update-last-modified", headers={"Authorization":"Bearer invalid_token"})
     assert resp.status_code == 401
     assert "Invalid token" in resp.get_json()["error"]
 
 def test_update_last_modified_exception(client):
-    with patch("app.controllers.workout_controller.verify_token_service", return_value="user123"), \
-         patch("app.controllers.workout_controller.set_last_modified_timestamp", side_effect=Exception("Crash")):
+    with patch("app.controllers.auth_middleware.verify_token_service", return_value="user123"), \
+         patch("app.controllers.workout_controller.get_last_modified_timestamp", side_effect=Exception("Crash")):
         
         resp = client.post(
             "/api/workouts/update-last-modified",
@@ -0,0 +1,138 @@
+import asyncio
+import operator
+import threading
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from app.services.async_service import (
+    get_documents_by_ids_async,
+    get_user_trainings_async,
+    get_user_workouts_async,
+    get_user_workouts_with_trainings_async,
+    run_async
+)
+
+OPERATORS = {'>=': operator.ge, '<=': operator.le}
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+class FakeQuery:
+    def __init__(self, client, path, filters=()):
+        self.client = client
+        self.path = path
+        self.filters = filters
+
+    def where(self, field, op, value):
+        return FakeQuery(self.client, self.path, self.filters + ((field, op, value),))
+
+    async def stream(self):
+        for doc_path, data in self.client.docs.items():
+            parent, doc_id = doc_path.rsplit('/', 1)
+            if parent == self.path and all(OPERATORS[op](data[field], value) for field, op, value in self.filters):
+                yield FakeSnapshot(doc_id, data)
+
+class FakeCollection(FakeQuery):
+    def document(self, doc_id):
+        return FakeDocumentRef(self.client, f'{self.path}/{doc_id}')
+
+class FakeDocumentRef:
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+
+    def collection(self, name):
+        return FakeCollection(self.client, f'{self.path}/{name}')
+
+class FakeAsyncClient:
+    def __init__(self, docs):
+        self.docs = docs
+        self.get_all_calls = []
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    async def get_all(self, refs):
+        self.get_all_calls.append([ref.path for ref in refs])
+        for ref in refs:
+            yield FakeSnapshot(ref.path.rsplit('/', 1)[1], self.docs.get(ref.path))
+
+@pytest.fixture
+def fake_client():
+    client = FakeAsyncClient({
+        'trainings/user123/user_trainings/tr1': {'name': 'Legs', 'exercises': ['ex1', 'ex2', 'missing']},
+        'trainings/user123/user_trainings/tr2': {'name': 'Arms', 'exercises': ['ex2']},
+        'exercises/ex1': {'name': 'Squats'},
+        'exercises/ex2': {'name': 'Curls'},
+        'workouts/user123/user_workouts/w1': {'training_id': 'tr1', 'date': datetime(2025, 1, 7, 10, 0)},
+        'workouts/user123/user_workouts/w2': {'training_id': 'tr1', 'date': datetime(2025, 1, 9, 10, 0)},
+    })
+    with patch("app.services.async_service.get_async_db", return_value=client):
+        yield client
+
+def test_get_documents_by_ids_async_reads_chunks_together(fake_client):
+    with patch("app.services.async_service.BATCH_READ_SIZE", 1):
+        documents = asyncio.run(get_documents_by_ids_async('exercises', ['ex1', 'ex2', 'ex1', None, 'missing']))
+
+    assert documents == {'ex1': {'name': 'Squats'}, 'ex2': {'name': 'Curls'}}
+    assert fake_client.get_all_calls == [['exercises/ex1'], ['exercises/ex2'], ['exercises/missing']]
+
+def test_get_user_trainings_async(fake_client):
+    trainings = asyncio.run(get_user_trainings_async('user123'))
+
+    assert trainings == [
+        {'name': 'Legs', 'id': 'tr1', 'exercises': [
+            {'name': 'Squats', 'exercise_id': 'ex1'},
+            {'name': 'Curls', 'exercise_id': 'ex2'}
+        ]},
+        {'name': 'Arms', 'id': 'tr2', 'exercises': [{'name': 'Curls', 'exercise_id': 'ex2'}]}
+    ]
+    # Every distinct exercise read once
+    assert fake_client.get_all_calls == [['exercises/ex1', 'exercises/ex2', 'exercises/missing']]
+
+def test_get_user_workouts_async_filters_dates(fake_client):
+    workouts = asyncio.run(get_user_workouts_async('user123', start_date='2025-01-08'))
+    assert [workout['id'] for workout in workouts] == ['w2']
+
+    with pytest.raises(ValueError):
+        asyncio.run(get_user_workouts_async('user123', start_date='08/01/2025'))
+
+def test_get_user_workouts_with_trainings_async(fake_client):
+    workouts = asyncio.run(get_user_workouts_with_trainings_async('user123'))
+
+    assert [workout['training']['name'] for workout in workouts] == ['Legs', 'Legs']
+    assert workouts[0]['training']['exercises'] == [{'name': 'Squats', 'id': 'ex1'}, {'name': 'Curls', 'id': 'ex2'}]
+    # One read for the distinct trainings, one for their exercises
+    assert fake_client.get_all_calls == [
+        ['trainings/user123/user_trainings/tr1'],
+        ['exercises/ex1', 'exercises/ex2', 'exercises/missing']
+    ]
+
+def test_run_async_reuses_one_loop_across_request_threads():
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    loops = []
+    threads = [threading.Thread(target=lambda: loops.append(run_async(current_loop()))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Same loop => same AsyncClient (and gRPC channel) for every request
+    assert len(loops) == 3
+    assert len(set(loops)) == 1
+    assert loops[0].is_running()
+
+def test_run_async_raises_the_coroutine_error():
+    async def invalid_date():
+        raise ValueError("bad date")
+
+    with pytest.raises(ValueError):
+        run_async(invalid_date())
@@ -0,0 +1,71 @@
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from app.services.auth_service import (
+    verify_token_service,
+    get_token_cache_stats,
+    clear_token_cache
+)
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    clear_token_cache()
+    yield
+    clear_token_cache()
+
+def test_verify_token_service_caches_verified_tokens():
+    """
+    The same token is verified once; later calls are served from the cache.
+    """
+    mock_auth = MagicMock()
+    mock_auth.verify_id_token.return_value = {"uid": "user123", "exp": time.time() + 3600}
+
+    with patch("app.services.auth_service.auth", mock_auth):
+        uids = [verify_token_service("valid_token") for _ in range(5)]
+
+    assert uids == ["user123"] * 5
+    mock_auth.verify_id_token.assert_called_once_with("valid_token")
+
+    stats = get_token_cache_stats()
+    assert stats["hits"] == 4
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.8
+    assert stats["verifications"] == 1
+    assert stats["avg_verification_ms"] >= 0
+
+def test_verify_token_service_respects_token_exp():
+    """
+    An entry never outlives the token's 'exp' claim.
+    """
+    mock_auth = MagicMock()
+    now = time.time()
+    mock_auth.verify_id_token.return_value = {"uid": "user123", "exp": now + 10}
+
+    with patch("app.services.auth_service.auth", mock_auth):
+        verify_token_service("short_lived")
+        with patch("app.services.auth_service.time.time", return_value=now + 11):
+            verify_token_service("short_lived")
+
+    assert mock_auth.verify_id_token.call_count == 2
+
+def test_verify_token_service_does_not_cache_expired_tokens():
+    mock_auth = MagicMock()
+    mock_auth.verify_id_token.return_value = {"uid": "user123", "exp": time.time() - 1}
+
+    with patch("app.services.auth_service.auth", mock_auth):
+        verify_token_service("expired")
+        verify_token_service("expired")
+
+    assert mock_auth.verify_id_token.call_count == 2
+    assert get_token_cache_stats()["size"] == 0
+
+def test_verify_token_service_does_not_cache_failures():
+    mock_auth = MagicMock()
+    mock_auth.verify_id_token.side_effect = Exception("Token invalid")
+
+    with patch("app.services.auth_service.auth", mock_auth):
+        assert verify_token_service("bad_token") is None
+        assert verify_token_service("bad_token") is None
+
+    assert mock_auth.verify_id_token.call_count == 2
+    assert get_token_cache_stats()["hits"] == 0
@@ -0,0 +1,73 @@
+import time
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+from app.services.cache_service import SingleFlightCache
+
+def test_get_caches_value_until_ttl_expires():
+    loader = MagicMock(side_effect=[1, 2])
+    cache = SingleFlightCache(loader, ttl=60)
+
+    with patch("app.services.cache_service.time.monotonic", return_value=1000):
+        assert cache.get() == 1
+        assert cache.get() == 1
+    with patch("app.services.cache_service.time.monotonic", return_value=1061):
+        assert cache.get() == 2
+
+    assert loader.call_count == 2
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["recomputes"] == 2
+
+def test_concurrent_misses_trigger_a_single_recompute():
+    release = threading.Event()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        release.wait(5)
+        return ["popular"]
+
+    cache = SingleFlightCache(slow_loader, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+
+    # Wait until every follower is parked behind the leader
+    deadline = time.time() + 5
+    while cache.stats()["coalesced"] < 7 and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [["popular"]] * 8
+    assert cache.stats()["coalesced"] == 7
+
+def test_failed_refresh_serves_stale_value():
+    loader = MagicMock(side_effect=[["old"], Exception("Firestore down")])
+    cache = SingleFlightCache(loader, ttl=60)
+
+    assert cache.get() == ["old"]
+    cache.invalidate()
+    assert cache.get() == ["old"]
+
+    stats = cache.stats()
+    assert stats["failures"] == 1
+    assert stats["stale_served"] == 1
+
+def test_failure_without_stale_value_raises():
+    cache = SingleFlightCache(MagicMock(side_effect=Exception("Firestore down")), ttl=60)
+    with pytest.raises(Exception) as exc_info:
+        cache.get()
+    assert "Firestore down" in str(exc_info.value)
+
+def test_clear_drops_the_stale_value():
+    loader = MagicMock(side_effect=[["old"], Exception("Firestore down")])
+    cache = SingleFlightCache(loader, ttl=60)
+    cache.get()
+    cache.clear()
+    with pytest.raises(Exception):
+        cache.get()
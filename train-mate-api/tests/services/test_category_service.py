@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import patch, MagicMock
+from firebase_admin import firestore
 from app.services.category_service import (
     save_category,
     get_public_categories,
@@ -7,9 +8,25 @@ from app.services.category_service import (
     get_categories,
     get_category_by_id,
     delete_category,
-    update_category
+    update_category,
+    invalidate_categories_cache,
+    clear_categories_cache,
+    get_default_categories_cache_stats,
+    get_default_categories_version
 )
 
+@pytest.fixture(autouse=True)
+def empty_categories_cache():
+    clear_categories_cache()
+    yield
+    clear_categories_cache()
+
+def make_category_doc(doc_id, data):
+    doc = MagicMock()
+    doc.id = doc_id
+    doc.to_dict.return_value = data
+    return doc
+
 @pytest.mark.parametrize("name, icon, isCustom, owner", [
     ("Food", "food-icon", True, "user123"),
     ("Groceries", "groceries-icon", False, None)
@@ -19,12 +36,21 @@ def test_save_category_success(name, icon, isCustom, owner):
     mock_doc_ref.id = "fake_doc_id"
 
     # Mock db.collection().document() -> returns mock_doc_ref
-    with patch("app.services.category_service.db.collection") as mock_collection:
+    with patch("app.services.category_service.db.collection") as mock_collection, \
+         patch("app.services.category_service.db.batch") as mock_batch:
         mock_collection.return_value.document.return_value = mock_doc_ref
         
         success, category_data = save_category(name, icon, isCustom, owner)
     
     assert success is True
+    # The category and the owner's categories_last_modified stamp, in one batched write
+    batch = mock_batch.return_value
+    batch.set.assert_any_call(mock_doc_ref, {
+        "name": name, "icon": icon, "isCustom": isCustom, "owner": owner, "updated_at": firestore.SERVER_TIMESTAMP
+    })
+    assert "updated_at" not in category_data
+    assert batch.set.call_count == (2 if owner else 1)
+    batch.commit.assert_called_once()
     assert category_data["name"] == name
     assert category_data["icon"] == icon
     assert category_data["isCustom"] == isCustom
@@ -83,7 +109,8 @@ def test_get_categories_success():
         doc.id = f"public_id_{i}"
 
     with patch("app.services.category_service.get_personalized_categories", return_value=personalized_docs), \
-         patch("app.services.category_service.get_public_categories", return_value=public_docs):
+         patch("app.services.category_service.get_public_categories", return_value=public_docs), \
+         patch("app.services.category_service.get_last_modified_timestamp", return_value=None):
         result = get_categories("user123")
     
     assert len(result) == 3
@@ -93,10 +120,88 @@ def test_get_categories_success():
 
 def test_get_categories_failure():
     with patch("app.services.category_service.get_personalized_categories", side_effect=Exception("Boom!")), \
-         patch("app.services.category_service.get_public_categories", return_value=[]):
+         patch("app.services.category_service.get_public_categories", return_value=[]), \
+         patch("app.services.category_service.get_last_modified_timestamp", return_value=None):
         result = get_categories("user123")
     assert result == []
 
+def test_get_categories_default_categories_are_shared_between_users():
+    public_docs = [make_category_doc("public_id_0", {"owner": "default", "name": "Public0"})]
+
+    with patch("app.services.category_service.get_personalized_categories", return_value=[]), \
+         patch("app.services.category_service.get_public_categories", return_value=public_docs) as mock_public, \
+         patch("app.services.category_service.get_last_modified_timestamp", return_value=None):
+        first = get_categories("user123")
+        second = get_categories("user456")
+
+    mock_public.assert_called_once()
+    assert first == second == [{"owner": "default", "name": "Public0", "id": "public_id_0"}]
+    # Same dict, not a copy per request
+    assert first[0] is second[0]
+    assert get_default_categories_cache_stats()["hits"] == 1
+
+def test_get_categories_default_categories_invalidation():
+    with patch("app.services.category_service.get_personalized_categories", return_value=[]), \
+         patch("app.services.category_service.get_public_categories", return_value=[]) as mock_public, \
+         patch("app.services.category_service.get_last_modified_timestamp", return_value=None):
+        get_categories("user123")
+        invalidate_categories_cache("default")
+        get_categories("user123")
+
+    assert mock_public.call_count == 2
+
+def test_default_categories_version_changes_with_the_default_categories():
+    first_docs = [make_category_doc("public_id_0", {"owner": "default", "name": "Public0"})]
+    renamed_docs = [make_category_doc("public_id_0", {"owner": "default", "name": "Renamed"})]
+
+    with patch("app.services.category_service.get_public_categories", side_effect=[first_docs, renamed_docs]):
+        version = get_default_categories_version()
+        assert get_default_categories_version() == version
+        invalidate_categories_cache("default")
+        assert get_default_categories_version() != version
+
+def test_get_categories_user_categories_keyed_on_last_modified():
+    user_docs = [make_category_doc("personalized_id_0", {"owner": "user123", "name": "Mine"})]
+    last_modified = MagicMock(side_effect=["t1", "t1", "t2"])
+
+    with patch("app.services.category_service.get_personalized_categories", return_value=user_docs) as mock_user, \
+         patch("app.services.category_service.get_public_categories", return_value=[]), \
+         patch("app.services.category_service.get_last_modified_timestamp", last_modified):
+        get_categories("user123")
+        result = get_categories("user123")
+        assert mock_user.call_count == 1
+        # categories_last_modified changed -> reloaded
+        get_categories("user123")
+
+    assert mock_user.call_count == 2
+    assert result == [{"owner": "user123", "name": "Mine", "id": "personalized_id_0"}]
+
+def test_get_categories_user_categories_not_cached_without_last_modified():
+    with patch("app.services.category_service.get_personalized_categories", return_value=[]) as mock_user, \
+         patch("app.services.category_service.get_public_categories", return_value=[]), \
+         patch("app.services.category_service.get_last_modified_timestamp", return_value=None):
+        get_categories("user123")
+        get_categories("user123")
+
+    assert mock_user.call_count == 2
+
+def test_delete_category_drops_cached_user_categories():
+    mock_doc = MagicMock()
+    mock_doc.exists = True
+    mock_doc.to_dict.return_value = {"owner": "user123"}
+
+    with patch("app.services.category_service.get_personalized_categories", return_value=[]) as mock_user, \
+         patch("app.services.category_service.get_public_categories", return_value=[]), \
+         patch("app.services.category_service.get_last_modified_timestamp", return_value="t1"), \
+         patch("app.services.category_service.db.collection") as mock_collection, \
+         patch("app.services.category_service.db.batch"):
+        mock_collection.return_value.document.return_value.get.return_value = mock_doc
+        get_categories("user123")
+        delete_category("user123", "fake_id")
+        get_categories("user123")
+
+    assert mock_user.call_count == 2
+
 def test_get_category_by_id_success():
     mock_doc = MagicMock()
     mock_doc.exists = True
@@ -137,13 +242,22 @@ def test_delete_category_success():
     mock_doc.exists = True
     mock_doc.to_dict.return_value = {"owner": "user123"}
 
-    with patch("app.services.category_service.db.collection") as mock_collection:
+    with patch("app.services.category_service.db.collection") as mock_collection, \
+         patch("app.services.category_service.db.batch") as mock_batch:
         mock_collection.return_value.document.return_value.get.return_value = mock_doc
         
         success = delete_category("user123", "fake_id")
 
     assert success is True
-    mock_collection.return_value.document.return_value.delete.assert_called_once()
+    batch = mock_batch.return_value
+    batch.delete.assert_called_once_with(mock_collection.return_value.document.return_value)
+    # Tombstone for /api/sync, then the categories_last_modified stamp
+    tombstone = batch.set.call_args_list[0].args[1]
+    assert (tombstone["collection"], tombstone["document_id"]) == ("categories", "fake_id")
+    stamp = batch.set.call_args
+    assert list(stamp.args[1]) == ["categories_last_modified"]
+    assert stamp.kwargs == {"merge": True}
+    batch.commit.assert_called_once()
 
 def test_delete_category_not_found():
     mock_doc = MagicMock()
@@ -177,12 +291,19 @@ def test_update_category_success():
     mock_doc.exists = True
     mock_doc.to_dict.return_value = {"owner": "user123"}
 
-    with patch("app.services.category_service.db.collection") as mock_collection:
+    with patch("app.services.category_service.db.collection") as mock_collection, \
+         patch("app.services.category_service.db.batch") as mock_batch:
         mock_collection.return_value.document.return_value.get.return_value = mock_doc
         success = update_category("user123", "fake_id", {"name": "New Name"})
     
     assert success is True
-    mock_collection.return_value.document.return_value.update.assert_called_once_with({"name": "New Name"})
+    batch = mock_batch.return_value
+    batch.update.assert_called_once_with(
+        mock_collection.return_value.document.return_value,
+        {"name": "New Name", "updated_at": firestore.SERVER_TIMESTAMP}
+    )
+    assert list(batch.set.call_args.args[1]) == ["categories_last_modified"]
+    batch.commit.assert_called_once()
 
 def test_update_category_not_found():
     mock_doc = MagicMock()
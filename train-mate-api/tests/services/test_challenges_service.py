@@ -4,7 +4,10 @@ import pytest
 from unittest.mock import patch, MagicMock
 from app.services.challenges_service import (
     get_challenges_list_service,
-    create_challenges_service
+    create_challenges_service,
+    challenge_slug,
+    PHYSICAL_CHALLENGES,
+    WORKOUTS_CHALLENGES
 )
 
 @pytest.mark.parametrize("challenge_type, mock_doc_exists", [
@@ -75,25 +78,99 @@ def test_get_challenges_list_service_firestore_error():
         result = get_challenges_list_service(uid="test_uid", type="physical")
     assert result is None
 
-def test_create_challenges_service_success():
+def make_seed_db(existing_slugs=(), legacy_docs=()):
     """
-    Test the creation of challenges (both physical and workouts).
+    db mock where challenges/{uid}/{collection}/{slug} refs have a .path,
+    get_all reports the slugs in existing_slugs as present,
+    and streaming a collection returns legacy_docs.
     """
     mock_db = MagicMock()
+    user_ref = mock_db.collection.return_value.document.return_value
+
+    def collection(collection_name):
+        collection_ref = MagicMock()
+        def document(slug):
+            ref = MagicMock()
+            ref.id = slug
+            ref.path = f"challenges/test_uid/{collection_name}/{slug}"
+            return ref
+        collection_ref.document.side_effect = document
+        collection_ref.stream.return_value = [doc for doc in legacy_docs if doc.collection_name == collection_name]
+        return collection_ref
+    user_ref.collection.side_effect = collection
+
+    def get_all(refs):
+        snapshots = []
+        for ref in refs:
+            snapshot = MagicMock()
+            snapshot.reference = ref
+            snapshot.exists = ref.id in existing_slugs
+            snapshots.append(snapshot)
+        return snapshots
+    mock_db.get_all.side_effect = get_all
+    return mock_db, user_ref
+
+def test_challenge_slug():
+    assert challenge_slug("Coach's Pick") == "coachs-pick"
+    assert challenge_slug("Muscle Up!") == "muscle-up"
+    assert challenge_slug("Consistency is Key") == "consistency-is-key"
 
-    user_ref_mock = MagicMock()
-    user_doc_mock = MagicMock()
-    user_doc_mock.exists = False  # assume doc doesn't exist initially
-    user_ref_mock.get.return_value = user_doc_mock
+def test_create_challenges_service_success():
+    """
+    New user => every challenge is written in one batch, keyed by slug, after a single batched read.
+    """
+    mock_db, user_ref = make_seed_db()
 
-    # Patch where the db is imported in the service
-    with patch("app.services.challenges_service.db", mock_db):
-        mock_db.collection.return_value.document.return_value = user_ref_mock
+    with patch("app.services.challenges_service.db", mock_db), \
+         patch("app.services.documents_service.db", mock_db):
         result = create_challenges_service(uid="test_uid")
 
     assert result is True
-    # We can do more asserts to check if set(...) is called,
-    # but usually verifying True is enough if there's no exception.
+    mock_db.get_all.assert_called_once()
+    assert len(mock_db.get_all.call_args.args[0]) == len(PHYSICAL_CHALLENGES) + len(WORKOUTS_CHALLENGES)
+    batch = mock_db.batch.return_value
+    written = {c.args[0].id: c.args[1] for c in batch.set.call_args_list if c.args[0] is not user_ref}
+    assert len(written) == 14
+    assert written["coachs-pick"] == {"challenge": "Coach's Pick", "state": False}
+    batch.commit.assert_called_once()
+
+def test_create_challenges_service_is_idempotent():
+    """
+    Seeding again when all challenges exist => one read, no writes.
+    """
+    all_slugs = {challenge_slug(name) for name in PHYSICAL_CHALLENGES + WORKOUTS_CHALLENGES}
+    mock_db, user_ref = make_seed_db(existing_slugs=all_slugs)
+
+    with patch("app.services.challenges_service.db", mock_db), \
+         patch("app.services.documents_service.db", mock_db):
+        assert create_challenges_service(uid="test_uid") is True
+
+    mock_db.get_all.assert_called_once()
+    mock_db.batch.assert_not_called()
+
+def test_create_challenges_service_migrates_legacy_ids():
+    """
+    Auto-id duplicates from older seeds are deleted, and a completed state is kept.
+    """
+    legacy_docs = []
+    for doc_id, state in [("auto1", True), ("auto2", False)]:
+        doc = MagicMock()
+        doc.id = doc_id
+        doc.collection_name = "user_physical_challenges"
+        doc.to_dict.return_value = {"challenge": "Muscle Up!", "state": state}
+        legacy_docs.append(doc)
+    mock_db, user_ref = make_seed_db(legacy_docs=legacy_docs)
+
+    with patch("app.services.challenges_service.db", mock_db), \
+         patch("app.services.documents_service.db", mock_db):
+        assert create_challenges_service(uid="test_uid") is True
+
+    batch = mock_db.batch.return_value
+    deleted = [c.args[0] for c in batch.delete.call_args_list]
+    assert deleted == [legacy_docs[0].reference, legacy_docs[1].reference]
+    written = {c.args[0].id: c.args[1] for c in batch.set.call_args_list if c.args[0] is not user_ref}
+    assert written["muscle-up"] == {"challenge": "Muscle Up!", "state": True}
+    assert written["weight-watcher"] == {"challenge": "Weight Watcher", "state": False}
 
 def test_create_challenges_service_failure():
     """
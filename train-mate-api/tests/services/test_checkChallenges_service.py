@@ -1,9 +1,17 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from datetime import datetime, timedelta
+from app.services.challenges_service import challenge_slug
 from app.services.checkChallenges_service import (
     check_and_update_physical_challenges,
-    check_and_update_workouts_challenges
+    check_and_update_workouts_challenges,
+    complete_challenges,
+    build_physical_series,
+    evaluate_physical_challenges,
+    window_start,
+    consistency_is_key,
+    fat_loss_focus,
+    progress_pioneer
 )
 
 def test_check_and_update_physical_challenges_exception():
@@ -14,245 +22,370 @@ def test_check_and_update_physical_challenges_exception():
         success = check_and_update_physical_challenges("user123","2025-01-07")
     assert success is False
 
+def make_challenges_store(user_challenges_ref, states):
+    """
+    Challenge docs keyed by slug: user_challenges_ref.document(slug) => ref with .id,
+    and the returned function works as db.get_all over those refs.
+    """
+    by_slug = {challenge_slug(name): {"challenge": name, "state": state} for name, state in states.items()}
+
+    def document(slug):
+        ref = MagicMock()
+        ref.id = slug
+        return ref
+    user_challenges_ref.document.side_effect = document
+
+    def get_all(refs):
+        snapshots = []
+        for ref in refs:
+            snapshot = MagicMock()
+            snapshot.reference = ref
+            snapshot.exists = ref.id in by_slug
+            snapshot.to_dict.return_value = by_slug.get(ref.id)
+            snapshots.append(snapshot)
+        return snapshots
+    return get_all
+
+def test_complete_challenges_skips_completed_and_batches_writes():
+    mock_db = MagicMock()
+    user_challenges_ref = mock_db.collection.return_value.document.return_value.collection.return_value
+    mock_db.get_all.side_effect = make_challenges_store(user_challenges_ref, {"Muscle Up!": True, "Weight Watcher": False, "Fat Loss Focus": False})
+
+    with patch("app.services.checkChallenges_service.db", mock_db):
+        updated = complete_challenges("user123", "user_physical_challenges", {"Muscle Up!": True, "Weight Watcher": True})
+
+    assert updated == 1
+    # Direct reads of the completed challenges only, no queries
+    requested = [ref.id for ref in mock_db.get_all.call_args.args[0]]
+    assert requested == ["muscle-up", "weight-watcher"]
+    user_challenges_ref.where.assert_not_called()
+    user_challenges_ref.stream.assert_not_called()
+    batch = mock_db.batch.return_value
+    batch.update.assert_called_once()
+    assert batch.update.call_args.args[1] == {"state": True}
+    assert batch.update.call_args.args[0].id == "weight-watcher"
+    batch.commit.assert_called_once()
+
+def test_complete_challenges_without_changes_issues_no_writes():
+    mock_db = MagicMock()
+    user_challenges_ref = mock_db.collection.return_value.document.return_value.collection.return_value
+    mock_db.get_all.side_effect = make_challenges_store(user_challenges_ref, {"Muscle Up!": True})
+
+    with patch("app.services.checkChallenges_service.db", mock_db):
+        assert complete_challenges("user123", "user_physical_challenges", {"Muscle Up!": True}) == 0
+        # Nothing completed => not even the read
+        assert complete_challenges("user123", "user_physical_challenges", {}) == 0
+
+    mock_db.get_all.assert_called_once()
+    mock_db.batch.return_value.commit.assert_not_called()
+
+def test_complete_challenges_migrates_users_without_slug_ids():
+    mock_db = MagicMock()
+    user_challenges_ref = mock_db.collection.return_value.document.return_value.collection.return_value
+    mock_db.get_all.side_effect = make_challenges_store(user_challenges_ref, {})
+
+    with patch("app.services.checkChallenges_service.db", mock_db), \
+         patch("app.services.checkChallenges_service.create_challenges_service") as mock_create:
+        complete_challenges("user123", "user_workouts_challenges", {"Long Haul": True})
+
+    mock_create.assert_called_once_with("user123")
+    assert mock_db.get_all.call_count == 2
+
+def physical_entry(day, weight=70, body_fat=20, body_muscle=40):
+    return {"date": datetime(2025, 1, day, 10, 0), "weight": weight, "body_fat": body_fat, "body_muscle": body_muscle}
+
+def test_build_physical_series_sorts_once_into_arrays():
+    series = build_physical_series([physical_entry(3, weight=71), physical_entry(1, weight=70), {"date": datetime(2025, 1, 2, 10, 0)}])
+
+    assert series["weight"][0] == 70 and series["weight"][2] == 71
+    # Missing values don't break the rules
+    assert series["body_fat"][1] != series["body_fat"][1]
+    assert list(series["timestamps"]) == sorted(series["timestamps"])
+    assert window_start(series, datetime(2025, 1, 2)) == 1
 
-def test_check_and_update_workouts_challenges_some_completed():
+def test_consistency_is_key_needs_seven_days_in_a_row():
+    seven_days = build_physical_series([physical_entry(day) for day in range(1, 8)])
+    with_gap = build_physical_series([physical_entry(day) for day in range(1, 9) if day != 4])
+
+    assert consistency_is_key(seven_days["timestamps"], 0) is True
+    assert consistency_is_key(with_gap["timestamps"], 0) is False
+    # Only the entries inside the window count
+    assert consistency_is_key(seven_days["timestamps"], 1) is False
+
+def test_fat_loss_focus_compares_first_and_last_entry():
+    series = build_physical_series([physical_entry(1, body_fat=22), physical_entry(5, body_fat=21.8), physical_entry(10, body_fat=21)])
+
+    assert fat_loss_focus(series["body_fat"], 0) is True
+    assert fat_loss_focus(series["body_fat"], 1) is False
+
+def test_progress_pioneer_counts_the_window():
+    timestamps = build_physical_series([physical_entry(day) for day in range(1, 31)])["timestamps"]
+
+    assert progress_pioneer(timestamps, 0) is True
+    assert progress_pioneer(timestamps, 1) is False
+
+def test_evaluate_physical_challenges_windows():
     """
-    Mocks user_workouts_ref to return certain workouts that trigger challenges.
-    Then ensures user_challenges_ref doc is updated for those challenges.
+    30-day rules ignore entries older than a month, 60-day rules still count them.
     """
-    from app.services.checkChallenges_service import check_and_update_workouts_challenges
+    old_entries = [{"date": datetime(2024, 11, 10, 10, 0) + timedelta(days=i), "weight": 60, "body_fat": 25, "body_muscle": 35} for i in range(25)]
+    recent_entries = [physical_entry(day, weight=70 + day * 0.05, body_fat=22 - day * 0.2, body_muscle=40 + day * 0.3) for day in range(1, 8)]
+
+    updates = evaluate_physical_challenges(build_physical_series(old_entries + recent_entries), datetime(2025, 1, 7))
 
+    assert updates == {
+        "Consistency is Key": True,
+        "Fat Loss Focus": True,
+        "Weight Watcher": True,
+        "Progress Pioneer": True
+    }
+
+def test_check_and_update_physical_challenges_single_query():
     mock_db = MagicMock()
+    physical_ref = mock_db.collection.return_value.document.return_value.collection.return_value
+    docs = []
+    for day in range(1, 8):
+        doc = MagicMock()
+        doc.to_dict.return_value = physical_entry(day)
+        docs.append(doc)
+    physical_ref.where.return_value.stream.return_value = docs
+    mock_db.get_all.side_effect = make_challenges_store(physical_ref, {"Consistency is Key": False, "Weight Watcher": False, "Muscle Up!": False})
+
+    with patch("app.services.checkChallenges_service.db", mock_db):
+        success = check_and_update_physical_challenges("user123", "2025-01-07")
+
+    assert success is True
+    # One 60-day range query, and one batched read of the completed challenges
+    physical_ref.where.assert_called_once_with("date", ">=", datetime(2024, 11, 8))
+    mock_db.get_all.assert_called_once()
+    # Both completed challenges in one batched write
+    mock_db.batch.return_value.commit.assert_called_once()
+    updated = sorted(c.args[0].id for c in mock_db.batch.return_value.update.call_args_list)
+    assert updated == ["consistency-is-key", "weight-watcher"]
 
-    # Suppose we have 8 workouts in the last 30 days
-    doc1 = MagicMock()
-    doc1.to_dict.return_value = {
-        "training_id": "trA",
-        "duration": 120,
-        "total_calories": 1500,
-        "coach": "Coach1",
-        "date": datetime.now() - timedelta(days=1)
+
+def day_key(days_ago):
+    return (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+def make_day(workouts=1, calories=0, long_workouts=0, sports_duration=0, categories=None, exercises=None, coaches=None):
+    return {
+        "workouts": workouts,
+        "calories": calories,
+        "long_workouts": long_workouts,
+        "sports_duration": sports_duration,
+        "categories": categories or {},
+        "exercises": exercises or [],
+        "coaches": coaches or []
     }
-    doc2 = MagicMock()
-    doc2.to_dict.return_value = {
-        "training_id": "trB",
-        "duration": 60,
-        "total_calories": 1200,
-        "coach": "Coach2",
-        "date": datetime.now() - timedelta(days=2)
+
+def make_challenges_db(state_exists, state_days=None, workouts=None, challenges=None):
+    """
+    db mock with:
+      challenges/{uid}/user_workouts_challenges   => user_challenges_ref
+      challenges/{uid}/challenge_state/workouts   => state_ref
+      workouts/{uid}/user_workouts                => user_workouts_ref
+    and db.transaction() => mock_db.transaction.return_value (one attempt)
+    """
+    mock_db = MagicMock()
+    mock_db.transaction.return_value._max_attempts = 1
+    mock_db.transaction.return_value._read_only = False
+
+    user_challenges_ref = MagicMock()
+    mock_db.get_all.side_effect = make_challenges_store(user_challenges_ref, challenges or {})
+    state_ref = MagicMock()
+    state_ref.get.return_value.exists = state_exists
+    state_ref.get.return_value.to_dict.return_value = {"days": state_days or {}}
+    state_collection = MagicMock()
+    state_collection.document.return_value = state_ref
+
+    user_workouts_ref = MagicMock()
+    user_workouts_ref.where.return_value = user_workouts_ref
+    workout_docs = []
+    for workout in workouts or []:
+        doc = MagicMock()
+        doc.to_dict.return_value = workout
+        workout_docs.append(doc)
+    user_workouts_ref.stream.return_value = workout_docs
+
+    def collection_side_effect(collection_name):
+        top = MagicMock()
+        if collection_name == "challenges":
+            top.document.return_value.collection.side_effect = lambda name: state_collection if name == "challenge_state" else user_challenges_ref
+        elif collection_name == "workouts":
+            top.document.return_value.collection.return_value = user_workouts_ref
+        return top
+
+    mock_db.collection.side_effect = collection_side_effect
+    return mock_db, user_challenges_ref, state_ref, user_workouts_ref
+
+def documents_side_effect(trainings, exercises, categories):
+    def get_documents(collection_path, ids):
+        if collection_path.startswith("trainings/"):
+            source = trainings
+        elif collection_path == "exercises":
+            source = exercises
+        else:
+            source = categories
+        return {doc_id: source[doc_id] for doc_id in ids if doc_id in source}
+    return get_documents
+
+def test_evaluate_workouts_challenges_some_completed():
+    from app.services.checkChallenges_service import evaluate_workouts_challenges
+
+    days = {
+        day_key(1): make_day(calories=1500, long_workouts=1, categories={"Sports": 1, "Strength": 1}, exercises=["Push-ups", "Sit-ups"], coaches=["Coach1"], sports_duration=120),
+        day_key(2): make_day(calories=1200, categories={"Strength": 1}, exercises=["Plank"], coaches=["Coach2"]),
+        day_key(3): make_day(calories=2300, categories={"Cardio": 1}, exercises=["Jumping Jacks"], coaches=["Coach3"], sports_duration=200),
     }
-    doc3 = MagicMock()
-    doc3.to_dict.return_value = {
-        "training_id": "trC",
-        "duration": 90,
-        "total_calories": 2300,
-        "coach": "Coach3",
-        "date": datetime.now() - timedelta(days=3)
+
+    updates = evaluate_workouts_challenges(days)
+
+    assert updates == {
+        "Sports Enthusiast": True,
+        "Calorie Crusher": True,
+        "Coach's Pick": True,
+        "Long Haul": True,
     }
-    doc4 = MagicMock()
-    doc4.to_dict.return_value = {
-        "training_id": "trD",
-        "duration": 100,
-        "total_calories": 0,
-        "coach": "Coach1",
-        "date": datetime.now() - timedelta(days=4)
+
+def test_evaluate_workouts_challenges_endurance_streak():
+    from app.services.checkChallenges_service import evaluate_workouts_challenges
+
+    streak = {day_key(i): make_day() for i in range(10)}
+    assert "Endurance Streak" in evaluate_workouts_challenges(streak)
+
+    # Two workouts on the same day break the streak
+    double = dict(streak)
+    double[day_key(0)] = make_day(workouts=2)
+    assert "Endurance Streak" not in evaluate_workouts_challenges(double)
+
+    # So does a gap
+    gap = {day_key(i): make_day() for i in range(11) if i != 5}
+    assert "Endurance Streak" not in evaluate_workouts_challenges(gap)
+
+def test_check_and_update_workouts_challenges_incremental():
+    """
+    With an existing state doc, only the new workout's training/exercises/categories are read,
+    the 30-day history is not streamed again and old days are pruned.
+    """
+    state_days = {
+        day_key(1): make_day(calories=4800, exercises=["Squats"], coaches=["Coach1"]),
+        day_key(40): make_day(calories=9999),
     }
-    # etc. For brevity, let's pretend we have enough variety/cals to trigger some challenges
-    workouts_list = [doc1, doc2, doc3, doc4]
+    challenges = {"Calorie Crusher": False, "Long Haul": False, "Coach's Pick": True}
+    mock_db, user_challenges_ref, state_ref, user_workouts_ref = make_challenges_db(True, state_days, challenges=challenges)
 
-    user_workouts_ref = MagicMock()
-    user_workouts_ref.where.return_value = user_workouts_ref
-    user_workouts_ref.stream.return_value = workouts_list
-
-    # For each training doc fetch
-    # We'll mock them to have some "exercises" => leads to categories
-    training_refA = MagicMock()
-    training_refA.get.return_value.exists = True
-    training_refA.get.return_value.to_dict.return_value = {"exercises":["ex1","ex2"]}
-
-    training_refB = MagicMock()
-    training_refB.get.return_value.exists = True
-    training_refB.get.return_value.to_dict.return_value = {"exercises":["ex3"]}
-
-    def training_doc_side_effect(doc_id):
-        if doc_id == "trA":
-            return training_refA
-        elif doc_id == "trB":
-            return training_refB
-        elif doc_id == "trC" or doc_id == "trD":
-            # etc.
-            mock_t = MagicMock()
-            mock_t.get.return_value.exists = True
-            mock_t.get.return_value.to_dict.return_value = {"exercises":["ex4"]}
-            return mock_t
-        return MagicMock()
-
-    # For exercises
-    ex1 = MagicMock()
-    ex1.get.return_value.exists = True
-    ex1.get.return_value.to_dict.return_value = {"name":"Push-ups","category_id":"catS"}  # catS => "Sports"
-    ex2 = MagicMock()
-    ex2.get.return_value.exists = True
-    ex2.get.return_value.to_dict.return_value = {"name":"Sit-ups","category_id":"catStrength"}
-    ex3 = MagicMock()
-    ex3.get.return_value.exists = True
-    ex3.get.return_value.to_dict.return_value = {"name":"Plank","category_id":"catStrength"}
-    ex4 = MagicMock()
-    ex4.get.return_value.exists = True
-    ex4.get.return_value.to_dict.return_value = {"name":"Jumping Jacks","category_id":"catCardio"}
-
-    def exercise_doc_side_effect(ex_id):
-        if ex_id == "ex1":
-            return ex1
-        elif ex_id == "ex2":
-            return ex2
-        elif ex_id == "ex3":
-            return ex3
-        elif ex_id == "ex4":
-            return ex4
-        return MagicMock()
-
-    # For categories docs
-    catSports = MagicMock()
-    catSports.get.return_value.exists = True
-    catSports.get.return_value.to_dict.return_value = {"name":"Sports"}
-
-    catStrength = MagicMock()
-    catStrength.get.return_value.exists = True
-    catStrength.get.return_value.to_dict.return_value = {"name":"Strength"}
-
-    catCardio = MagicMock()
-    catCardio.get.return_value.exists = True
-    catCardio.get.return_value.to_dict.return_value = {"name":"Cardio"}
-
-    def category_doc_side_effect(doc_id):
-        if doc_id == "catS":
-            return catSports
-        elif doc_id == "catStrength":
-            return catStrength
-        elif doc_id == "catCardio":
-            return catCardio
-        return MagicMock()
-
-    # user_challenges_ref => updates
-    user_challenges_ref = MagicMock()
+    trainings = {"trA": {"exercises": ["ex1", "ex2"]}}
+    exercises = {"ex1": {"name": "Push-ups", "category_id": "catS"}, "ex2": {"name": "Squats", "category_id": "missing"}}
+    categories = {"catS": {"name": "Sports"}}
 
-    # Now let's build the chain of mocks
-    def db_collection_side_effect(collection_name):
-        if collection_name == "workouts":
-            # .document(uid).collection('user_workouts') => user_workouts_ref
-            top_mock = MagicMock()
-            doc_mock = MagicMock()
-            doc_mock.collection.return_value = user_workouts_ref
-            top_mock.document.return_value = doc_mock
-            return top_mock
-        elif collection_name == "trainings":
-            # We'll return a mock that doc(...) => training_doc_side_effect
-            top_mock = MagicMock()
-            def doc_train_side(doc_id):
-                return training_doc_side_effect(doc_id)
-            top_mock.document.side_effect = doc_train_side
-            return top_mock
-        elif collection_name == "exercises":
-            # doc(...) => exercise_doc_side_effect
-            ex_top = MagicMock()
-            ex_top.document.side_effect = exercise_doc_side_effect
-            return ex_top
-        elif collection_name == "categories":
-            cat_top = MagicMock()
-            cat_top.document.side_effect = category_doc_side_effect
-            return cat_top
-        elif collection_name == "challenges":
-            # .document(uid).collection('user_workouts_challenges') => user_challenges_ref
-            chal_top = MagicMock()
-            chal_doc = MagicMock()
-            chal_doc.collection.return_value = user_challenges_ref
-            chal_top.document.return_value = chal_doc
-            return chal_top
-        return MagicMock()
-
-    mock_db.collection.side_effect = db_collection_side_effect
+    new_workout = {"training_id": "trA", "duration": 60, "total_calories": 300, "coach": "Coach2", "date": datetime.now()}
+
+    with patch("app.services.checkChallenges_service.db", mock_db), \
+         patch("app.services.checkChallenges_service.get_documents_by_ids", side_effect=documents_side_effect(trainings, exercises, categories)) as mock_get:
+        success = check_and_update_workouts_challenges("user123", [new_workout])
 
-    with patch("app.services.checkChallenges_service.db", mock_db):
-        success = check_and_update_workouts_challenges("user123")
     assert success is True
+    user_workouts_ref.stream.assert_not_called()
+    # One batched read per collection for the new workout only
+    assert [c.args[1] for c in mock_get.call_args_list] == [["trA"], ["ex1", "ex2"], ["catS", "missing"]]
+
+    # Read and written inside the transaction
+    transaction = mock_db.transaction.return_value
+    state_ref.get.assert_called_once_with(transaction=transaction)
+    state_ref.set.assert_not_called()
+    transaction._commit.assert_called_once()
+    saved_ref, saved_state = transaction.set.call_args[0]
+    assert saved_ref is state_ref
+    saved_days = saved_state["days"]
+    assert day_key(40) not in saved_days
+    today = saved_days[day_key(0)]
+    assert today["workouts"] == 1
+    assert today["calories"] == 300
+    assert today["categories"] == {"Sports": 1}
+    assert today["sports_duration"] == 60
+    assert today["exercises"] == ["Push-ups", "Squats"]
 
-    # We expect some of the challenges to be updated => "Sports Enthusiast", "Calorie Crusher", maybe "Coach's Pick" if 3 coaches, etc.
-    # The code calls user_challenges_ref.where('challenge','==',name).limit(1).stream() => doc.reference.update({'state':True})
-    # We'll see how many times user_challenges_ref.where(...) was called
-    # We won't deeply verify each challenge name. Typically you'd do separate tests for each challenge logic.
-    assert user_challenges_ref.where.call_count >= 1
-    # and doc.reference.update({'state': True}) calls exist
-    # For a more precise test, you'd parse which challenge names triggered.
+    # 4800 + 300 calories => Calorie Crusher, evaluated without the pruned day
+    updated = [c.args[0].id for c in mock_db.batch.return_value.update.call_args_list]
+    assert updated == ["calorie-crusher"]
+    mock_db.batch.return_value.commit.assert_called_once()
 
-def test_check_and_update_workouts_challenges_no_challenges():
+def test_apply_workouts_to_challenge_state_retries_on_conflict():
     """
-    If there's data but doesn't meet any challenge criteria => no updates
+    If another recheck commits first, Firestore aborts the transaction: the state is read
+    again and the new workout is added on top of the other one's days.
     """
-    from app.services.checkChallenges_service import check_and_update_workouts_challenges
+    from google.api_core.exceptions import Aborted
+    from app.services.checkChallenges_service import apply_workouts_to_challenge_state
 
-    mock_db = MagicMock()
+    mock_db, _, state_ref, _ = make_challenges_db(True)
+    transaction = mock_db.transaction.return_value
+    transaction._max_attempts = 2
+    transaction._commit.side_effect = [Aborted("contention"), None]
+    first, second = MagicMock(exists=True), MagicMock(exists=True)
+    first.to_dict.return_value = {"days": {}}
+    second.to_dict.return_value = {"days": {day_key(0): make_day(calories=200)}}
+    state_ref.get.side_effect = [first, second]
 
-    # user_workouts_ref => let's say 1 workout with minimal data
-    doc_mock = MagicMock()
-    doc_mock.to_dict.return_value = {
-        "training_id": "trZ",
-        "duration": 30,
-        "total_calories": 100,
-        "coach": "OnlyCoach",
-        "date": datetime.now() - timedelta(days=1)
-    }
-    user_workouts_ref = MagicMock()
-    user_workouts_ref.where.return_value = user_workouts_ref
-    user_workouts_ref.stream.return_value = [doc_mock]
+    new_workout = {"training_id": "trA", "duration": 30, "total_calories": 100, "coach": "Coach1", "date": datetime.now()}
+    with patch("app.services.checkChallenges_service.db", mock_db), \
+         patch("app.services.checkChallenges_service.get_documents_by_ids", return_value={}):
+        days = apply_workouts_to_challenge_state("user123", [new_workout])
 
-    user_challenges_ref = MagicMock()
+    assert state_ref.get.call_count == 2
+    assert days[day_key(0)]["workouts"] == 2
+    assert days[day_key(0)]["calories"] == 300
+    assert transaction.set.call_args[0][1]["days"] == days
 
-    def db_col_side_effect(col_name):
-        if col_name == "workouts":
-            top_mock = MagicMock()
-            dmock = MagicMock()
-            dmock.collection.return_value = user_workouts_ref
-            top_mock.document.return_value = dmock
-            return top_mock
-        elif col_name == "challenges":
-            ctop = MagicMock()
-            cdoc = MagicMock()
-            cdoc.collection.return_value = user_challenges_ref
-            ctop.document.return_value = cdoc
-            return ctop
-        elif col_name == "trainings":
-            # We'll say training doc has 1 exercise
-            tr_top = MagicMock()
-            tr_doc = MagicMock()
-            tr_doc.get.return_value.exists = True
-            tr_doc.get.return_value.to_dict.return_value = {"exercises":["exX"]}
-            tr_top.document.return_value = tr_doc
-            return tr_top
-        elif col_name == "exercises":
-            ex_top = MagicMock()
-            # doc(...) => has category_id: "catSomething"
-            ex_doc = MagicMock()
-            ex_doc.get.return_value.exists = True
-            ex_doc.get.return_value.to_dict.return_value = {"name":"OneExercise","category_id":"catSomething"}
-            ex_top.document.return_value = ex_doc
-            return ex_top
-        elif col_name == "categories":
-            cat_top = MagicMock()
-            cat_doc = MagicMock()
-            cat_doc.get.return_value.exists = True
-            cat_doc.get.return_value.to_dict.return_value = {"name":"MiscCategory"}
-            cat_top.document.return_value = cat_doc
-            return cat_top
-        return MagicMock()
-
-    mock_db.collection.side_effect = db_col_side_effect
+def test_apply_workouts_to_challenge_state_skips_workouts_already_counted():
+    """
+    A retried recheck applies the same workouts again: they are only counted once.
+    """
+    from app.services.checkChallenges_service import apply_workouts_to_challenge_state
+
+    mock_db, _, state_ref, _ = make_challenges_db(True)
+    new_workout = {"id": "w1", "training_id": "trA", "duration": 30, "total_calories": 100, "coach": "Coach1", "date": datetime.now()}
+    state_ref.get.return_value.to_dict.return_value = {"days": {}}
+
+    with patch("app.services.checkChallenges_service.db", mock_db), \
+         patch("app.services.checkChallenges_service.get_documents_by_ids", return_value={}):
+        days = apply_workouts_to_challenge_state("user123", [new_workout])
+        state_ref.get.return_value.to_dict.return_value = {"days": days}
+        again = apply_workouts_to_challenge_state("user123", [new_workout])
+
+    assert again[day_key(0)]["workouts"] == 1
+    assert again[day_key(0)]["calories"] == 100
+    assert again[day_key(0)]["workout_ids"] == ["w1"]
+
+def test_check_and_update_workouts_challenges_without_state_rebuilds():
+    """
+    No state doc yet (or no workout given) => full recompute from the last 30 days,
+    resolving all trainings with batched reads.
+    """
+    workouts = [
+        {"training_id": "trA", "duration": 30, "total_calories": 100, "coach": "OnlyCoach", "date": datetime.now() - timedelta(days=1)},
+        {"training_id": "trA", "duration": 30, "total_calories": 100, "coach": "OnlyCoach", "date": datetime.now() - timedelta(days=2)},
+    ]
+    mock_db, user_challenges_ref, state_ref, user_workouts_ref = make_challenges_db(False, workouts=workouts)
+
+    trainings = {"trA": {"exercises": ["exX"]}}
+    exercises = {"exX": {"name": "OneExercise", "category_id": "catSomething"}}
+    categories = {"catSomething": {"name": "MiscCategory"}}
+
+    with patch("app.services.checkChallenges_service.db", mock_db), \
+         patch("app.services.checkChallenges_service.get_documents_by_ids", side_effect=documents_side_effect(trainings, exercises, categories)) as mock_get:
+        success = check_and_update_workouts_challenges("user123", [workouts[0]])
 
-    with patch("app.services.checkChallenges_service.db", mock_db):
-        success = check_and_update_workouts_challenges("user123")
     assert success is True
-    # No updates
-    user_challenges_ref.where.assert_not_called()
+    user_workouts_ref.stream.assert_called_once()
+    assert mock_get.call_count == 3
+
+    saved_days = state_ref.set.call_args[0][0]["days"]
+    assert saved_days[day_key(1)]["categories"] == {"MiscCategory": 1}
+    assert saved_days[day_key(2)]["calories"] == 100
+    # No challenge reached => no reads or writes on the challenges
+    mock_db.get_all.assert_not_called()
+    mock_db.batch.assert_not_called()
 
 def test_check_and_update_workouts_challenges_exception():
     """
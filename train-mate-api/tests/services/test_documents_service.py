@@ -0,0 +1,199 @@
+import time
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+from flask import Flask
+from app.services.documents_service import (
+    get_document,
+    get_documents_by_ids,
+    get_document_cache_stats,
+    invalidate_document
+)
+
+@pytest.fixture
+def app_context():
+    app = Flask(__name__)
+    with app.app_context():
+        yield
+
+def make_ref(path, data):
+    ref = MagicMock()
+    ref.path = path
+    ref.get.return_value.exists = data is not None
+    ref.get.return_value.to_dict.return_value = data
+    return ref
+
+def test_get_document_reads_each_path_once_per_request(app_context):
+    ref = make_ref("exercises/ex1", {"name": "Squats"})
+
+    first = get_document(ref)
+    second = get_document(ref)
+
+    assert first == second == {"name": "Squats"}
+    ref.get.assert_called_once()
+    assert get_document_cache_stats() == {"hits": 1, "misses": 1}
+
+def test_get_document_caches_missing_documents(app_context):
+    ref = make_ref("exercises/missing", None)
+
+    assert get_document(ref) is None
+    assert get_document(ref) is None
+    ref.get.assert_called_once()
+    assert get_document_cache_stats() == {"hits": 1, "misses": 1}
+
+def test_get_document_returns_copies(app_context):
+    """
+    Callers mutating a returned dict must not alter what the next caller sees.
+    """
+    ref = make_ref("trainings/user123/user_trainings/t1", {"exercises": ["ex1"]})
+
+    training = get_document(ref)
+    training["exercises"].append("ex2")
+
+    assert get_document(ref) == {"exercises": ["ex1"]}
+
+def test_invalidate_document_forces_a_new_read(app_context):
+    ref = make_ref("categories/cat1", {"name": "Cardio"})
+
+    get_document(ref)
+    invalidate_document(ref)
+    get_document(ref)
+
+    assert ref.get.call_count == 2
+    assert get_document_cache_stats() == {"hits": 0, "misses": 2}
+
+def test_get_document_without_app_context_is_not_cached():
+    ref = make_ref("exercises/ex1", {"name": "Squats"})
+
+    get_document(ref)
+    get_document(ref)
+
+    assert ref.get.call_count == 2
+    assert get_document_cache_stats() == {"hits": 0, "misses": 0}
+
+def test_get_documents_by_ids_shares_cache_with_point_reads(app_context, make_snapshot):
+    mock_db = MagicMock()
+    mock_db.get_all.return_value = [make_snapshot("ex2", {"name": "Lunges"}), make_snapshot("ex3", None)]
+
+    with patch("app.services.documents_service.db", mock_db):
+        get_document(make_ref("exercises/ex1", {"name": "Squats"}))
+        documents = get_documents_by_ids("exercises", ["ex1", "ex2", "ex3", "ex2"])
+        # Second batched read is served entirely from the cache
+        again = get_documents_by_ids("exercises", ["ex1", "ex2", "ex3"])
+
+    assert documents == {"ex1": {"name": "Squats"}, "ex2": {"name": "Lunges"}}
+    assert again == documents
+    mock_db.get_all.assert_called_once()
+    # Only the ids that were not cached yet are requested
+    requested = [call.args[0] for call in mock_db.collection.return_value.document.call_args_list]
+    assert requested == ["ex2", "ex3"]
+    assert get_document_cache_stats() == {"hits": 4, "misses": 3}
+
+class SlowRequestGlobals:
+    """
+    flask.g stand-in that pauses right after the cache is attached, so another thread
+    looks at it while the first one is still setting it up.
+    """
+    def __init__(self):
+        self.__dict__["_values"] = {}
+
+    def __contains__(self, name):
+        return name in self._values
+
+    def get(self, name, default=None):
+        return self._values.get(name, default)
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self._values[name] = value
+        if name == "document_cache":
+            time.sleep(0.05)
+
+def test_concurrent_get_documents_by_ids_share_one_request_cache(make_snapshot):
+    """
+    run_concurrently shares the request's g with the pool threads: the first cache access can
+    happen in several of them at once (e.g. /api/sync) without errors or lost hits/misses.
+    """
+    def get_all(refs):
+        return [make_snapshot(ref.path.rsplit("/", 1)[1], {"path": ref.path}) for ref in refs]
+
+    mock_db = MagicMock()
+    mock_db.get_all.side_effect = get_all
+    mock_db.collection.side_effect = lambda path: MagicMock(document=lambda doc_id: MagicMock(path=f"{path}/{doc_id}"))
+    collections = ["exercises", "trainings/user123/user_trainings", "categories", "workouts/user123/user_workouts"]
+    ids = [f"doc{i}" for i in range(5)]
+    request_globals = SlowRequestGlobals()
+    start = threading.Barrier(len(collections))
+    results, errors = [], []
+
+    def read(path):
+        start.wait()
+        try:
+            results.append(get_documents_by_ids(path, ids))
+            results.append(get_documents_by_ids(path, ids))
+        except Exception as e:
+            errors.append(e)
+
+    with patch("app.services.documents_service.db", mock_db), \
+         patch("app.services.documents_service.g", request_globals), \
+         patch("app.services.documents_service.has_app_context", return_value=True):
+        threads = [threading.Thread(target=read, args=(path,)) for path in collections]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = get_document_cache_stats()
+
+    assert errors == []
+    assert len(results) == 8
+    assert all(len(documents) == 5 for documents in results)
+    assert stats == {"hits": 20, "misses": 20}
+
+def test_get_training_by_id_twice_in_one_request_reads_once(app_context):
+    from app.services.trainings_service import get_training_by_id
+
+    mock_db = MagicMock()
+    training_ref = mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value
+    training_ref.path = "trainings/user123/user_trainings/t1"
+    training_ref.get.return_value.exists = True
+    training_ref.get.return_value.to_dict.return_value = {"calories_per_hour_mean": 400}
+
+    with patch("app.services.trainings_service.db", mock_db):
+        # e.g. record_workout controller + save_user_workout
+        get_training_by_id("user123", "t1")
+        training = get_training_by_id("user123", "t1")
+
+    assert training == {"calories_per_hour_mean": 400}
+    training_ref.get.assert_called_once()
+    assert get_document_cache_stats()["hits"] == 1
+
+def test_ensure_parent_document_writes_once_per_path():
+    from app.services.documents_service import ensure_parent_document, clear_parent_documents_cache
+    clear_parent_documents_cache()
+    ref = make_ref("workouts/user123", None)
+
+    assert ensure_parent_document(ref) is True
+    assert ensure_parent_document(ref) is False
+
+    # Never read, and written only the first time
+    ref.get.assert_not_called()
+    ref.set.assert_called_once_with({}, merge=True)
+
+def test_ensure_parent_document_cache_is_bounded():
+    from app.services import documents_service
+    documents_service.clear_parent_documents_cache()
+
+    with patch.object(documents_service, "_parent_documents", documents_service.LRUCache(maxsize=2)):
+        first = make_ref("workouts/user1", None)
+        documents_service.ensure_parent_document(first)
+        documents_service.ensure_parent_document(make_ref("workouts/user2", None))
+        documents_service.ensure_parent_document(make_ref("workouts/user3", None))
+        # user1 was evicted => written again (harmless, it is a merge of {})
+        documents_service.ensure_parent_document(first)
+
+    assert first.set.call_count == 2
@@ -0,0 +1,62 @@
+import time
+import threading
+import pytest
+from flask import Flask, g
+from unittest.mock import patch
+from app.services.executor_service import run_concurrently
+
+def test_run_concurrently_returns_results_in_call_order():
+    def slow(value, delay):
+        time.sleep(delay)
+        return value
+
+    assert run_concurrently(lambda: slow("a", 0.05), lambda: slow("b", 0)) == ["a", "b"]
+
+def test_run_concurrently_runs_calls_in_parallel():
+    # Both calls must be running at the same time to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    assert sorted(run_concurrently(barrier.wait, barrier.wait)) == [0, 1]
+
+def test_run_concurrently_raises_first_failure_after_all_finished():
+    finished = []
+
+    def fail(message):
+        raise ValueError(message)
+
+    def slow():
+        time.sleep(0.05)
+        finished.append(True)
+
+    with pytest.raises(ValueError, match="first"):
+        run_concurrently(lambda: fail("first"), slow, lambda: fail("second"))
+    assert finished == [True]
+
+def test_run_concurrently_limits_reads_in_flight():
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def read():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    with patch("app.services.executor_service.FANOUT_REQUEST_CONCURRENCY", 2):
+        run_concurrently(*[read for _ in range(6)])
+    assert peak[0] <= 2
+
+def test_run_concurrently_nested_calls_run_inline():
+    def nested():
+        worker = threading.current_thread()
+        return run_concurrently(threading.current_thread, threading.current_thread) == [worker, worker]
+
+    assert run_concurrently(nested, nested) == [True, True]
+
+def test_run_concurrently_tasks_see_the_request_context():
+    app = Flask(__name__)
+    with app.app_context():
+        g.uid = "user123"
+        assert run_concurrently(lambda: g.uid, lambda: g.uid) == ["user123", "user123"]
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import patch, MagicMock
+from firebase_admin import firestore
 from app.services.exercise_service import (
     save_exercise,
     get_exercises,
@@ -9,6 +10,7 @@ from app.services.exercise_service import (
     get_exercise_by_category_id,
     get_exercise_by_id_service
 )
+from app.services.pagination_service import MAX_PAGE_SIZE
 from urllib.parse import quote
 
 import pytest
@@ -100,10 +102,9 @@ def test_save_exercise_exception():
     # The function in the except block does "return None"
     assert result is None
 
-@pytest.mark.parametrize("show_public", [True, False])
-def test_get_exercises_success(show_public):
+def test_get_exercises_success():
     """
-    Test retrieving exercises either public or user-specific.
+    User-specific exercises are not paged.
     """
     mock_db = MagicMock()
     # Mock docs from Firestore
@@ -118,17 +119,79 @@ def test_get_exercises_success(show_public):
         # .where(...).stream() returns [doc1, doc2]
         mock_db.collection.return_value.where.return_value.stream.return_value = [doc1, doc2]
 
-        exercises = get_exercises("user123", show_public=show_public)
+        exercises, next_cursor = get_exercises("user123", show_public=False)
     
     # Basic checks
     assert len(exercises) == 2
     assert exercises[0]["id"] == "ex1"
-    if show_public:
-        # We call: exercises_ref.where('public', '==', True)
-        mock_db.collection.return_value.where.assert_called_with("public", "==", True)
-    else:
-        # We call: exercises_ref.where('owner', '==', uid)
-        mock_db.collection.return_value.where.assert_called_with("owner", "==", "user123")
+    assert next_cursor is None
+    # We call: exercises_ref.where('owner', '==', uid)
+    mock_db.collection.return_value.where.assert_called_with("owner", "==", "user123")
+
+def make_public_exercises_query(mock_db, docs):
+    query = mock_db.collection.return_value.where.return_value
+    query.select.return_value = query
+    query.order_by.return_value = query
+    query.start_after.return_value = query
+    query.limit.return_value.stream.return_value = docs
+    return query
+
+def test_get_exercises_public_is_paged():
+    mock_db = MagicMock()
+    docs = []
+    for i in range(3):
+        doc = MagicMock()
+        doc.id = f"ex{i}"
+        doc.to_dict.return_value = {"name": f"Exercise {i}", "public": True}
+        doc.get.side_effect = lambda field, i=i: {"name": f"Exercise {i}"}[field]
+        docs.append(doc)
+    query = make_public_exercises_query(mock_db, docs)
+
+    with patch("app.services.exercise_service.db", mock_db):
+        exercises, next_cursor = get_exercises("user123", show_public=True, limit=2)
+
+    # The user listing returns whole documents
+    query.select.assert_not_called()
+    assert [exercise["id"] for exercise in exercises] == ["ex0", "ex1"]
+    assert next_cursor is not None
+    mock_db.collection.return_value.where.assert_called_with("public", "==", True)
+    # Stable order: name, then doc id
+    assert [c.args[0] for c in query.order_by.call_args_list] == ["name", "__name__"]
+    query.limit.assert_called_once_with(3)
+
+def test_get_all_exercises_without_limit_is_capped():
+    mock_db = MagicMock()
+    query = make_public_exercises_query(mock_db, [])
+
+    with patch("app.services.exercise_service.db", mock_db):
+        exercises, next_cursor = get_all_exercises(order_by="id")
+
+    assert exercises == []
+    assert next_cursor is None
+    query.limit.assert_called_once_with(MAX_PAGE_SIZE + 1)
+    assert [c.args[0] for c in query.order_by.call_args_list] == ["__name__"]
+
+def test_get_all_exercises_fetches_only_listed_fields():
+    mock_db = MagicMock()
+    doc = MagicMock()
+    doc.id = "ex1"
+    data = {"name": "Plank", "calories_per_hour": 200, "public": True}
+    doc.get.side_effect = lambda field: data[field]
+    query = make_public_exercises_query(mock_db, [doc])
+
+    with patch("app.services.exercise_service.db", mock_db):
+        exercises, _ = get_all_exercises()
+
+    # Field mask: image_url, owner, category_id... are not downloaded
+    query.select.assert_called_once_with(["name", "calories_per_hour", "public"])
+    assert exercises == [{"id": "ex1", "calories_per_hour": 200, "name": "Plank", "public": True}]
+
+def test_get_all_exercises_invalid_cursor():
+    mock_db = MagicMock()
+    make_public_exercises_query(mock_db, [])
+
+    with patch("app.services.exercise_service.db", mock_db), pytest.raises(ValueError):
+        get_all_exercises(cursor="garbage")
 
 def test_get_exercises_exception():
     """
@@ -136,7 +199,7 @@ def test_get_exercises_exception():
     """
     with patch("app.services.exercise_service.db.collection", side_effect=Exception("Firestore error")):
         exercises = get_exercises("user123", show_public=False)
-    assert exercises == []
+    assert exercises == ([], None)
 
 def test_delete_exercise_success():
     """
@@ -153,7 +216,9 @@ def test_delete_exercise_success():
     }
 
     with patch("app.services.exercise_service.db", mock_db), \
-         patch("app.services.exercise_service.storage_client", mock_storage):
+         patch("app.services.metadata_service.db", mock_db), \
+         patch("app.services.exercise_service.storage_client", mock_storage), \
+         patch("app.services.exercise_service.delete_exercise_usage") as mock_delete_usage:
         
         # doc get => doc exists
         mock_db.collection.return_value.document.return_value.get.return_value = mock_doc_snap
@@ -161,8 +226,16 @@ def test_delete_exercise_success():
         success = delete_exercise("user123", "ex123")
     
     assert success is True
-    # Check we deleted from Firestore
-    mock_db.collection.return_value.document.return_value.delete.assert_called_once()
+    # The usage counter of the exercise goes away with it
+    mock_delete_usage.assert_called_once_with("ex123")
+    # Deleted in the same batch as the owner's trainings_last_modified stamp
+    exercise_ref = mock_db.collection.return_value.document.return_value
+    batch = mock_db.batch.return_value
+    batch.delete.assert_called_once_with(exercise_ref)
+    batch.set.assert_called_once_with(exercise_ref, {"trainings_last_modified": firestore.SERVER_TIMESTAMP}, merge=True)
+    batch.commit.assert_called_once()
+    # Private exercise => only the owner's trainings can embed it
+    mock_db.collection_group.assert_not_called()
 
     # Check we deleted from storage
     # The raw path might be "path/to%2Fimage.jpg", so ensure we unquote it
@@ -202,7 +275,9 @@ def test_update_exercise_success():
     mock_doc_snap.to_dict.return_value = {"owner": "user123"}
 
     with patch("app.services.exercise_service.db", mock_db), \
-         patch("app.services.exercise_service.storage_client", mock_storage):
+         patch("app.services.metadata_service.db", mock_db), \
+         patch("app.services.exercise_service.storage_client", mock_storage), \
+         patch("app.services.exercise_service.sync_exercise_usage") as mock_sync_usage:
         
         mock_db.collection.return_value.document.return_value.get.return_value = mock_doc_snap
 
@@ -210,11 +285,51 @@ def test_update_exercise_success():
         success = update_exercise("user123", "ex123", update_data, old_image_url="http://storage/old_image.jpg")
     
     assert success is True
-    # Check Firestore update called
-    mock_db.collection.return_value.document.return_value.update.assert_called_once_with(update_data)
+    mock_sync_usage.assert_called_once_with("ex123", update_data)
+    # Updated in the same batch as the owner's trainings_last_modified stamp
+    exercise_ref = mock_db.collection.return_value.document.return_value
+    batch = mock_db.batch.return_value
+    batch.update.assert_called_once_with(exercise_ref, update_data)
+    batch.set.assert_called_once_with(exercise_ref, {"trainings_last_modified": firestore.SERVER_TIMESTAMP}, merge=True)
+    batch.commit.assert_called_once()
     # Check old image deleted
     mock_storage.bucket.return_value.blob.return_value.delete.assert_called_once()
 
+def test_update_public_exercise_stamps_every_user_embedding_it():
+    """
+    A public exercise can be in other users' trainings => their trainings_last_modified is stamped too.
+    """
+    mock_db = MagicMock()
+    mock_doc_snap = MagicMock()
+    mock_doc_snap.exists = True
+    mock_doc_snap.to_dict.return_value = {"owner": "user123", "public": True}
+    mock_db.collection.return_value.document.return_value.get.return_value = mock_doc_snap
+
+    trainings = []
+    for user_id in ["user456", "user789", "user456"]:
+        training = MagicMock()
+        training.reference.parent.parent.id = user_id
+        trainings.append(training)
+    query = mock_db.collection_group.return_value.where.return_value.select.return_value
+    query.stream.return_value = trainings
+
+    with patch("app.services.exercise_service.db", mock_db), \
+         patch("app.services.metadata_service.db", mock_db), \
+         patch("app.services.exercise_service.sync_exercise_usage"):
+        success = update_exercise("user123", "ex123", {"calories_per_hour": 400}, old_image_url=None)
+
+    assert success is True
+    mock_db.collection_group.assert_called_once_with("user_trainings")
+    mock_db.collection_group.return_value.where.assert_called_once_with("exercises", "array_contains", "ex123")
+    stamped = [c.args[0] for c in mock_db.collection.return_value.document.call_args_list if c.args[0].startswith("user")]
+    assert sorted(set(stamped)) == ["user123", "user456", "user789"]
+    assert mock_db.batch.return_value.set.call_count == 3
+    # The exercise update plus a new updated_at on each training that embeds it (for /api/sync)
+    updates = mock_db.batch.return_value.update.call_args_list
+    assert [c.args[0] for c in updates[1:]] == [training.reference for training in trainings]
+    assert all(c.args[1] == {"updated_at": firestore.SERVER_TIMESTAMP} for c in updates[1:])
+    mock_db.batch.return_value.commit.assert_called_once()
+
 def test_update_exercise_wrong_owner():
     """
     If doc.owner != uid => return False
@@ -251,7 +366,7 @@ def test_update_exercise_exception():
 def test_get_all_exercises_exception():
     with patch("app.services.exercise_service.db.collection", side_effect=Exception("Firestore error")):
         result = get_all_exercises()
-    assert result == []
+    assert result == ([], None)
 
 def test_get_exercise_by_category_id_success():
     mock_db = MagicMock()
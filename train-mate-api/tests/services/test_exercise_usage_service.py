@@ -0,0 +1,101 @@
+import pytest
+from unittest.mock import patch, MagicMock, call
+from app.services.exercise_usage_service import (
+    increment_exercise_usage,
+    sync_exercise_usage,
+    get_top_exercises_by_usage,
+    rebuild_exercise_usage
+)
+
+def make_usage_doc(doc_id, data):
+    doc = MagicMock()
+    doc.id = doc_id
+    doc.get.side_effect = lambda field: data.get(field)
+    return doc
+
+def test_increment_exercise_usage_adds_to_the_callers_batch():
+    """
+    Repeated ids are counted once per reference, unknown exercises are skipped
+    and every counter goes into the caller's batch (committed by the caller).
+    """
+    mock_db = MagicMock()
+    batch = MagicMock()
+    usage_collection = mock_db.collection.return_value
+    usage_collection.document.side_effect = lambda ex_id: f"ref:{ex_id}"
+    exercises = {"ex1": {"name": "Squats", "public": True}, "ex2": {"name": "Private", "public": False}}
+
+    with patch("app.services.exercise_usage_service.db", mock_db), \
+         patch("app.services.exercise_usage_service.get_documents_by_ids", return_value=exercises) as mock_get:
+        increment_exercise_usage(batch, ["ex1", "ex2", "ex1", "gone"])
+
+    mock_get.assert_called_once_with("exercises", ["ex1", "ex2", "gone"])
+    mock_db.batch.assert_not_called()
+    assert batch.set.call_count == 2
+    ref, data = batch.set.call_args_list[0].args
+    assert ref == "ref:ex1"
+    assert data["name"] == "Squats" and data["public"] is True
+    assert data["count"].value == 2
+    assert batch.set.call_args_list[0].kwargs == {"merge": True}
+    batch.commit.assert_not_called()
+
+def test_increment_exercise_usage_nothing_to_count():
+    batch = MagicMock()
+    with patch("app.services.exercise_usage_service.get_documents_by_ids") as mock_get:
+        increment_exercise_usage(batch, [])
+    mock_get.assert_not_called()
+    batch.set.assert_not_called()
+
+def test_sync_exercise_usage_only_copies_denormalized_fields():
+    mock_db = MagicMock()
+    with patch("app.services.exercise_usage_service.db", mock_db):
+        sync_exercise_usage("ex1", {"name": "New", "calories_per_hour": 300})
+        sync_exercise_usage("ex1", {"calories_per_hour": 300})
+
+    mock_db.collection.return_value.document.return_value.set.assert_called_once_with({"name": "New"}, merge=True)
+
+def test_get_top_exercises_by_usage_single_query():
+    mock_db = MagicMock()
+    query = mock_db.collection.return_value.where.return_value.order_by.return_value.limit.return_value
+    query.stream.return_value = [
+        make_usage_doc("ex2", {"name": "Squats", "count": 4}),
+        make_usage_doc("ex1", {"name": "Push-ups", "count": 2}),
+    ]
+
+    with patch("app.services.exercise_usage_service.db", mock_db):
+        top = get_top_exercises_by_usage(5)
+
+    mock_db.collection.return_value.where.assert_called_once_with("public", "==", True)
+    mock_db.collection.return_value.where.return_value.order_by.return_value.limit.assert_called_once_with(5)
+    assert top == [
+        {"exercise_id": "ex2", "name": "Squats", "count": 4},
+        {"exercise_id": "ex1", "name": "Push-ups", "count": 2},
+    ]
+
+def test_rebuild_exercise_usage_recounts_from_scratch():
+    mock_db = MagicMock()
+
+    t1 = MagicMock()
+    t1.to_dict.return_value = {"exercises": ["ex1", "ex2"]}
+    t2 = MagicMock()
+    t2.to_dict.return_value = {"exercises": ["ex2", "ex2", "deleted"]}
+    mock_db.collection_group.return_value.select.return_value.stream.return_value = [t1, t2]
+
+    stale = MagicMock()
+    stale.id = "old_exercise"
+    usage_collection = mock_db.collection.return_value
+    usage_collection.stream.return_value = [stale]
+    usage_collection.document.side_effect = lambda ex_id: f"ref:{ex_id}"
+
+    exercises = {"ex1": {"name": "Squats", "public": True}, "ex2": {"name": "Lunges", "public": True}}
+
+    with patch("app.services.exercise_usage_service.db", mock_db), \
+         patch("app.services.documents_service.db", mock_db), \
+         patch("app.services.exercise_usage_service.get_documents_by_ids", return_value=exercises):
+        total = rebuild_exercise_usage()
+
+    assert total == 2
+    batch = mock_db.batch.return_value
+    batch.delete.assert_called_once_with(stale.reference)
+    counts = {c.args[0]: c.args[1]["count"] for c in batch.set.call_args_list}
+    assert counts == {"ref:ex1": 1, "ref:ex2": 3}
+    batch.commit.assert_called_once()
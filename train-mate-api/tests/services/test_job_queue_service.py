@@ -0,0 +1,203 @@
+import threading
+import pytest
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+from app.services.job_queue_service import (
+    register_job,
+    ThreadJobQueue,
+    SqliteJobQueue,
+    InlineJobQueue
+)
+from app.services.checkChallenges_service import (
+    merge_recheck_payloads,
+    recheck_user_challenges
+)
+
+def merge_items(pending, new):
+    return {"items": pending["items"] + new["items"]}
+
+@pytest.fixture
+def recorded_job():
+    calls = []
+    register_job("test_job", lambda items: calls.append(items), merge_items)
+    return calls
+
+def test_thread_queue_collapses_pending_jobs_for_the_same_key(recorded_job):
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking(items):
+        started.set()
+        release.wait(5)
+
+    register_job("blocking_job", blocking)
+    queue = ThreadJobQueue(workers=1)
+    # Keep the only worker busy so the next jobs stay pending
+    queue.enqueue("blocking_job", "other", {"items": []})
+    started.wait(5)
+
+    assert queue.enqueue("test_job", "user123", {"items": [1]}) is True
+    assert queue.enqueue("test_job", "user123", {"items": [2]}) is False
+    assert queue.enqueue("test_job", "user456", {"items": [3]}) is True
+
+    release.set()
+    queue.shutdown()
+
+    assert sorted(recorded_job) == [[1, 2], [3]]
+    stats = queue.stats()
+    assert stats["coalesced"] == 1
+    assert stats["completed"] == 3
+    assert stats["pending"] == 0
+
+def test_thread_queue_defers_jobs_for_a_running_key():
+    started = threading.Event()
+    release = threading.Event()
+    lock = threading.Lock()
+    running = []
+    overlaps = []
+    calls = []
+
+    def blocking(items):
+        with lock:
+            if running:
+                overlaps.append(items)
+            running.append(items)
+        started.set()
+        release.wait(5)
+        calls.append(items)
+        with lock:
+            running.remove(items)
+
+    register_job("serial_job", blocking, merge_items)
+    queue = ThreadJobQueue(workers=4)
+    queue.enqueue("serial_job", "user123", {"items": [1]})
+    started.wait(5)
+
+    # The first job is running: the next ones wait for it (merged) instead of using a free worker
+    assert queue.enqueue("serial_job", "user123", {"items": [2]}) is True
+    assert queue.enqueue("serial_job", "user123", {"items": [3]}) is False
+    assert queue.pending() == 1
+
+    release.set()
+    queue.shutdown()
+
+    assert calls == [[1], [2, 3]]
+    assert overlaps == []
+    stats = queue.stats()
+    assert stats["completed"] == 2
+    assert stats["coalesced"] == 1
+    assert stats["pending"] == 0
+
+def test_thread_queue_counts_failed_jobs():
+    register_job("failing_job", MagicMock(side_effect=Exception("Firestore down")))
+    queue = ThreadJobQueue(workers=1)
+    queue.enqueue("failing_job", "user123", {})
+    queue.shutdown()
+    assert queue.stats()["failed"] == 1
+
+def test_sqlite_queue_persists_and_merges_pending_jobs(tmp_path, recorded_job):
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = SqliteJobQueue(path=path, start_worker=False)
+    assert queue.enqueue("test_job", "user123", {"items": [1]}) is True
+    assert queue.enqueue("test_job", "user123", {"items": [2]}) is False
+    assert queue.pending() == 1
+
+    # A new process picks up what was left
+    restarted = SqliteJobQueue(path=path, start_worker=False)
+    assert restarted.run_pending() == 1
+    assert recorded_job == [[1, 2]]
+    assert restarted.pending() == 0
+
+def test_sqlite_queue_round_trips_dates(tmp_path):
+    received = []
+    register_job("dates_job", lambda date: received.append(date))
+    queue = SqliteJobQueue(path=str(tmp_path / "jobs.sqlite3"), start_worker=False)
+
+    queue.enqueue("dates_job", "user123", {"date": datetime(2025, 1, 7, 10, 0)})
+    queue.run_pending()
+
+    assert received == [datetime(2025, 1, 7, 10, 0)]
+
+def test_sqlite_queue_retries_then_marks_failed(tmp_path):
+    handler = MagicMock(side_effect=Exception("Firestore down"))
+    register_job("retry_job", handler)
+    queue = SqliteJobQueue(path=str(tmp_path / "jobs.sqlite3"), start_worker=False)
+    queue.enqueue("retry_job", "user123", {})
+
+    with patch("app.services.job_queue_service.JOB_MAX_ATTEMPTS", 2):
+        queue.run_pending()
+
+    assert handler.call_count == 2
+    assert queue.pending() == 0
+    assert queue.stats()["failed"] == 1
+
+def test_sqlite_queue_claims_each_job_once_across_processes(tmp_path, recorded_job):
+    path = str(tmp_path / "jobs.sqlite3")
+    first = SqliteJobQueue(path=path, start_worker=False)
+    second = SqliteJobQueue(path=path, start_worker=False)
+    first.enqueue("test_job", "user123", {"items": [1]})
+
+    assert first._claim() is not None
+    # Already running in the other process (lease not expired) => nothing to claim
+    assert second._claim() is None
+    assert second.run_pending() == 0
+    assert recorded_job == []
+
+def test_sqlite_queue_takes_over_expired_leases(tmp_path, recorded_job):
+    path = str(tmp_path / "jobs.sqlite3")
+    crashed = SqliteJobQueue(path=path, start_worker=False)
+    crashed.enqueue("test_job", "user123", {"items": [1]})
+    crashed._claim()  # the process dies while running it
+
+    restarted = SqliteJobQueue(path=path, start_worker=False, lease_seconds=0)
+    assert restarted.run_pending() == 1
+    assert recorded_job == [[1]]
+
+def test_sqlite_queue_retries_a_failed_challenges_recheck(tmp_path):
+    from app.services.checkChallenges_service import RECHECK_CHALLENGES_JOB
+    queue = SqliteJobQueue(path=str(tmp_path / "jobs.sqlite3"), start_worker=False)
+    queue.enqueue(RECHECK_CHALLENGES_JOB, "user123", {"uid": "user123", "workouts": [{"id": "w1"}]})
+
+    # The check catches its errors and returns False: the recheck raises so the job is retried
+    with patch("app.services.checkChallenges_service.check_and_update_workouts_challenges", side_effect=[False, True]) as mock_workouts:
+        assert queue.run_pending() == 2
+
+    assert mock_workouts.call_count == 2
+    assert queue.pending() == 0
+    assert queue.stats()["completed"] == 1
+
+def test_inline_queue_runs_immediately(recorded_job):
+    queue = InlineJobQueue()
+    queue.enqueue("test_job", "user123", {"items": [1]})
+    assert recorded_job == [[1]]
+
+def test_merge_recheck_payloads():
+    pending = {"uid": "user123", "physical_dates": ["2025-01-07"], "workouts": [{"id": "w1"}], "rebuild_workouts": False}
+    new = {"uid": "user123", "physical_dates": ["2025-01-07", "2025-01-08"], "workouts": [{"id": "w2"}], "rebuild_workouts": True}
+
+    assert merge_recheck_payloads(pending, new) == {
+        "uid": "user123",
+        "physical_dates": ["2025-01-07", "2025-01-08"],
+        "workouts": [{"id": "w1"}, {"id": "w2"}],
+        "rebuild_workouts": True
+    }
+
+def test_recheck_user_challenges_evaluates_once_per_burst():
+    with patch("app.services.checkChallenges_service.check_and_update_physical_challenges") as mock_physical, \
+         patch("app.services.checkChallenges_service.check_and_update_workouts_challenges") as mock_workouts:
+        recheck_user_challenges("user123", physical_dates=["2025-01-07"], workouts=[{"id": "w1"}, {"id": "w2"}])
+
+    mock_physical.assert_called_once_with("user123", "2025-01-07")
+    mock_workouts.assert_called_once_with("user123", [{"id": "w1"}, {"id": "w2"}])
+
+def test_recheck_user_challenges_rebuild_ignores_incremental_workouts():
+    with patch("app.services.checkChallenges_service.check_and_update_workouts_challenges") as mock_workouts:
+        recheck_user_challenges("user123", workouts=[{"id": "w1"}], rebuild_workouts=True)
+
+    mock_workouts.assert_called_once_with("user123")
+
+def test_recheck_user_challenges_raises_when_a_check_fails():
+    with patch("app.services.checkChallenges_service.check_and_update_physical_challenges", return_value=False), \
+         patch("app.services.checkChallenges_service.check_and_update_workouts_challenges", return_value=True):
+        with pytest.raises(RuntimeError):
+            recheck_user_challenges("user123", physical_dates=["2025-01-07"], workouts=[{"id": "w1"}])
@@ -0,0 +1,75 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from app.services.pagination_service import (
+    parse_limit,
+    encode_cursor,
+    decode_cursor,
+    paginate,
+    MAX_PAGE_SIZE
+)
+
+def make_query(snapshots):
+    query = MagicMock()
+    query.select.return_value = query
+    query.order_by.return_value = query
+    query.start_after.return_value = query
+    query.limit.return_value.stream.return_value = snapshots
+    return query
+
+def test_parse_limit():
+    assert parse_limit(None) == 20
+    assert parse_limit("5") == 5
+    assert parse_limit("100000") == MAX_PAGE_SIZE
+    with pytest.raises(ValueError):
+        parse_limit("0")
+    with pytest.raises(ValueError):
+        parse_limit("abc")
+
+def test_cursor_round_trip(make_snapshot):
+    date = datetime(2025, 1, 7, 10, 0, tzinfo=timezone.utc)
+    cursor = encode_cursor(make_snapshot("w1", {"date": date}), ["date"])
+
+    assert decode_cursor(cursor) == {"date": date, "__name__": "w1"}
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_paginate_returns_next_cursor_when_more_docs(make_snapshot):
+    snapshots = [make_snapshot(f"w{i}", {"date": datetime(2025, 1, 10 - i)}) for i in range(3)]
+    query = make_query(snapshots)
+
+    page, next_cursor = paginate(query, ["date"], limit=2)
+
+    assert [snapshot.id for snapshot in page] == ["w0", "w1"]
+    # Fetches one extra doc to know there is a next page
+    query.limit.assert_called_once_with(3)
+    assert [c.args[0] for c in query.order_by.call_args_list] == ["date", "__name__"]
+    assert decode_cursor(next_cursor) == {"date": datetime(2025, 1, 9), "__name__": "w1"}
+
+def test_paginate_last_page_and_start_after(make_snapshot):
+    snapshots = [make_snapshot("w2", {"date": datetime(2025, 1, 8)})]
+    query = make_query(snapshots)
+    cursor = encode_cursor(make_snapshot("w1", {"date": datetime(2025, 1, 9)}), ["date"])
+
+    page, next_cursor = paginate(query, ["date"], limit=2, cursor=cursor)
+
+    assert [snapshot.id for snapshot in page] == ["w2"]
+    assert next_cursor is None
+    query.start_after.assert_called_once_with({"date": datetime(2025, 1, 9), "__name__": "w1"})
+
+def test_paginate_field_mask_includes_order_fields():
+    query = make_query([])
+
+    paginate(query, ["name"], limit=2, field_paths=["calories_per_hour", "name"])
+
+    query.select.assert_called_once_with(["calories_per_hour", "name"])
+    query = make_query([])
+    paginate(query, ["date"], limit=2, field_paths=["duration"])
+    query.select.assert_called_once_with(["duration", "date"])
+
+def test_paginate_without_field_mask_fetches_full_docs():
+    query = make_query([])
+    paginate(query, ["date"], limit=2)
+    query.select.assert_not_called()
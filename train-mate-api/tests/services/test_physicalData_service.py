@@ -8,7 +8,7 @@ from app.services.physicalData_service import (
 
 def test_add_physical_data_service_success():
     """
-    If Firestore calls succeed and check_and_update_physical_challenges is called,
+    If Firestore calls succeed and the challenges recheck is enqueued,
     the function should return True.
     """
     mock_db = MagicMock()
@@ -17,7 +17,7 @@ def test_add_physical_data_service_success():
     mock_doc_ref = MagicMock()
     
     with patch("app.services.physicalData_service.db", mock_db), \
-         patch("app.services.physicalData_service.check_and_update_physical_challenges") as mock_challenges:
+         patch("app.services.physicalData_service.enqueue_challenges_recheck") as mock_challenges:
         
         # user_ref.get() => mock_user_doc
         mock_db.collection.return_value.document.return_value.get.return_value = mock_user_doc
@@ -35,15 +35,15 @@ def test_add_physical_data_service_success():
     assert success is True
     # The set(...) call should happen on the doc_ref
     mock_doc_ref.set.assert_called_once()
-    # check_and_update_physical_challenges should be called once
-    mock_challenges.assert_called_once_with("user123", "2025-05-01")
+    # The challenges recheck is queued, not run in the request
+    mock_challenges.assert_called_once_with("user123", physical_date="2025-05-01")
 
 def test_add_physical_data_service_exception():
     """
     If an exception is raised, the function returns False.
     """
     with patch("app.services.physicalData_service.db.collection", side_effect=Exception("DB error")), \
-         patch("app.services.physicalData_service.check_and_update_physical_challenges"):
+         patch("app.services.physicalData_service.enqueue_challenges_recheck"):
         
         success = add_physical_data_service(
             uid="user123",
@@ -54,6 +54,20 @@ def test_add_physical_data_service_exception():
         )
     assert success is False
 
+def test_add_physical_data_service_enqueue_failure_still_succeeds():
+    """
+    The data is already written when the enqueue fails => True, so the client does not retry the write.
+    """
+    mock_db = MagicMock()
+    mock_doc_ref = mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value
+
+    with patch("app.services.physicalData_service.db", mock_db), \
+         patch("app.services.physicalData_service.enqueue_challenges_recheck", side_effect=Exception("queue down")):
+        success = add_physical_data_service("user123", 15, 40, 70, "2025-05-01")
+
+    assert success is True
+    mock_doc_ref.set.assert_called_once()
+
 def test_get_physical_data_service_success():
     """
     If user doc exists, return a list of data from the .stream() results.
@@ -0,0 +1,70 @@
+import pytest
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+from app.services.rollup_service import (
+    period_key,
+    period_bounds,
+    plan_rollup_reads,
+    rebuild_rollups
+)
+
+def test_period_key_and_bounds():
+    date = datetime(2025, 1, 1)
+    assert period_key(date, "week") == "2025-W01"
+    assert period_bounds(date, "week") == (datetime(2024, 12, 30), datetime(2025, 1, 5))
+    assert period_key(date, "month") == "2025-01"
+    assert period_bounds(datetime(2024, 2, 10), "month") == (datetime(2024, 2, 1), datetime(2024, 2, 29))
+    assert period_key(date, "day") == "2025-01-01"
+
+def test_plan_rollup_reads_full_year_by_month():
+    full_periods, day_ranges = plan_rollup_reads(datetime(2024, 1, 1), datetime(2024, 12, 31), "month")
+    assert len(full_periods) == 12
+    assert day_ranges == []
+
+def test_plan_rollup_reads_partial_edges():
+    full_periods, day_ranges = plan_rollup_reads(datetime(2024, 1, 15), datetime(2024, 4, 10), "month")
+    assert full_periods == ["2024-02", "2024-03"]
+    assert day_ranges == [
+        (datetime(2024, 1, 15), datetime(2024, 1, 31)),
+        (datetime(2024, 4, 1), datetime(2024, 4, 10))
+    ]
+
+def test_plan_rollup_reads_range_inside_one_period():
+    full_periods, day_ranges = plan_rollup_reads(datetime(2025, 1, 7), datetime(2025, 1, 9), "week")
+    assert full_periods == []
+    assert day_ranges == [(datetime(2025, 1, 7), datetime(2025, 1, 9))]
+
+def test_rebuild_rollups_recomputes_from_daily_docs():
+    mock_db = MagicMock()
+    parent_ref = MagicMock()
+
+    daily_docs = []
+    for day, quantity in [(1, 500), (2, 300), (8, 1000)]:
+        doc = MagicMock()
+        doc.to_dict.return_value = {"date": datetime(2025, 1, day), "quantity_in_militers": quantity}
+        daily_docs.append(doc)
+    stale = MagicMock()
+    stale.id = "2024-W40"
+
+    def collection(name):
+        collection_ref = MagicMock()
+        collection_ref.document.side_effect = lambda key: f"{name}/{key}"
+        collection_ref.stream.return_value = {
+            "user_water_intakes": daily_docs,
+            "user_water_intakes_weekly": [stale]
+        }.get(name, [])
+        return collection_ref
+    parent_ref.collection.side_effect = collection
+
+    with patch("app.services.documents_service.db", mock_db):
+        total = rebuild_rollups(parent_ref, "user_water_intakes", lambda data: {"quantity_in_militers": data["quantity_in_militers"]})
+
+    assert total == 3
+    batch = mock_db.batch.return_value
+    batch.delete.assert_called_once_with(stale.reference)
+    written = {c.args[0]: c.args[1]["quantity_in_militers"] for c in batch.set.call_args_list}
+    assert written == {
+        "user_water_intakes_weekly/2025-W01": 800,
+        "user_water_intakes_weekly/2025-W02": 1000,
+        "user_water_intakes_monthly/2025-01": 1800
+    }
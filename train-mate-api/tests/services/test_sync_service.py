@@ -0,0 +1,260 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+from firebase_admin import firestore
+from app.services.sync_service import (
+    parse_high_water_mark,
+    to_high_water_mark,
+    sync_collection,
+    sync_user_collections
+)
+
+NOW = datetime(2025, 5, 10, 12, 0, tzinfo=timezone.utc)
+
+def make_sync_db(make_snapshot, changed, tombstones):
+    mock_db = MagicMock()
+    changed_ref = MagicMock()
+    metadata_ref = MagicMock()
+    mock_db.collection.side_effect = lambda name: metadata_ref if name == 'metadata' else changed_ref
+    # categories: where(owner).where(updated_at); workouts/trainings: document().collection().where(updated_at)
+    changed_ref.where.return_value.where.return_value.stream.return_value = changed
+    changed_ref.document.return_value.collection.return_value.where.return_value.stream.return_value = changed
+    tombstones_query = metadata_ref.document.return_value.collection.return_value.where.return_value.where.return_value
+    tombstones_query.stream.return_value = [make_snapshot(t["document_id"], t) for t in tombstones]
+    return mock_db, changed_ref, metadata_ref
+
+def test_parse_high_water_mark():
+    assert parse_high_water_mark(None) is None
+    assert parse_high_water_mark("") is None
+    date = parse_high_water_mark("1736244000000")
+    assert date == datetime(2025, 1, 7, 10, 0, tzinfo=timezone.utc)
+    assert to_high_water_mark(date) == 1736244000000
+    with pytest.raises(ValueError):
+        parse_high_water_mark("yesterday")
+    with pytest.raises(ValueError):
+        parse_high_water_mark("-1")
+
+def test_sync_collection_without_mark_is_full():
+    categories = [{"id": "cat1", "name": "Mine"}, {"id": "def1", "name": "Default"}]
+    with patch("app.services.sync_service.get_categories", return_value=categories) as mock_get:
+        result = sync_collection("user123", "categories", None, NOW)
+
+    mock_get.assert_called_once_with("user123")
+    assert result == {
+        "full": True,
+        "changed": categories,
+        "deleted": [],
+        "high_water_mark": to_high_water_mark(NOW - timedelta(seconds=5))
+    }
+
+def test_sync_collection_mark_older_than_tombstones_is_full():
+    with patch("app.services.sync_service.get_user_trainings", return_value=[]) as mock_get:
+        result = sync_collection("user123", "trainings", NOW - timedelta(days=365), NOW)
+
+    assert result["full"] is True
+    mock_get.assert_called_once_with("user123")
+
+def test_sync_collection_delta_returns_changes_and_tombstones(make_snapshot):
+    since = NOW - timedelta(hours=1)
+    changed = [make_snapshot("cat1", {"name": "Renamed", "owner": "user123", "updated_at": NOW - timedelta(minutes=30)})]
+    tombstones = [{"collection": "categories", "document_id": "cat2", "deleted_at": NOW - timedelta(minutes=10)}]
+    mock_db, changed_ref, _ = make_sync_db(make_snapshot, changed, tombstones)
+
+    with patch("app.services.sync_service.db", mock_db), \
+         patch("app.services.metadata_service.db", mock_db), \
+         patch("app.services.sync_service.get_categories") as mock_full:
+        result = sync_collection("user123", "categories", since, NOW)
+
+    mock_full.assert_not_called()
+    changed_ref.where.assert_called_once_with("owner", "==", "user123")
+    changed_ref.where.return_value.where.assert_called_once_with("updated_at", ">", since)
+    assert result["full"] is False
+    assert result["changed"] == [{"name": "Renamed", "owner": "user123", "updated_at": NOW - timedelta(minutes=30), "id": "cat1"}]
+    assert result["deleted"] == ["cat2"]
+    # Newest timestamp seen, here the tombstone
+    assert result["high_water_mark"] == to_high_water_mark(NOW - timedelta(minutes=10))
+
+def test_sync_collection_delta_without_changes_keeps_the_mark(make_snapshot):
+    since = NOW - timedelta(hours=1)
+    mock_db, _, _ = make_sync_db(make_snapshot, [], [])
+
+    with patch("app.services.sync_service.db", mock_db), \
+         patch("app.services.metadata_service.db", mock_db), \
+         patch("app.services.sync_service.hydrate_workouts_with_trainings", side_effect=lambda uid, workouts: workouts):
+        result = sync_collection("user123", "workouts", since, NOW)
+
+    assert result == {"full": False, "changed": [], "deleted": [], "high_water_mark": to_high_water_mark(since)}
+
+def test_sync_collection_delta_hydrates_workouts(make_snapshot):
+    since = NOW - timedelta(hours=1)
+    changed = [make_snapshot("w1", {"training_id": "tr1", "updated_at": NOW - timedelta(minutes=5)})]
+    mock_db, _, _ = make_sync_db(make_snapshot, changed, [])
+
+    def hydrate(uid, workouts):
+        for workout in workouts:
+            workout["training"] = {"name": "Legs"}
+        return workouts
+
+    with patch("app.services.sync_service.db", mock_db), \
+         patch("app.services.metadata_service.db", mock_db), \
+         patch("app.services.sync_service.hydrate_workouts_with_trainings", side_effect=hydrate) as mock_hydrate:
+        result = sync_collection("user123", "workouts", since, NOW)
+
+    mock_hydrate.assert_called_once()
+    assert result["changed"][0]["id"] == "w1"
+    assert result["changed"][0]["training"] == {"name": "Legs"}
+
+def test_sync_user_collections_uses_each_collection_mark():
+    since = NOW - timedelta(hours=1)
+    calls = []
+
+    def fake_sync(uid, collection, collection_since, now):
+        calls.append((collection, collection_since))
+        return {"full": collection_since is None}
+
+    with patch("app.services.sync_service.sync_collection", side_effect=fake_sync):
+        result = sync_user_collections("user123", {"workouts": since})
+
+    assert sorted(calls) == [("categories", None), ("trainings", None), ("workouts", since)]
+    assert result == {"workouts": {"full": False}, "trainings": {"full": True}, "categories": {"full": True}}
+
+class FakeFirestore:
+    """
+    Just enough of an in-memory Firestore for a write -> delta sync round trip:
+    documents by path, where/select/stream, collection groups, batches and get_all.
+    SERVER_TIMESTAMP is replaced by a clock that moves one second per commit.
+    """
+    OPERATORS = {
+        '==': lambda value, expected: value == expected,
+        '>': lambda value, expected: value is not None and value > expected,
+        'in': lambda value, expected: value in expected,
+        'array_contains': lambda value, expected: expected in (value or []),
+    }
+
+    def __init__(self, docs, clock):
+        self.docs = dict(docs)
+        self.clock = clock
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def collection_group(self, name):
+        return FakeQuery(self, lambda path: path.split('/')[-2] == name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def get_all(self, refs):
+        return [ref.get() for ref in refs]
+
+class FakeDocument:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self.id = path.rsplit('/', 1)[1]
+        parent_path = path.rsplit('/', 1)[0]
+        self.parent = FakeCollection(db, parent_path)
+
+    def collection(self, name):
+        return FakeCollection(self.db, f'{self.path}/{name}')
+
+    def get(self):
+        data = self.db.docs.get(self.path)
+        return FakeSnapshot(self, dict(data) if data is not None else None)
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+class FakeQuery:
+    def __init__(self, db, matches_path, filters=()):
+        self.db = db
+        self.matches_path = matches_path
+        self.filters = filters
+
+    def where(self, field, op, value):
+        return FakeQuery(self.db, self.matches_path, self.filters + ((field, op, value),))
+
+    def select(self, field_paths):
+        return self
+
+    def stream(self):
+        for path, data in sorted(self.db.docs.items()):
+            if self.matches_path(path) and all(FakeFirestore.OPERATORS[op](data.get(field), value) for field, op, value in self.filters):
+                yield FakeSnapshot(FakeDocument(self.db, path), dict(data))
+
+class FakeCollection(FakeQuery):
+    def __init__(self, db, path):
+        super().__init__(db, lambda doc_path: doc_path.rsplit('/', 1)[0] == path)
+        self.path = path
+        self.parent = FakeDocument(db, path.rsplit('/', 1)[0]) if '/' in path else None
+
+    def document(self, doc_id):
+        return FakeDocument(self.db, f'{self.path}/{doc_id}')
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref.path, data, merge))
+
+    def update(self, ref, data):
+        self.writes.append((ref.path, data, True))
+
+    def delete(self, ref):
+        self.writes.append((ref.path, None, False))
+
+    def commit(self):
+        timestamp = self.db.clock()
+        for path, data, merge in self.writes:
+            if data is None:
+                self.db.docs.pop(path, None)
+                continue
+            data = {field: timestamp if value is firestore.SERVER_TIMESTAMP else value for field, value in data.items()}
+            self.db.docs[path] = {**self.db.docs.get(path, {}), **data} if merge else data
+
+def test_exercise_edit_shows_up_in_the_next_trainings_and_workouts_delta():
+    """
+    Trainings and workouts embed the exercise: editing it must resend both in the next delta
+    sync, not only bump the ETags.
+    """
+    from app.services.exercise_service import update_exercise
+
+    synced_at = NOW - timedelta(hours=1)
+    commits = iter(NOW - timedelta(minutes=30) + timedelta(seconds=second) for second in range(100))
+    fake_db = FakeFirestore({
+        'exercises/ex1': {'name': 'Squats', 'calories_per_hour': 300, 'owner': 'user123', 'public': False},
+        'trainings/user123/user_trainings/tr1': {'name': 'Legs', 'exercises': ['ex1'], 'owner': 'user123', 'updated_at': synced_at - timedelta(days=1)},
+        'trainings/user123/user_trainings/tr2': {'name': 'Arms', 'exercises': [], 'owner': 'user123', 'updated_at': synced_at - timedelta(days=1)},
+        'workouts/user123/user_workouts/w1': {'training_id': 'tr1', 'duration': 60, 'updated_at': synced_at - timedelta(days=1)},
+        'workouts/user123/user_workouts/w2': {'training_id': 'tr2', 'duration': 30, 'updated_at': synced_at - timedelta(days=1)},
+    }, clock=lambda: next(commits))
+
+    with patch("app.services.exercise_service.db", fake_db), \
+         patch("app.services.metadata_service.db", fake_db), \
+         patch("app.services.documents_service.db", fake_db), \
+         patch("app.services.sync_service.db", fake_db), \
+         patch("app.services.exercise_service.sync_exercise_usage"):
+        assert update_exercise("user123", "ex1", {"name": "Front squats"}, old_image_url=None) is True
+        trainings = sync_collection("user123", "trainings", synced_at, NOW)
+        workouts = sync_collection("user123", "workouts", synced_at, NOW)
+
+    edited_at = NOW - timedelta(minutes=30)
+    assert fake_db.docs['metadata/user123']['trainings_last_modified'] == edited_at
+
+    assert [training['id'] for training in trainings['changed']] == ['tr1']
+    assert trainings['changed'][0]['exercises'][0]['name'] == 'Front squats'
+    assert trainings['high_water_mark'] == to_high_water_mark(edited_at)
+
+    # w1 did not change itself, but its embedded training did
+    assert [workout['id'] for workout in workouts['changed']] == ['w1']
+    assert workouts['changed'][0]['training']['exercises'][0]['name'] == 'Front squats'
+    assert workouts['high_water_mark'] == to_high_water_mark(edited_at)
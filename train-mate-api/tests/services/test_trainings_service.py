@@ -1,11 +1,12 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from collections import Counter
+from firebase_admin import firestore
 from app.services.trainings_service import (
     save_user_training,
     get_user_trainings,
     get_training_by_id,
     get_popular_exercises,
+    clear_popular_exercises_cache,
     recalculate_calories_per_hour_mean_of_trainings_by_modified_excercise
 )
 
@@ -20,13 +21,15 @@ def test_save_user_training_success():
     mock_user_doc = MagicMock()
     mock_user_doc.exists = False
 
-    # user_trainings_ref.add(...) => returns (None, mock_doc_ref)
+    # user_trainings_ref.document() => new doc ref with a generated id
     mock_doc_ref = MagicMock()
     mock_doc_ref.id = "new_training_id"
 
-    with patch("app.services.trainings_service.db", mock_db):
+    with patch("app.services.trainings_service.db", mock_db), \
+         patch("app.services.metadata_service.db", mock_db), \
+         patch("app.services.trainings_service.increment_exercise_usage") as mock_increment_usage:
         mock_db.collection.return_value.document.return_value.get.return_value = mock_user_doc
-        mock_db.collection.return_value.document.return_value.collection.return_value.add.return_value = (None, mock_doc_ref)
+        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value = mock_doc_ref
 
         result = save_user_training(
             uid="user123",
@@ -39,9 +42,24 @@ def test_save_user_training_success():
     assert result["calories_per_hour_mean"] == 350
     assert result["exercises"] == ["ex1", "ex2"]
     assert result["owner"] == "user123"
+    # The popular exercises counters are bumped in the training's batch, before the commit
+    batch = mock_db.batch.return_value
+    mock_increment_usage.assert_called_once_with(batch, ["ex1", "ex2"])
     # Check calls
-    mock_db.collection.assert_called_with("trainings")
-    mock_db.collection.return_value.document.assert_called_with("user123")
+    mock_db.collection.assert_any_call("trainings")
+    mock_db.collection.return_value.document.assert_any_call("user123")
+    # The training and the trainings_last_modified stamp go in the same batch
+    batch = mock_db.batch.return_value
+    batch.set.assert_any_call(mock_doc_ref, {
+        "calories_per_hour_mean": 350,
+        "exercises": ["ex1", "ex2"],
+        "name": "My Training",
+        "owner": "user123",
+        "updated_at": firestore.SERVER_TIMESTAMP
+    })
+    mock_db.collection.assert_any_call("metadata")
+    assert list(batch.set.call_args_list[-1].args[1]) == ["trainings_last_modified"]
+    batch.commit.assert_called_once()
 
 def test_save_user_training_exception():
     """
@@ -59,10 +77,24 @@ def test_save_user_training_exception():
             )
     assert "DB error" in str(exc_info.value)
 
-def test_get_user_trainings_success():
+def make_exercise_snapshot(ex_id, data=None):
+    snapshot = MagicMock()
+    snapshot.id = ex_id
+    snapshot.exists = data is not None
+    snapshot.to_dict.return_value = data
+    return snapshot
+
+def make_trainings_db(trainings_stream):
+    """
+    Builds a db mock whose 'trainings/{uid}/user_trainings' stream returns trainings_stream.
+    """
     mock_db = MagicMock()
+    user_trainings_mock = MagicMock()
+    user_trainings_mock.stream.return_value = trainings_stream
+    mock_db.collection.return_value.document.return_value.collection.return_value = user_trainings_mock
+    return mock_db, user_trainings_mock
 
-    # Fake training docs
+def test_get_user_trainings_success():
     mock_training1 = MagicMock()
     mock_training1.id = "t1"
     mock_training1.to_dict.return_value = {"exercises": ["ex1", "ex2"], "name": "Leg Day"}
@@ -71,86 +103,71 @@ def test_get_user_trainings_success():
     mock_training2.id = "t2"
     mock_training2.to_dict.return_value = {"exercises": ["ex3"], "name": "Arm Day"}
 
-    # This is what we want from .stream() when we look up 'trainings/.../user_trainings'
-    mock_trainings_stream = [mock_training1, mock_training2]
-
-    # Fake exercise docs
-    mock_ex1 = MagicMock()
-    mock_ex1.exists = True
-    mock_ex1.to_dict.return_value = {"name": "Squats", "calories_per_hour": 400}
-    
-    mock_ex2 = MagicMock()
-    mock_ex2.exists = True
-    mock_ex2.to_dict.return_value = {"name": "Lunges", "calories_per_hour": 300}
-    
-    mock_ex3 = MagicMock()
-    mock_ex3.exists = False  # pretend ex3 doc doesn't exist
-
-    # We'll define a function that returns a different mock object
-    # depending on which collection name is requested.
-    def mock_collection_side_effect(collection_name):
-        if collection_name == "trainings":
-            # Return a mock that can handle .document(uid).collection('user_trainings').stream()
-            trainings_top_mock = MagicMock()
-            doc_mock = MagicMock()
-            # doc_mock.collection("user_trainings").stream() => mock_trainings_stream
-            user_trainings_mock = MagicMock()
-            user_trainings_mock.stream.return_value = mock_trainings_stream
-            doc_mock.collection.return_value = user_trainings_mock
-
-            # doc_mock.get().exists => True to simulate user doc existing
-            doc_get_mock = MagicMock()
-            doc_get_mock.exists = True
-            doc_mock.get.return_value = doc_get_mock
-
-            # So trainings_top_mock.document(uid) => doc_mock
-            trainings_top_mock.document.return_value = doc_mock
-            return trainings_top_mock
-
-        elif collection_name == "exercises":
-            # Return a mock that can handle .document(ex_id).get() for ex1, ex2, ex3
-            exercises_mock = MagicMock()
-            
-            def doc_side_effect(ex_id):
-                doc_for_ex = MagicMock()
-                if ex_id == "ex1":
-                    doc_for_ex.get.return_value = mock_ex1
-                elif ex_id == "ex2":
-                    doc_for_ex.get.return_value = mock_ex2
-                elif ex_id == "ex3":
-                    doc_for_ex.get.return_value = mock_ex3
-                else:
-                    # unknown => doc.exists=False
-                    doc_for_ex.get.return_value = MagicMock(exists=False)
-                return doc_for_ex
+    mock_db, _ = make_trainings_db([mock_training1, mock_training2])
 
-            exercises_mock.document.side_effect = doc_side_effect
-            return exercises_mock
+    # ex3 doc doesn't exist
+    docs_db = MagicMock()
+    docs_db.get_all.return_value = [
+        make_exercise_snapshot("ex1", {"name": "Squats", "calories_per_hour": 400}),
+        make_exercise_snapshot("ex2", {"name": "Lunges", "calories_per_hour": 300}),
+        make_exercise_snapshot("ex3"),
+    ]
 
-        else:
-            # If code calls db.collection('some_other'), just return a generic mock
-            return MagicMock()
-
-    # Now patch db so that every time .collection(...) is called, we use the side effect above
-    mock_db.collection.side_effect = mock_collection_side_effect
-
-    with patch("app.services.trainings_service.db", mock_db):
-        from app.services.trainings_service import get_user_trainings
+    with patch("app.services.trainings_service.db", mock_db), \
+         patch("app.services.documents_service.db", docs_db):
         result = get_user_trainings("user123")
-    
+
     # We expect 2 training objects returned
     assert len(result) == 2
 
-    # 't1' includes ex1, ex2 => ex3 is missing doc
     # first training => 'Squats', 'Lunges'
     assert result[0]["id"] == "t1"
     assert result[0]["exercises"][0]["name"] == "Squats"
+    assert result[0]["exercises"][0]["exercise_id"] == "ex1"
     assert result[0]["exercises"][1]["name"] == "Lunges"
 
     # second training => ex3 doesn't exist => 0 exercises
     assert result[1]["id"] == "t2"
     assert len(result[1]["exercises"]) == 0
 
+    # All exercises were fetched in a single batched read
+    docs_db.get_all.assert_called_once()
+
+def test_get_user_trainings_reads_are_bounded_by_unique_exercises():
+    """
+    30 trainings of 6 exercises (12 distinct ids) => 1 stream + ceil(12 / chunk) batched reads.
+    """
+    import math
+    from app.services import documents_service
+
+    trainings = []
+    for i in range(30):
+        training = MagicMock()
+        training.id = f"t{i}"
+        training.to_dict.return_value = {"exercises": [f"ex{(i + j) % 12}" for j in range(6)], "name": f"Training {i}"}
+        trainings.append(training)
+
+    mock_db, user_trainings_mock = make_trainings_db(trainings)
+
+    docs_db = MagicMock()
+    docs_db.get_all.side_effect = lambda refs: [
+        make_exercise_snapshot(ref.id, {"name": ref.id}) for ref in refs
+    ]
+    docs_db.collection.return_value.document.side_effect = lambda ex_id: MagicMock(id=ex_id)
+
+    with patch("app.services.trainings_service.db", mock_db), \
+         patch("app.services.documents_service.db", docs_db), \
+         patch.object(documents_service, "BATCH_READ_SIZE", 5):
+        result = get_user_trainings("user123")
+
+    assert len(result) == 30
+    assert [ex["exercise_id"] for ex in result[7]["exercises"]] == [f"ex{(7 + j) % 12}" for j in range(6)]
+
+    backend_reads = user_trainings_mock.stream.call_count + docs_db.get_all.call_count
+    assert backend_reads <= math.ceil(12 / 5) + 1
+    # No point reads per exercise
+    mock_db.collection.return_value.document.return_value.get.assert_not_called()
+
 def test_get_user_trainings_exception():
     """
     If an exception occurs inside .stream(), code prints error and returns [].
@@ -217,70 +234,40 @@ def test_get_training_by_id_not_exists():
         training = get_training_by_id("user123", "unknown")
     assert training is None
 
-def test_get_popular_exercises_success():
+@pytest.fixture
+def empty_popular_exercises_cache():
+    clear_popular_exercises_cache()
+    yield
+    clear_popular_exercises_cache()
+
+def test_get_popular_exercises_success(empty_popular_exercises_cache):
     """
-    get_popular_exercises => gather 'public' exercises from training docs,
-    then return top 5. We'll simulate 3 docs referencing ex1, ex2, ex3 (some repeated).
+    get_popular_exercises => answered by the top-K usage counters query.
     """
-    mock_db = MagicMock()
-    # training doc mocks from a 'collection_group' => user_trainings
-    t1 = MagicMock()
-    t1.to_dict.return_value = {"exercises": ["ex1", "ex2"]}
-    t2 = MagicMock()
-    t2.to_dict.return_value = {"exercises": ["ex2", "ex3"]}
-    t3 = MagicMock()
-    t3.to_dict.return_value = {"exercises": ["ex1", "ex2", "ex2"]}  # ex2 repeated
-    # Stream => [t1, t2, t3]
-    mock_trainings = [t1, t2, t3]
+    top = [
+        {"exercise_id": "ex2", "name": "Squats", "count": 4},
+        {"exercise_id": "ex1", "name": "Push-ups", "count": 2},
+    ]
+    with patch("app.services.trainings_service.get_top_exercises_by_usage", return_value=top) as mock_top:
+        popular = get_popular_exercises()
 
-    # Mock exercises in Firestore
-    mock_ex1 = MagicMock()
-    mock_ex1.exists = True
-    mock_ex1.to_dict.return_value = {"public": True, "name": "Push-ups"}
-    mock_ex2 = MagicMock()
-    mock_ex2.exists = True
-    mock_ex2.to_dict.return_value = {"public": True, "name": "Squats"}
-    mock_ex3 = MagicMock()
-    mock_ex3.exists = True
-    mock_ex3.to_dict.return_value = {"public": False, "name": "Crunches"}  # not public => won't count
+    mock_top.assert_called_once_with(5)
+    assert popular == top
 
-    with patch("app.services.trainings_service.db", mock_db):
-        mock_db.collection_group.return_value.stream.return_value = mock_trainings
-
-        # We call db.collection('exercises').document(ex_id).get() for each ex_id
-        def get_exercise_doc(ex_id):
-            if ex_id == "ex1":
-                return mock_ex1
-            elif ex_id == "ex2":
-                return mock_ex2
-            elif ex_id == "ex3":
-                return mock_ex3
-            return MagicMock(exists=False)
-        
-        def mock_document_side_effect(arg):
-            return MagicMock(get=lambda: get_exercise_doc(arg))
-        
-        mock_db.collection.return_value.document.side_effect = mock_document_side_effect
+def test_get_popular_exercises_is_cached(empty_popular_exercises_cache):
+    top = [{"exercise_id": "ex1", "name": "Push-ups", "count": 2}]
+    with patch("app.services.trainings_service.get_top_exercises_by_usage", return_value=top) as mock_top:
+        first = get_popular_exercises()
+        second = get_popular_exercises()
 
-        popular = get_popular_exercises()
-    
-    # ex1 appears 2 times total
-    # ex2 appears 5 times total (t1 =>1, t2 =>1, t3 => 2 more times? Actually 3 more times if we count duplicates strictly? or 2? 
-    #   The code doesn't deduplicate, so the code increments for each reference. t1 => ex2 once, t2 => ex2 once, t3 => ex2 2 times => total 4. 
-    # ex3 is not public => 0
-    # So top: ex2 => 4, ex1 => 2
-    # Should only include "public": True
-    assert len(popular) == 2
-    assert popular[0]["exercise_id"] == "ex2"
-    assert popular[0]["count"] == 4
-    assert popular[1]["exercise_id"] == "ex1"
-    assert popular[1]["count"] == 2
-
-def test_get_popular_exercises_exception():
+    assert first == second == top
+    mock_top.assert_called_once()
+
+def test_get_popular_exercises_exception(empty_popular_exercises_cache):
     """
     On exception => return [].
     """
-    with patch("app.services.trainings_service.db.collection_group", side_effect=Exception("DB error")):
+    with patch("app.services.trainings_service.get_top_exercises_by_usage", side_effect=Exception("DB error")):
         result = get_popular_exercises()
     assert result == []
 
@@ -383,22 +370,39 @@ def test_recalculate_calories_per_hour_mean_of_trainings_by_modified_excercise_s
     mock_db = MagicMock()
     mock_db.collection.side_effect = collection_side_effect
 
-    with patch("app.services.trainings_service.db", mock_db):
+    with patch("app.services.trainings_service.db", mock_db), \
+         patch("app.services.metadata_service.db", mock_db):
         result = recalculate_calories_per_hour_mean_of_trainings_by_modified_excercise("user123", "ex2")
 
-    # The code returns None on success (False only if there's an exception)
-    assert result is not False, "Expected success, got an exception"
+    assert result is True
+
+    # Only "train1" references ex2 => it is updated with cphMean=250, in the same batch as the stamp
+    batch = mock_db.batch.return_value
+    assert batch.update.call_count == 1
+    update_ref, update_args = batch.update.call_args[0]
+    assert update_ref is train1_doc_mock
+    assert update_args == {"calories_per_hour_mean": 250, "updated_at": firestore.SERVER_TIMESTAMP}, f"Got update data {update_args}"
+    train1_doc_mock.update.assert_not_called()
+    train2_doc_mock.update.assert_not_called()
+
+    stamp_data = batch.set.call_args[0][1]
+    assert stamp_data == {"trainings_last_modified": firestore.SERVER_TIMESTAMP}
+    assert batch.set.call_args[1] == {"merge": True}
+    batch.commit.assert_called_once()
+
+def test_recalculate_calories_per_hour_mean_without_trainings_using_the_exercise():
+    training = MagicMock()
+    training.id = "train1"
+    training.to_dict.return_value = {"exercises": ["ex3"]}
+    mock_db = MagicMock()
+    mock_db.collection.return_value.document.return_value.collection.return_value.stream.return_value = [training]
 
-    # Now check which doc got updated
-    # Only "train1" references ex2 => it should get updated with cphMean=250
-    assert train1_doc_mock.update.call_count == 1, (
-        f"Expected train1_doc_mock.update(...) once, got {train1_doc_mock.update.call_count}"
-    )
-    update_args = train1_doc_mock.update.call_args[0][0]
-    assert update_args == {"calories_per_hour_mean": 250}, f"Got update data {update_args}"
+    with patch("app.services.trainings_service.db", mock_db):
+        result = recalculate_calories_per_hour_mean_of_trainings_by_modified_excercise("user123", "ex2")
 
-    # "train2" does NOT have ex2 => no update
-    assert train2_doc_mock.update.call_count == 0, "train2_doc_mock should not be updated"
+    # Nothing changed => no write and no new stamp
+    assert result is True
+    mock_db.batch.return_value.commit.assert_not_called()
 
 def test_recalculate_calories_per_hour_mean_of_trainings_by_modified_excercise_exception():
     with patch("app.services.trainings_service.db.collection", side_effect=Exception("DB error")):
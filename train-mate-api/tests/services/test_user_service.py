@@ -1,7 +1,7 @@
 import pytest
 from unittest.mock import patch, MagicMock
+from app.services.auth_service import verify_token_service
 from app.services.user_service import (
-    verify_token_service,
     save_user_info_service,
     get_user_info_service,
     update_user_info_service
@@ -15,7 +15,7 @@ def test_verify_token_service_success():
     mock_auth = MagicMock()
     mock_auth.verify_id_token.return_value = {"uid": "user123"}
 
-    with patch("app.services.user_service.auth", mock_auth):
+    with patch("app.services.auth_service.auth", mock_auth):
         uid = verify_token_service("valid_token")
     assert uid == "user123"
     mock_auth.verify_id_token.assert_called_once_with("valid_token")
@@ -27,7 +27,7 @@ def test_verify_token_service_failure():
     mock_auth = MagicMock()
     mock_auth.verify_id_token.side_effect = Exception("Token invalid")
 
-    with patch("app.services.user_service.auth", mock_auth):
+    with patch("app.services.auth_service.auth", mock_auth):
         uid = verify_token_service("bad_token")
     assert uid is None
     mock_auth.verify_id_token.assert_called_once_with("bad_token")
@@ -1,34 +1,74 @@
 import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, MagicMock
 from datetime import datetime
+from google.cloud.firestore_v1.transforms import Increment
 from app.services.water_service import (
     add_water_intake_service,
     get_daily_water_intake_service,
     get_water_intake_history_service
 )
 
-def test_add_water_intake_service_new_day():
+class FakeDocument:
     """
-    If the user doc does not exist or day doc does not exist, we create/update it with the quantity.
+    In-memory stand-in for a Firestore document, applying set(merge=True) and
+    Increment transforms atomically like the server does.
     """
-    mock_db = MagicMock()
+    def __init__(self, path, store):
+        self.path = path
+        self._store = store
 
-    # user_ref => doc doesn't exist initially
-    user_doc_mock = MagicMock()
-    user_doc_mock.exists = False
+    def collection(self, name):
+        return FakeCollection(f"{self.path}/{name}", self._store)
 
-    # day doc doesn't exist
-    day_doc_mock = MagicMock()
-    day_doc_mock.exists = False
+    def set(self, data, merge=False):
+        with self._store.lock:
+            current = dict(self._store.documents.get(self.path, {})) if merge else {}
+            for key, value in data.items():
+                if isinstance(value, Increment):
+                    current[key] = current.get(key, 0) + value.value
+                else:
+                    current[key] = value
+            self._store.documents[self.path] = current
 
-    # After we do .set(...), we expect success => True
-    with patch("app.services.water_service.db", mock_db):
-        # db.collection("water_intakes").document(uid).get() => user_doc_mock
-        mock_db.collection.return_value.document.return_value.get.return_value = user_doc_mock
+class FakeCollection:
+    def __init__(self, path, store):
+        self.path = path
+        self._store = store
 
-        # user_ref.collection("user_water_intakes").document(date).get() => day_doc_mock
-        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value.get.return_value = day_doc_mock
+    def document(self, doc_id):
+        return FakeDocument(f"{self.path}/{doc_id}", self._store)
+
+class FakeBatch:
+    def __init__(self):
+        self._writes = []
+
+    def set(self, document, data, merge=False):
+        self._writes.append((document, data, merge))
+
+    def commit(self):
+        for document, data, merge in self._writes:
+            document.set(data, merge=merge)
 
+class FakeFirestore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.documents = {}
+
+    def collection(self, name):
+        return FakeCollection(name, self)
+
+    def batch(self):
+        return FakeBatch()
+
+def test_add_water_intake_service_new_day():
+    """
+    The day's total is an Increment merged into the day doc: one write, no reads.
+    """
+    mock_db = MagicMock()
+
+    with patch("app.services.water_service.db", mock_db):
         success = add_water_intake_service(
             uid="user123",
             quantity_in_militers=500,
@@ -41,45 +81,57 @@ def test_add_water_intake_service_new_day():
     mock_db.collection.assert_called_with("water_intakes")
     doc_mock = mock_db.collection.return_value.document.return_value
 
-    # user_doc_mock doesn't exist => we do doc_mock.set({})
-    doc_mock.set.assert_called_once_with({})
-
-    # For the day doc: .set(...) with quantity_in_militers=500, date= datetime(2025,1,1,...), public=True
-    day_doc_set_call = doc_mock.collection.return_value.document.return_value.set
-    day_doc_set_call.assert_called_once()
-    called_data = day_doc_set_call.call_args[0][0]
-    assert called_data["quantity_in_militers"] == 500
+    # The parent doc is created with a blind merge write, without reading it first
+    doc_mock.set.assert_called_once_with({}, merge=True)
+    doc_mock.get.assert_not_called()
+
+    # Day doc + weekly + monthly rollups in one batched write, without reading the day doc
+    day_doc_mock = doc_mock.collection.return_value.document.return_value
+    day_doc_mock.get.assert_not_called()
+    batch = mock_db.batch.return_value
+    assert batch.set.call_count == 3
+    batch.commit.assert_called_once()
+    called_data = batch.set.call_args_list[0].args[1]
+    assert called_data["quantity_in_militers"] == Increment(500)
     assert called_data["public"] is True
     assert isinstance(called_data["date"], datetime)  # after we do datetime.strptime(date,...)
+    assert all(c.kwargs == {"merge": True} for c in batch.set.call_args_list)
 
 def test_add_water_intake_service_existing_day():
     """
     If there's already water intake for that day, we add to the existing quantity.
     """
-    mock_db = MagicMock()
-
-    # user doc exists
-    user_doc_mock = MagicMock()
-    user_doc_mock.exists = True
-
-    # day doc exists with quantity=300
-    day_doc_mock = MagicMock()
-    day_doc_mock.exists = True
-    day_doc_mock.to_dict.return_value = {"quantity_in_militers": 300}
-
-    with patch("app.services.water_service.db", mock_db):
-        mock_db.collection.return_value.document.return_value.get.return_value = user_doc_mock
-        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value.get.return_value = day_doc_mock
+    fake_db = FakeFirestore()
+    fake_db.documents["water_intakes/user123/user_water_intakes/2025-01-02"] = {"quantity_in_militers": 300, "public": True}
 
+    with patch("app.services.water_service.db", fake_db):
         success = add_water_intake_service("user123", 200, "2025-01-02", False)
     
     assert success is True
     # We expect day doc final = 300 existing + 200 new = 500
-    day_doc_set_call = mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value.set
-    day_doc_set_call.assert_called_once()
-    new_data = day_doc_set_call.call_args[0][0]
-    assert new_data["quantity_in_militers"] == 500
-    assert new_data["public"] is False
+    day_doc = fake_db.documents["water_intakes/user123/user_water_intakes/2025-01-02"]
+    assert day_doc["quantity_in_militers"] == 500
+    assert day_doc["public"] is False
+    weekly = fake_db.documents["water_intakes/user123/user_water_intakes_weekly/2025-W01"]
+    assert weekly["quantity_in_militers"] == 200
+    assert weekly["start_date"] == datetime(2024, 12, 30)
+    assert weekly["end_date"] == datetime(2025, 1, 5)
+
+def test_add_water_intake_service_concurrent_adds():
+    """
+    Parallel adds from several devices must not lose updates.
+    """
+    fake_db = FakeFirestore()
+
+    with patch("app.services.water_service.db", fake_db):
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(lambda _: add_water_intake_service("user123", 250, "2025-01-03"), range(200)))
+
+    assert all(results)
+    assert fake_db.documents["water_intakes/user123/user_water_intakes/2025-01-03"]["quantity_in_militers"] == 200 * 250
+    # The rollups stay consistent with the daily doc
+    assert fake_db.documents["water_intakes/user123/user_water_intakes_weekly/2025-W01"]["quantity_in_militers"] == 200 * 250
+    assert fake_db.documents["water_intakes/user123/user_water_intakes_monthly/2025-01"]["quantity_in_militers"] == 200 * 250
 
 def test_add_water_intake_service_exception():
     """
@@ -164,4 +216,34 @@ def test_get_water_intake_history_service_exception():
     """
     with patch("app.services.water_service.db.collection", side_effect=Exception("DB fail")):
         history = get_water_intake_history_service("user123", "2025-01-01", "2025-01-05")
-    assert history == []
\ No newline at end of file
+    assert history == []
+def test_get_water_intake_history_service_by_week_uses_rollups():
+    """
+    Full weeks are read from the weekly rollups, the partial edge weeks from the daily docs.
+    """
+    mock_db = MagicMock()
+    user_ref = mock_db.collection.return_value.document.return_value
+
+    rollup = MagicMock()
+    rollup.exists = True
+    rollup.to_dict.return_value = {"period": "2025-W02", "start_date": datetime(2025, 1, 6), "quantity_in_militers": 7000}
+    mock_db.get_all.return_value = [rollup]
+
+    edge_day = MagicMock()
+    edge_day.to_dict.return_value = {"date": datetime(2025, 1, 4), "quantity_in_militers": 800}
+    daily_query = user_ref.collection.return_value.where.return_value.where.return_value
+    daily_query.stream.side_effect = [[edge_day], []]
+
+    with patch("app.services.water_service.db", mock_db), \
+         patch("app.services.rollup_service.db", mock_db):
+        # Fri 2025-01-03 .. Wed 2025-01-15 => partial W01, full W02, partial W03
+        history = get_water_intake_history_service("user123", "2025-01-03", "2025-01-15", "week")
+
+    assert history == [
+        {"period": "2025-W01", "date": "2024-12-30", "quantity_in_militers": 800},
+        {"period": "2025-W02", "date": "2025-01-06", "quantity_in_militers": 7000}
+    ]
+    requested = [c.args[0] for c in user_ref.collection.return_value.document.call_args_list]
+    assert requested == ["2025-W02"]
+    # Two daily range queries, one per partial edge
+    assert daily_query.stream.call_count == 2
@@ -1,12 +1,17 @@
 import pytest
 from unittest.mock import patch, MagicMock
+from firebase_admin import firestore
 from datetime import datetime
 from app.services.workout_service import (
     save_user_workout,
     get_user_workouts,
     get_user_calories_from_workouts,
-    delete_user_workout
+    delete_user_workout,
+    hydrate_workouts_with_trainings,
+    get_user_workouts_aggregates,
+    get_user_workouts_page
 )
+from google.cloud.firestore_v1.transforms import Increment
 
 def test_save_user_workout_success():
     mock_db = MagicMock()
@@ -19,11 +24,12 @@ def test_save_user_workout_success():
     doc_ref_mock.id = "new_workout_id"
 
     with patch("app.services.workout_service.db", mock_db), \
-         patch("app.services.workout_service.check_and_update_workouts_challenges", mock_challenges), \
+         patch("app.services.metadata_service.db", mock_db), \
+         patch("app.services.workout_service.enqueue_challenges_recheck", mock_challenges), \
          patch("app.services.workout_service.get_training_by_id", return_value={"some": "training"}):  # NEW
 
         mock_db.collection.return_value.document.return_value.get.return_value = user_doc_mock
-        mock_db.collection.return_value.document.return_value.collection.return_value.add.return_value = (None, doc_ref_mock)
+        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value = doc_ref_mock
 
         data = {
             "training_id": "trainXYZ",
@@ -33,6 +39,27 @@ def test_save_user_workout_success():
         }
         result = save_user_workout("user123", data, calories_burned=300)
 
+    assert result["id"] == "new_workout_id"
+    # Workout + daily/weekly/monthly rollups in a single batched write
+    batch = mock_db.batch.return_value
+    batch.commit.assert_called_once()
+    assert batch.set.call_args_list[0].args == (doc_ref_mock, {
+        "training_id": "trainXYZ",
+        "duration": 45,
+        "date": datetime(2025, 5, 1, 10, 0),
+        "total_calories": 300,
+        "coach": "CoachBob",
+        "updated_at": firestore.SERVER_TIMESTAMP
+    })
+    assert "updated_at" not in result
+    rollups = [c.args[1] for c in batch.set.call_args_list[1:-1]]
+    assert [rollup["period"] for rollup in rollups] == ["2025-05-01", "2025-W18", "2025-05"]
+    assert all(rollup["total_calories"] == Increment(300) for rollup in rollups)
+    assert all(rollup["duration"] == Increment(45) for rollup in rollups)
+    assert all(rollup["count"] == Increment(1) for rollup in rollups)
+    # workouts_last_modified is stamped in the same batch
+    assert list(batch.set.call_args_list[-1].args[1]) == ["workouts_last_modified"]
+
     # The rest remains the same...
 
 def test_save_user_workout_invalid_date():
@@ -60,11 +87,11 @@ def test_save_user_workout_no_date():
     doc_ref_mock.id = "workout_no_date"
 
     with patch("app.services.workout_service.db", mock_db), \
-         patch("app.services.workout_service.check_and_update_workouts_challenges", mock_challenges), \
+         patch("app.services.workout_service.enqueue_challenges_recheck", mock_challenges), \
          patch("app.services.workout_service.get_training_by_id", return_value={"some": "training"}):
 
         mock_db.collection.return_value.document.return_value.get.return_value = user_doc_mock
-        mock_db.collection.return_value.document.return_value.collection.return_value.add.return_value = (None, doc_ref_mock)
+        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value = doc_ref_mock
 
         data = {
             "training_id": "tid123",
@@ -73,10 +100,13 @@ def test_save_user_workout_no_date():
         }
         result = save_user_workout("user123", data, 400)
 
-    # Now .add(...) is called once with 'date' => db.SERVER_TIMESTAMP
-    add_data = mock_db.collection.return_value.document.return_value.collection.return_value.add.call_args[0][0]
+    # The workout is written with 'date' => db.SERVER_TIMESTAMP, and rolled up into today
+    add_data = mock_db.batch.return_value.set.call_args_list[0].args[1]
     assert add_data["date"] == mock_db.SERVER_TIMESTAMP
+    assert mock_db.batch.return_value.set.call_args_list[1].args[1]["period"] == datetime.now().strftime("%Y-%m-%d")
     assert result["id"] == "workout_no_date"
+    # Challenges are rechecked in the background, not in the request
+    mock_challenges.assert_called_once_with("user123", workout=result)
 
 def test_save_user_workout_exception():
     """
@@ -154,6 +184,38 @@ def test_get_user_workouts_invalid_date():
     assert result["error"] == "Invalid date. Use 'YYYY-MM-DD'."
 
 
+def test_hydrate_workouts_with_trainings_dedupes_reads():
+    """
+    Workouts sharing a training => each training and exercise id is requested once,
+    in a single batched read per collection.
+    """
+    workouts = [
+        {"id": "w1", "training_id": "t1"},
+        {"id": "w2", "training_id": "t1"},
+        {"id": "w3", "training_id": "t2"},
+        {"id": "w4", "training_id": "deleted"},
+    ]
+    trainings = {
+        "t1": {"name": "Legs", "exercises": ["ex1", "ex2"]},
+        "t2": {"name": "Arms", "exercises": ["ex2", "missing"]},
+    }
+    exercises = {"ex1": {"name": "Squats"}, "ex2": {"name": "Lunges"}}
+
+    with patch("app.services.workout_service.get_trainings_by_ids", return_value=trainings) as mock_trainings, \
+         patch("app.services.workout_service.get_exercises_by_ids", return_value=exercises) as mock_exercises:
+        result = hydrate_workouts_with_trainings("user123", workouts)
+
+    mock_trainings.assert_called_once()
+    assert sorted(set(mock_trainings.call_args[0][1])) == ["deleted", "t1", "t2"]
+    mock_exercises.assert_called_once()
+    assert sorted(set(mock_exercises.call_args[0][0])) == ["ex1", "ex2", "missing"]
+
+    assert result[0]["training"]["exercises"] == [{"name": "Squats", "id": "ex1"}, {"name": "Lunges", "id": "ex2"}]
+    assert result[1]["training"]["name"] == "Legs"
+    # Missing exercises are skipped, missing trainings => None
+    assert result[2]["training"]["exercises"] == [{"name": "Lunges", "id": "ex2"}]
+    assert result[3]["training"] is None
+
 def test_get_user_calories_from_workouts_success():
     """
     No exception => returns ([cals], [dates], [training_ids]).
@@ -210,12 +272,91 @@ def test_delete_user_workout_found_future():
     # future date
     doc_mock.to_dict.return_value = {"date": datetime(2025,12,31)}
 
-    with patch("app.services.workout_service.db", mock_db):
+    with patch("app.services.workout_service.db", mock_db), \
+         patch("app.services.workout_service.enqueue_challenges_recheck"):
         mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value.get.return_value = doc_mock
         response, status = delete_user_workout("user123", "workoutABC")
     assert status == 200
     assert response["message"] == "Workout cancelled successfully"
 
+def test_delete_user_workout_rebuilds_challenge_state():
+    """
+    Cancelling a scheduled workout is a correction => a full challenge recompute is queued.
+    """
+    from datetime import timedelta
+    mock_db = MagicMock()
+    doc_mock = MagicMock()
+    doc_mock.exists = True
+    doc_mock.to_dict.return_value = {"date": datetime.now() + timedelta(days=7)}
+
+    with patch("app.services.workout_service.db", mock_db), \
+         patch("app.services.workout_service.enqueue_challenges_recheck") as mock_rebuild:
+        mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value.get.return_value = doc_mock
+        response, status = delete_user_workout("user123", "workoutABC")
+
+    assert status == 200
+    mock_rebuild.assert_called_once_with("user123", rebuild_workouts=True)
+
+def test_delete_user_workout_subtracts_from_rollups():
+    from datetime import timedelta
+    mock_db = MagicMock()
+    doc_mock = MagicMock()
+    doc_mock.exists = True
+    doc_mock.to_dict.return_value = {"date": datetime.now() + timedelta(days=7), "duration": 30, "total_calories": 250}
+    workout_ref = mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value
+    workout_ref.get.return_value = doc_mock
+
+    with patch("app.services.workout_service.db", mock_db), \
+         patch("app.services.metadata_service.db", mock_db), \
+         patch("app.services.workout_service.enqueue_challenges_recheck"):
+        response, status = delete_user_workout("user123", "workoutABC")
+
+    assert status == 200
+    batch = mock_db.batch.return_value
+    batch.delete.assert_called_once_with(workout_ref)
+    workout_ref.delete.assert_not_called()
+    rollups = [c.args[1] for c in batch.set.call_args_list[:3]]
+    assert all("period" in rollup for rollup in rollups)
+    # Tombstone for /api/sync
+    tombstone = batch.set.call_args_list[3].args[1]
+    assert (tombstone["collection"], tombstone["document_id"]) == ("workouts", "workoutABC")
+    assert len(batch.set.call_args_list) == 5
+    assert list(batch.set.call_args_list[-1].args[1]) == ["workouts_last_modified"]
+    assert all(rollup["total_calories"] == Increment(-250) and rollup["count"] == Increment(-1) for rollup in rollups)
+    batch.commit.assert_called_once()
+
+def test_get_user_workouts_aggregates_by_month():
+    """
+    Full months come from the monthly rollups, the edges from the daily rollups.
+    """
+    mock_db = MagicMock()
+    user_ref = mock_db.collection.return_value.document.return_value
+
+    march = MagicMock()
+    march.exists = True
+    march.to_dict.return_value = {"period": "2025-03", "start_date": datetime(2025, 3, 1), "total_calories": 9000, "duration": 600, "count": 12}
+    mock_db.get_all.return_value = [march]
+
+    edge_day = MagicMock()
+    edge_day.to_dict.return_value = {"period": "2025-02-20", "start_date": datetime(2025, 2, 20), "total_calories": 400, "duration": 30, "count": 1}
+    user_ref.collection.return_value.where.return_value.where.return_value.stream.side_effect = [[edge_day], []]
+
+    with patch("app.services.workout_service.db", mock_db), \
+         patch("app.services.rollup_service.db", mock_db):
+        aggregates = get_user_workouts_aggregates("user123", "2025-02-15", "2025-04-10", "month")
+
+    assert aggregates == [
+        {"period": "2025-02", "date": "2025-02-01", "total_calories": 400, "duration": 30, "count": 1},
+        {"period": "2025-03", "date": "2025-03-01", "total_calories": 9000, "duration": 600, "count": 12}
+    ]
+    collections = [c.args[0] for c in user_ref.collection.call_args_list]
+    assert collections == ["user_workouts_monthly", "user_workouts_daily"]
+    ranges = [c.args for c in user_ref.collection.return_value.where.call_args_list]
+    assert ranges == [("start_date", ">=", datetime(2025, 2, 15)), ("start_date", ">=", datetime(2025, 4, 1))]
+
+def test_get_user_workouts_aggregates_invalid_date():
+    assert get_user_workouts_aggregates("user123", "bad", "2025-01-01") == {"error": "Invalid date. Use 'YYYY-MM-DD'."}
+
 def test_delete_user_workout_not_found():
     """
     If doc not found => 404
@@ -243,4 +384,25 @@ def test_delete_user_workout_past_date():
         mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value.get.return_value = doc_mock
         response, status = delete_user_workout("user123", "pastWorkout")
     assert status == 400
-    assert "Cannot cancel past workouts" in response["error"]
\ No newline at end of file
+    assert "Cannot cancel past workouts" in response["error"]
+def test_get_user_workouts_page():
+    mock_db = MagicMock()
+    workouts_ref = mock_db.collection.return_value.document.return_value.collection.return_value
+    filtered = workouts_ref.where.return_value
+
+    w1 = MagicMock()
+    w1.id = "w1"
+    w1.to_dict.return_value = {"training_id": "t1", "date": datetime(2025, 1, 9)}
+
+    with patch("app.services.workout_service.db", mock_db), \
+         patch("app.services.workout_service.paginate", return_value=([w1], "next")) as mock_paginate:
+        workouts, next_cursor = get_user_workouts_page("user123", start_date="2025-01-01", limit=1, cursor="abc")
+
+    assert workouts == [{"training_id": "t1", "date": datetime(2025, 1, 9), "id": "w1"}]
+    assert next_cursor == "next"
+    workouts_ref.where.assert_called_once_with("date", ">=", datetime(2025, 1, 1, 10, 0))
+    mock_paginate.assert_called_once_with(filtered, ["date"], 1, "abc")
+
+def test_get_user_workouts_page_invalid_date():
+    with patch("app.services.workout_service.db", MagicMock()), pytest.raises(ValueError):
+        get_user_workouts_page("user123", start_date="bad")